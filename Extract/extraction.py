@@ -1,11 +1,15 @@
 import argparse
-import requests
 import os
 import sys
 import json
 from bs4 import BeautifulSoup
 from collections import namedtuple
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+#shares the pooled session from nosub so pages are fetched the same way
+import nosub
+
 Constant_Codes = namedtuple('_Constant_Codes', ["EXIT_SUCCESS", "EXIT_FAILURE"])
 exit_codes = Constant_Codes(EXIT_SUCCESS = 0, EXIT_FAILURE = 1)
 
@@ -31,6 +35,7 @@ def main():
         print(f"File {args.file[0]} does not exist", file = sys.stderr)
         sys.exit(exit_codes.EXIT_FAILURE)
 
+    session = nosub.openSession()
     with open(args.file[0], "r") as url_file:
         for raw_line in url_file:
             if len(raw_line) == 0:
@@ -50,7 +55,7 @@ def main():
             html_file = base_file_name + ".html"
             json_file = base_file_name + ".json"
 
-            response = requests.get(url)
+            response = session.get(url)
             soup = BeautifulSoup(response.content, "html.parser")
             with open(html_file, "w") as file:
                 file.write(str(soup))
@@ -101,5 +106,8 @@ def main():
                 else:
                     print(f"No tab for {tab} for the url {url}")
 
+    print(f"Connections made {nosub.connection_stats.new}, connections reused {nosub.connection_stats.reused()}")
+    nosub.closeSession()
+
 if __name__ == "__main__":
     main()
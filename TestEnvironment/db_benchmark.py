@@ -0,0 +1,79 @@
+import sys
+import os
+import time
+import tempfile
+import argparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+import nosub
+
+#Compares how fast the database is written to with each profile for the shapes
+#a run usually has. A first run adds every handle and its newest id. A repeat run
+#only finds a new id for a few of the handles.
+
+def videoId(handle_index: int, run: int) -> str:
+    return f"R{run}{handle_index:09d}"
+
+def handleName(handle_index: int) -> str:
+    return f"Channel{handle_index}"
+
+def firstRun(conn_wrapped, handles: int):
+    for index in range(handles):
+        handle = handleName(index)
+        if not nosub.findHandle(handle, nosub.db_tables.V_TABLE, conn_wrapped):
+            nosub.addHandle(handle, nosub.db_tables.V_TABLE, conn_wrapped)
+        nosub.addID(handle, videoId(index, 0), nosub.db_tables.V_TABLE, conn_wrapped)
+
+#every tenth handle has uploaded since the last run
+def repeatRun(conn_wrapped, handles: int):
+    for index in range(handles):
+        handle = handleName(index)
+        if index % 10 == 0:
+            nosub.addID(handle, videoId(index, 1), nosub.db_tables.V_TABLE, conn_wrapped)
+        else:
+            nosub.findID(handle, videoId(index, 0), nosub.db_tables.V_TABLE, conn_wrapped)
+
+def updatedHandles(handles: int) -> int:
+    return (handles + 9) // 10
+
+def timeShape(shape, profile: str, batch_size: int, handles: int) -> float:
+    start_dir = os.getcwd()
+    with tempfile.TemporaryDirectory() as db_dir:
+        os.chdir(db_dir)
+        try:
+            nosub.init()
+            pragmas = nosub.dbPragmas(profile)
+            if shape is repeatRun:
+                conn_wrapped = nosub.ConnectionWrapper()
+                nosub.connectToDB(conn_wrapped, pragmas)
+                firstRun(conn_wrapped, handles)
+                nosub.closeConnection(conn_wrapped)
+
+            conn_wrapped = nosub.ConnectionWrapper()
+            start = time.perf_counter()
+            nosub.connectToDB(conn_wrapped, pragmas)
+            nosub.loadKnowns(nosub.db_tables.V_TABLE, conn_wrapped)
+            nosub.beginBatch(conn_wrapped, batch_size, nosub.constant_batch.SECONDS)
+            shape(conn_wrapped, handles)
+            nosub.endBatch(conn_wrapped)
+            nosub.closeConnection(conn_wrapped)
+            return time.perf_counter() - start
+        finally:
+            os.chdir(start_dir)
+
+def main():
+    parser = argparse.ArgumentParser(description = "Time database writes for each profile")
+    parser.add_argument("-n", "--handles", type=int, default=2000, help="How many handles a run has")
+    args = parser.parse_args()
+
+    print(f"{'shape':<8}{'profile':<9}{'batch':>6}{'seconds':>10}{'writes/s':>11}")
+    for shape in (firstRun, repeatRun):
+        writes = args.handles * 2 if shape is firstRun else updatedHandles(args.handles)
+        for batch_size in (1, nosub.constant_batch.SIZE):
+            for profile in nosub.constant_db_profiles:
+                seconds = timeShape(shape, profile, batch_size, args.handles)
+                name = "first" if shape is firstRun else "repeat"
+                print(f"{name:<8}{profile:<9}{batch_size:>6}{seconds:>10.3f}{writes / seconds:>11.0f}")
+
+if __name__ == "__main__":
+    main()
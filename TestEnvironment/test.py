@@ -5,6 +5,20 @@ import json
 import sqlite3
 import random
 import string
+import tempfile
+import threading
+import gzip
+import io
+import time
+import math
+import email.utils
+import requests
+import shutil
+from pathlib import Path
+from datetime import datetime, timezone
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
 from requests.models import Response
 from io import StringIO
 
@@ -266,6 +280,14 @@ class TestExecutionFlags(unittest.TestCase):
         self.mock_norm.assert_called_once()
         self.mock_real.assert_not_called()
 
+    #--both fetches each tab on its own worker so every one needs a connection
+    def testPoolCoversEveryWorker(self):
+        with patch("nosub.openSession") as mock_session, patch("nosub.bothExec") as mock_both:
+            sys.argv = ["nosub.py", "-f", writeHandleFile(self, ["ChannelA"]), "-b", "-j", "16"]
+            nosub.main()
+        mock_both.assert_called_once()
+        mock_session.assert_called_once_with(32)
+
     def testPassing8ToLongFormNumber(self):
         sys.argv = ["nosub.py", "-f", "./cur_dir_test.txt", "--number", "8"]
         nosub.main()
@@ -300,7 +322,7 @@ class TestJsonExtraction(unittest.TestCase):
     empty = ""
 
     def setUp(self):
-        self.patcher_request = patch("requests.get")
+        self.patcher_request = patch("requests.Session.get")
 
         self.mock_req = self.patcher_request.start()
 
@@ -407,7 +429,7 @@ class JsonExtraction(unittest.TestCase):
         exp_file3.close()
 
     def setUp(self):
-        self.patcher_request = patch("requests.get")
+        self.patcher_request = patch("requests.Session.get")
         self.mock_req = self.patcher_request.start()
 
     def tearDown(self):
@@ -802,7 +824,7 @@ def randomString():
     return random_string
 
 def setupExecutionMocks(self):
-    self.patcher_request = patch("requests.get", side_effect = self.mockObtainHtmls).start()
+    self.patcher_request = patch("requests.Session.get", side_effect = self.mockObtainHtmls).start()
     self.mock_browser = patch("webbrowser.open_new_tab", return_value = None).start()
     self.mock_connection = patch("nosub.connectToDB", side_effect = self.mockConnectionToRndDB).start()
     self.mock_close = patch("nosub.closeConnection", return_value = None)
@@ -1731,8 +1753,8 @@ class ReleaseExecutionTesting(unittest.TestCase):
         self.cursor.execute("SELECT COUNT(*) FROM KnownVideos")
         self.assertEqual(self.cursor.fetchone()[0], 0)
 
-#since both execution is just calling normalExec and releaseExec
-#it only needs to test if it'll get all the contents
+#both execution goes through the same video and release processing
+#so it only needs to test if it'll get all the contents
 class BothExecutionTesting(unittest.TestCase):
     releases_table = "KnownReleases"
     videos_table = "KnownVideos"
@@ -1942,6 +1964,2491 @@ class BothExecutionTesting(unittest.TestCase):
         self.mock_browser.assert_has_calls(call_list, any_order = True)
         self.verifyPostDB()
 
+#|------------------------------------|
+#| Synthetic pages for offline tests  |
+#|------------------------------------|
+
+#The recorded htmls in TestData are not shipped, so these build the smallest
+#page that has the same shape as the real ytInitialData
+def videoItem(video_id, time_text = "1 day ago"):
+    renderer = {"videoId": video_id}
+    if time_text is not None:
+        renderer["publishedTimeText"] = {"simpleText": time_text}
+    return {"richItemRenderer": {"content": {"videoRenderer": renderer}}}
+
+def releaseItem(playlist_id, video_id):
+    return {"richItemRenderer": {"content": {"playlistRenderer": {
+        "playlistId": playlist_id,
+        "navigationEndpoint": {"commandMetadata": {"webCommandMetadata": {"url": f"/watch?v={video_id}&list={playlist_id}"}}}
+    }}}}
+
+def continuationItem(token = "4qmFsgKrCBIYVUN"):
+    return {"continuationItemRenderer": {"continuationEndpoint": {"continuationCommand": {"token": token}}}}
+
+def buildChannelPage(tab_title, items, channel_id = None):
+    data = {
+        "responseContext": {"serviceTrackingParams": []},
+        "contents": {"twoColumnBrowseResultsRenderer": {"tabs": [
+            {"tabRenderer": {"title": "Home"}},
+            {"tabRenderer": {"title": tab_title, "selected": True, "content": {"richGridRenderer": {"contents": items}}}}
+        ]}},
+        "header": {"c4TabbedHeaderRenderer": {"title": "Some Channel"}},
+    }
+    if channel_id is not None:
+        data["metadata"] = {"channelMetadataRenderer": {"externalId": channel_id}}
+    page = "<html><head><script nonce=\"abc\">var ytcfg = {};</script></head><body>"
+    page += "<script nonce=\"abc\">var ytInitialData = " + json.dumps(data) + ";</script>"
+    page += "<script nonce=\"abc\">window.other = 1;</script></body></html>"
+    return page.encode("utf-8")
+
+#laid out like youtube's feeds/videos.xml, entries are (video id, published, is short)
+def buildFeed(channel_id, entries):
+    feed = '<?xml version="1.0" encoding="UTF-8"?>\n'
+    feed += '<feed xmlns:yt="http://www.youtube.com/xml/schemas/2015" xmlns:media="http://search.yahoo.com/mrss/" xmlns="http://www.w3.org/2005/Atom">\n'
+    feed += f' <link rel="self" href="http://www.youtube.com/feeds/videos.xml?channel_id={channel_id}"/>\n'
+    feed += f' <id>yt:channel:{channel_id[2:]}</id>\n <yt:channelId>{channel_id[2:]}</yt:channelId>\n <title>Some Channel</title>\n'
+    for video_id, published, short in entries:
+        link = f"https://www.youtube.com/shorts/{video_id}" if short else f"https://www.youtube.com/watch?v={video_id}"
+        feed += " <entry>\n"
+        feed += f"  <id>yt:video:{video_id}</id>\n  <yt:videoId>{video_id}</yt:videoId>\n  <yt:channelId>{channel_id}</yt:channelId>\n"
+        feed += f'  <title>Video {video_id}</title>\n  <link rel="alternate" href="{link}"/>\n'
+        feed += f"  <published>{published}</published>\n  <updated>{published}</updated>\n"
+        feed += f'  <media:group><media:title>Video {video_id}</media:title><media:community><media:statistics views="10"/></media:community></media:group>\n'
+        feed += " </entry>\n"
+    feed += "</feed>\n"
+    return feed.encode("utf-8")
+
+def feedTime(minutes_ago):
+    return datetime.fromtimestamp(time.time() - minutes_ago * 60, timezone.utc).isoformat(timespec = "seconds")
+
+def pageResponse(content, status_code = 200):
+    response = Response()
+    response.status_code = status_code
+    response._content = content
+    return response
+
+#(handle, elements) of the videos tab for every handle
+def fetchVideos(handles, settings, limit = nosub.constant_infs.NO_LIMIT, channel_ids = None):
+    return [(handle, elements) for handle, (elements,) in nosub.fetchTabs((nosub.constant_yt.YT_VIDEOS,), handles, settings, limit, channel_ids = channel_ids)]
+
+def writeHandleFile(self, handles):
+    handle_file = tempfile.NamedTemporaryFile("w", suffix = ".txt", delete = False, encoding = "ascii")
+    handle_file.write("\n".join(handles) + "\n")
+    handle_file.close()
+    self.addCleanup(os.remove, handle_file.name)
+    return handle_file.name
+
+#each channel has a different number of new videos so a mix up in order
+#would show up in the browser calls and the database
+class ConcurrentExecutionTesting(unittest.TestCase):
+    handles = ["ChannelA", "ChannelB", "ChannelC", "ChannelD", "ChannelE", "ChannelF"]
+
+    def setUp(self):
+        create_videos = """
+        CREATE TABLE IF NOT EXISTS KnownVideos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            handle varchar(30) UNIQUE NOT NULL,
+            known_id varchar(11) UNIQUE NOT NULL
+        );
+        """
+        setupRandomDB(self, create_videos)
+        self.seedKnowns()
+
+        self.pages = {}
+        for handle in self.handles:
+            letter = handle[-1]
+            items = [videoItem(f"{letter}{index:010d}", f"{index + 1} days ago") for index in range(6)]
+            self.pages[f"https://www.youtube.com/@{handle}/videos"] = buildChannelPage("Videos", items)
+
+        self.patcher_request = patch("requests.Session.get", side_effect = self.mockObtainHtmls).start()
+        self.mock_browser = patch("webbrowser.open_new_tab", return_value = None).start()
+        self.mock_connection = patch("nosub.connectToDB", side_effect = self.mockConnectionToRndDB).start()
+        self.mock_sleep = patch("nosub.time.sleep", return_value = None).start()
+        nosub.verboseprint = lambda *a, **k: None
+
+    def tearDown(self):
+        patch.stopall()
+        tearDownRandomDB(self)
+
+    def seedKnowns(self):
+        self.cursor.execute("""
+            INSERT INTO KnownVideos (handle, known_id) VALUES
+            ('ChannelA', 'A0000000002'),
+            ('ChannelB', 'B0000000000'),
+            ('ChannelC', 'C0000000004'),
+            ('ChannelE', 'E0000000001')
+        """)
+        self.testing_db.commit()
+
+    def mockConnectionToRndDB(self, *args, **kwargs):
+        args[0].connection = sqlite3.connect(self.connection_string)
+        args[0].status = nosub.ConnectionWrapper.OPEN
+
+    #earlier handles take longer so they finish after the later ones
+    def mockObtainHtmls(self, *args, **kwargs):
+        url = args[0]
+        position = self.handles.index(url.split("@")[1].split("/")[0])
+        threading.Event().wait((len(self.handles) - position) * 0.02)
+        return pageResponse(self.pages[url])
+
+    def runNormal(self, jobs):
+        handle_file = writeHandleFile(self, self.handles)
+        nosub.normalExec([handle_file], nosub.constant_infs.LOAD_TO_KNOWN, nosub.constant_infs.NO_LIMIT, nosub.RunSettings(jobs = jobs))
+        rows = self.cursor.execute("SELECT handle, known_id FROM KnownVideos ORDER BY handle").fetchall()
+        return list(self.mock_browser.call_args_list), rows
+
+    def testJobsMatchSerialOrderAndResults(self):
+        serial_calls, serial_rows = self.runNormal(1)
+
+        self.mock_browser.reset_mock()
+        self.cursor.execute("DELETE FROM KnownVideos")
+        self.cursor.execute("DELETE FROM SeenVideos")
+        self.testing_db.commit()
+        self.seedKnowns()
+
+        threaded_calls, threaded_rows = self.runNormal(4)
+        self.assertEqual(serial_calls, threaded_calls)
+        self.assertEqual(serial_rows, threaded_rows)
+
+    def testJobsOpensInFileOrder(self):
+        calls, rows = self.runNormal(3)
+        expected = [
+            call("https://www.youtube.com/watch?v=A0000000000"),
+            call("https://www.youtube.com/watch?v=A0000000001"),
+            call("https://www.youtube.com/watch?v=C0000000000"),
+            call("https://www.youtube.com/watch?v=C0000000001"),
+            call("https://www.youtube.com/watch?v=C0000000002"),
+            call("https://www.youtube.com/watch?v=C0000000003"),
+            call("https://www.youtube.com/watch?v=D0000000000"),
+            call("https://www.youtube.com/watch?v=E0000000000"),
+            call("https://www.youtube.com/watch?v=F0000000000"),
+        ]
+        self.assertEqual(calls, expected)
+        self.assertEqual(len(rows), 6)
+
+    def testFetchElementsYieldsEveryHandleInOrder(self):
+        handles = [f"Channel{letter}" for letter in "ABCDEF"]
+        results = fetchVideos(iter(handles), nosub.RunSettings(jobs = 2))
+        self.assertEqual([handle for handle, _ in results], handles)
+        self.assertTrue(all(elements is not None for _, elements in results))
+
+    def testPassing0ToJobs(self):
+        sys.argv = ["nosub.py", "-f", writeHandleFile(self, self.handles), "-j", "0"]
+        with patch("nosub.init", return_value = 0):
+            with self.assertRaises(SystemExit) as ex:
+                nosub.main()
+
+        self.assertEqual(ex.exception.code, 1)
+
+
+#Local stand in for youtube so fetch engines can be tested offline.
+#routes maps a path to (status, body, headers). If the headers ask for chunked
+#transfer encoding the body is sent in chunks, otherwise with a content length
+class StandInServer:
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        self.bodies = []
+        self.client_ports = set()
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                stand_in.requests.append((self.path, dict(self.headers)))
+                stand_in.client_ports.add(self.client_address[1])
+                route = stand_in.routes.get(self.path, (404, b"<html>not real</html>", {}))
+                if callable(route):
+                    route = route(self)
+                #the route wrote its own response
+                if route is None:
+                    return
+                status, body, headers = route
+
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+
+                if headers.get("Transfer-Encoding") == "chunked":
+                    self.end_headers()
+                    for start in range(0, len(body), 1000):
+                        chunk = body[start:start + 1000]
+                        self.wfile.write(f"{len(chunk):x}\r\n".encode("ascii") + chunk + b"\r\n")
+                    self.wfile.write(b"0\r\n\r\n")
+                else:
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+            def do_POST(self):
+                stand_in.bodies.append(json.loads(self.rfile.read(int(self.headers["Content-Length"]))))
+                self.do_GET()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target = self.server.serve_forever, kwargs = {"poll_interval": 0.05}, daemon = True)
+        self.thread.start()
+        self.base = f"http://127.0.0.1:{self.server.server_port}"
+
+    def channelConstants(self):
+        return nosub.constant_yt._replace(YTER_PAGE = self.base + "/@", YT_FEED = self.base + "/feeds/videos.xml?channel_id=",
+                                          YT_BROWSE = self.base + "/youtubei/v1/browse")
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+class AsyncEngineTesting(unittest.TestCase):
+    handles = ["ChannelA", "ChannelB", "ChannelC", "ChannelD"]
+
+    def setUp(self):
+        create_videos = """
+        CREATE TABLE IF NOT EXISTS KnownVideos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            handle varchar(30) UNIQUE NOT NULL,
+            known_id varchar(11) UNIQUE NOT NULL
+        );
+        """
+        setupRandomDB(self, create_videos)
+        self.cursor.execute("""
+            INSERT INTO KnownVideos (handle, known_id) VALUES
+            ('ChannelA', 'A0000000003'),
+            ('ChannelC', 'C0000000001')
+        """)
+        self.testing_db.commit()
+
+        self.stand_in = StandInServer()
+        for handle in self.handles:
+            letter = handle[-1]
+            items = [videoItem(f"{letter}{index:010d}", f"{index + 1} hours ago") for index in range(5)]
+            self.stand_in.routes[f"/@{handle}/videos"] = (200, buildChannelPage("Videos", items), {})
+
+        patch("nosub.constant_yt", self.stand_in.channelConstants()).start()
+        self.mock_browser = patch("webbrowser.open_new_tab", return_value = None).start()
+        patch("nosub.connectToDB", side_effect = self.mockConnectionToRndDB).start()
+        patch("nosub.time.sleep", return_value = None).start()
+        nosub.verboseprint = lambda *a, **k: None
+
+    def tearDown(self):
+        patch.stopall()
+        self.stand_in.close()
+        tearDownRandomDB(self)
+
+    def mockConnectionToRndDB(self, *args, **kwargs):
+        args[0].connection = sqlite3.connect(self.connection_string)
+        args[0].status = nosub.ConnectionWrapper.OPEN
+
+    def testAsyncMatchesThreadEngine(self):
+        handle_file = writeHandleFile(self, self.handles + ["not valid!"])
+        thread_results = fetchVideos(nosub.readHandles([handle_file]), nosub.RunSettings())
+        async_settings = nosub.RunSettings(jobs = 8, engine = nosub.constant_engines.ASYNC)
+        async_results = fetchVideos(nosub.readHandles([handle_file]), async_settings)
+        self.assertEqual(thread_results, async_results)
+
+    def testAsyncExecutionOpensAndStores(self):
+        handle_file = writeHandleFile(self, self.handles)
+        settings = nosub.RunSettings(jobs = 4, engine = nosub.constant_engines.ASYNC)
+        nosub.normalExec([handle_file], nosub.constant_infs.LOAD_TO_KNOWN, nosub.constant_infs.NO_LIMIT, settings)
+        expected = [
+            call("https://www.youtube.com/watch?v=A0000000000"),
+            call("https://www.youtube.com/watch?v=A0000000001"),
+            call("https://www.youtube.com/watch?v=A0000000002"),
+            call("https://www.youtube.com/watch?v=B0000000000"),
+            call("https://www.youtube.com/watch?v=C0000000000"),
+            call("https://www.youtube.com/watch?v=D0000000000"),
+        ]
+        self.assertEqual(self.mock_browser.call_args_list, expected)
+        rows = self.cursor.execute("SELECT handle, known_id FROM KnownVideos ORDER BY handle").fetchall()
+        self.assertEqual(rows, [("ChannelA", "A0000000000"), ("ChannelB", "B0000000000"), ("ChannelC", "C0000000000"), ("ChannelD", "D0000000000")])
+
+    def testAsyncMissingChannel(self):
+        results = fetchVideos(iter(["NotAChannel"]), nosub.RunSettings(engine = nosub.constant_engines.ASYNC))
+        self.assertEqual(results, [("NotAChannel", None)])
+
+    def testAsyncChunkedGzipAndRedirect(self):
+        body = buildChannelPage("Videos", [videoItem("Z0000000000")])
+        self.stand_in.routes["/chunked"] = (200, gzip.compress(body), {"Transfer-Encoding": "chunked", "Content-Encoding": "gzip"})
+        self.stand_in.routes["/moved"] = (301, b"", {"Location": "/chunked"})
+        fetcher = nosub.AsyncFetcher()
+        try:
+            response = fetcher.submit(self.stand_in.base + "/moved").result()
+        finally:
+            fetcher.close()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, body)
+
+    def testAsyncReusesConnection(self):
+        fetcher = nosub.AsyncFetcher()
+        try:
+            for handle in self.handles:
+                fetcher.submit(self.stand_in.base + f"/@{handle}/videos").result()
+        finally:
+            fetcher.close()
+
+        self.assertEqual(len(self.stand_in.client_ports), 1)
+
+class SharedSessionTesting(unittest.TestCase):
+    def setUp(self):
+        self.stand_in = StandInServer()
+        for index in range(8):
+            self.stand_in.routes[f"/@Channel{index}/videos"] = (200, buildChannelPage("Videos", [videoItem(f"V{index:010d}")]), {})
+        patch("nosub.constant_yt", self.stand_in.channelConstants()).start()
+
+    def tearDown(self):
+        patch.stopall()
+        nosub.closeSession()
+        self.stand_in.close()
+
+    def testSessionIsShared(self):
+        session = nosub.openSession()
+        self.assertIs(nosub.getSession(), session)
+        nosub.closeSession()
+        self.assertIsNot(nosub.getSession(), session)
+
+    def testSerialHandlesReuseOneConnection(self):
+        nosub.openSession(2)
+        for index in range(4):
+            self.assertIsNotNone(nosub.obtainElements("videos", f"Channel{index}"))
+
+        self.assertEqual(nosub.connection_stats.new, 1)
+        self.assertEqual(nosub.connection_stats.reused(), 3)
+        self.assertEqual(len(self.stand_in.client_ports), 1)
+
+    def testThreadedHandlesStayWithinPool(self):
+        nosub.openSession(3)
+        handles = [f"Channel{index}" for index in range(8)]
+        results = fetchVideos(iter(handles), nosub.RunSettings(jobs = 3, pool_size = 3))
+        self.assertEqual(len(results), 8)
+        self.assertLessEqual(nosub.connection_stats.new, 3)
+        self.assertEqual(nosub.connection_stats.requests, 8)
+
+    def testOpeningSessionResetsCounts(self):
+        nosub.openSession()
+        nosub.obtainElements("videos", "Channel0")
+        nosub.openSession()
+        self.assertEqual(nosub.connection_stats.requests, 0)
+        self.assertEqual(nosub.connection_stats.new, 0)
+
+class ByteScannerTesting(unittest.TestCase):
+    items = [videoItem("AB7pBrudFbg", "2 days ago"), videoItem("lylCYkgC63Q", "1 week ago"), continuationItem()]
+
+    def testScanMatchesSoup(self):
+        page = buildChannelPage("Videos", self.items)
+        scanned = nosub.elementsFromPage("videos", "SomeTestHandle", 200, page, nosub.constant_extractors.SCAN)
+        souped = nosub.elementsFromPage("videos", "SomeTestHandle", 200, page, nosub.constant_extractors.SOUP)
+        self.assertEqual(scanned, self.items)
+        self.assertEqual(scanned, souped)
+
+    def testScanDoesNotBuildADom(self):
+        page = buildChannelPage("Videos", self.items)
+        with patch("nosub.BeautifulSoup", side_effect = Exception("Should not need a DOM")):
+            self.assertEqual(nosub.elementsFromPage("videos", "SomeTestHandle", 200, page), self.items)
+
+    def testScanWithoutSemicolon(self):
+        page = buildChannelPage("Videos", self.items).replace(b"};</script>", b"}</script>")
+        self.assertEqual(nosub.scanInitialData(page)[-1:], b"}")
+        self.assertEqual(nosub.elementsFromPage("videos", "SomeTestHandle", 200, page), self.items)
+
+    def testScanIgnoresMarkerOutsideScriptStart(self):
+        decoy = b"<script>window.note = \"var ytInitialData = {}\";</script>"
+        page = buildChannelPage("Videos", self.items).replace(b"</body>", decoy + b"</body>")
+        self.assertEqual(nosub.elementsFromPage("videos", "SomeTestHandle", 200, page), self.items)
+
+    def testScanFallsBackToSoup(self):
+        #the > in the attribute throws off the scanner, but not a real parser
+        page = buildChannelPage("Videos", self.items).replace(b"<script nonce=\"abc\">var ytInitialData", b"<script data-x=\"a>b\">var ytInitialData")
+        self.assertIsNone(nosub.scanInitialData(page))
+        self.assertEqual(nosub.elementsFromPage("videos", "SomeTestHandle", 200, page), self.items)
+
+    def testScanWithNoData(self):
+        page = b"<html><body><script>var other = 1;</script></body></html>"
+        self.assertIsNone(nosub.scanInitialData(page))
+        self.assertIsNone(nosub.elementsFromPage("videos", "SomeTestHandle", 200, page))
+
+class PartialDecodeTesting(unittest.TestCase):
+    items = [videoItem(f"V{index:010d}", f"{index + 1} days ago") for index in range(6)] + [continuationItem()]
+
+    def decodeBoth(self, page, tab = "videos", limit = nosub.constant_infs.NO_LIMIT):
+        full = nosub.elementsFromPage(tab, "SomeTestHandle", 200, page, decode = nosub.constant_decodes.FULL)
+        partial = nosub.elementsFromPage(tab, "SomeTestHandle", 200, page, decode = nosub.constant_decodes.PARTIAL, limit = limit)
+        return full, partial
+
+    def testPartialMatchesFull(self):
+        full, partial = self.decodeBoth(buildChannelPage("Videos", self.items))
+        self.assertEqual(full, self.items)
+        self.assertEqual(partial, full)
+
+    def testPartialOnlyDecodesLimit(self):
+        full, partial = self.decodeBoth(buildChannelPage("Videos", self.items), limit = 2)
+        self.assertEqual(partial, full[:2])
+
+    def testPartialWrongTab(self):
+        full, partial = self.decodeBoth(buildChannelPage("Releases", [releaseItem("OLAK5uy_mIg7sAsw6VFdUtKzOxlOWfJ9NU4ueknQ0", "Lmmfm_vya9Q")]))
+        self.assertIsNone(full)
+        self.assertIsNone(partial)
+
+    def testPartialMatchingTabWithoutContent(self):
+        page = buildChannelPage("Home", self.items).replace(b'"title": "Home"}', b'"title": "Videos"}', 1)
+        full, partial = self.decodeBoth(page)
+        self.assertIsNone(full)
+        self.assertIsNone(partial)
+
+    def testPartialEmptyContents(self):
+        full, partial = self.decodeBoth(buildChannelPage("Videos", []))
+        self.assertEqual(full, [])
+        self.assertEqual(partial, [])
+
+    def testPartialWithPrettyPrintedAndEscapedData(self):
+        data = {
+            "header": {"title": "tricky \"}]\\ text"},
+            "contents": {"twoColumnBrowseResultsRenderer": {"tabs": [
+                {"tabRenderer": {"endpoint": {"url": "/@x"}, "title": "Videos", "content": {"richGridRenderer": {"header": {}, "contents": self.items}}}},
+            ]}},
+        }
+        text = json.dumps(data, indent = 4)
+        self.assertEqual(nosub.partialTabContents(text, "Videos"), self.items)
+        self.assertEqual(nosub.partialTabContents(text.encode("utf-8"), "Videos", 3), self.items[:3])
+
+    def testPartialFallsBackWhenContentBeforeTitle(self):
+        data = {"contents": {"twoColumnBrowseResultsRenderer": {"tabs": [
+            {"tabRenderer": {"content": {"richGridRenderer": {"contents": self.items}}, "title": "Videos"}},
+        ]}}}
+        with self.assertRaises(nosub.PartialDecodeError):
+            nosub.partialTabContents(json.dumps(data), "Videos")
+
+        page = ("<html><script>var ytInitialData = " + json.dumps(data) + ";</script></html>").encode("utf-8")
+        full, partial = self.decodeBoth(page)
+        self.assertEqual(full, self.items)
+        self.assertEqual(partial, full)
+
+class SinglePassBothTesting(unittest.TestCase):
+    handles = ["ChannelA", "ChannelB", "ChannelC"]
+
+    def setUp(self):
+        create_tables = """
+        CREATE TABLE IF NOT EXISTS KnownVideos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            handle varchar(30) UNIQUE NOT NULL,
+            known_id varchar(11) UNIQUE NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS KnownReleases (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            handle varchar(30) UNIQUE NOT NULL,
+            known_id varchar(41) UNIQUE NOT NULL
+        );
+        """
+        setupRandomDB(self, create_tables)
+
+        self.pages = {}
+        for handle in self.handles:
+            letter = handle[-1]
+            videos = [videoItem(f"{letter}{index:010d}") for index in range(3)]
+            releases = [releaseItem(f"OLAK5uy_{letter}{index:032d}", f"{letter}R{index:09d}") for index in range(3)]
+            self.pages[f"https://www.youtube.com/@{handle}/videos"] = buildChannelPage("Videos", videos)
+            self.pages[f"https://www.youtube.com/@{handle}/releases"] = buildChannelPage("Releases", releases)
+
+        self.requested = []
+        self.in_flight = 0
+        self.most_in_flight = 0
+        self.lock = threading.Lock()
+
+        patch("requests.Session.get", side_effect = self.mockObtainHtmls).start()
+        self.mock_browser = patch("webbrowser.open_new_tab", return_value = None).start()
+        self.mock_connection = patch("nosub.connectToDB", side_effect = self.mockConnectionToRndDB).start()
+        patch("nosub.time.sleep", return_value = None).start()
+        patch("nosub.init", return_value = 0).start()
+
+    def tearDown(self):
+        patch.stopall()
+        nosub.closeSession()
+        tearDownRandomDB(self)
+
+    def mockConnectionToRndDB(self, *args, **kwargs):
+        args[0].connection = sqlite3.connect(self.connection_string)
+        args[0].status = nosub.ConnectionWrapper.OPEN
+
+    def mockObtainHtmls(self, *args, **kwargs):
+        with self.lock:
+            self.requested.append(args[0])
+            self.in_flight = self.in_flight + 1
+            self.most_in_flight = max(self.most_in_flight, self.in_flight)
+
+        threading.Event().wait(0.05)
+        with self.lock:
+            self.in_flight = self.in_flight - 1
+
+        return pageResponse(self.pages[args[0]])
+
+    def testBothFetchesEachTabOnceOverOneConnection(self):
+        sys.argv = ["nosub.py", "-f", writeHandleFile(self, self.handles), "-b"]
+        nosub.main()
+
+        self.assertEqual(sorted(self.requested), sorted(self.pages))
+        self.assertEqual(self.mock_connection.call_count, 1)
+        self.assertEqual(self.mock_browser.call_count, 6)
+        self.mock_browser.assert_has_calls([
+            call("https://www.youtube.com/watch?v=A0000000000"),
+            call("https://www.youtube.com/watch?v=AR000000000&list=OLAK5uy_A00000000000000000000000000000000"),
+            call("https://www.youtube.com/watch?v=B0000000000"),
+        ])
+
+        videos = self.cursor.execute("SELECT handle, known_id FROM KnownVideos ORDER BY handle").fetchall()
+        releases = self.cursor.execute("SELECT handle, known_id FROM KnownReleases ORDER BY handle").fetchall()
+        self.assertEqual(videos, [(handle, f"{handle[-1]}0000000000") for handle in self.handles])
+        self.assertEqual(releases, [(handle, f"OLAK5uy_{handle[-1]}{0:032d}") for handle in self.handles])
+
+    def testBothFetchesTabsAtTheSameTime(self):
+        nosub.verboseprint = lambda *a, **k: None
+        list(nosub.fetchTabs(("videos", "releases"), iter(self.handles), nosub.RunSettings()))
+        self.assertGreaterEqual(self.most_in_flight, 2)
+
+    def testFetchTabsKeepsTabOrder(self):
+        results = list(nosub.fetchTabs(("releases", "videos"), iter(self.handles), nosub.RunSettings(jobs = 2)))
+        self.assertEqual([handle for handle, _ in results], self.handles)
+        for handle, (releases, videos) in results:
+            self.assertIn("playlistRenderer", releases[0]["richItemRenderer"]["content"])
+            self.assertIn("videoRenderer", videos[0]["richItemRenderer"]["content"])
+
+class BatchedWriteTesting(unittest.TestCase):
+    create_tables = """
+    CREATE TABLE IF NOT EXISTS KnownVideos (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        handle varchar(30) UNIQUE NOT NULL,
+        known_id varchar(11) UNIQUE NOT NULL
+    );
+    """
+
+    #a file is used so a second connection only sees what was committed
+    def setUp(self):
+        self.db_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.db_dir.name, "knowns.db")
+        self.wrapper = nosub.ConnectionWrapper(sqlite3.connect(self.db_path, isolation_level = None), nosub.ConnectionWrapper.OPEN)
+        self.wrapper.connection.executescript(self.create_tables)
+        self.statements = []
+        self.wrapper.connection.set_trace_callback(self.statements.append)
+        self.reader = sqlite3.connect(self.db_path)
+
+    def tearDown(self):
+        self.reader.close()
+        if self.wrapper.status == nosub.ConnectionWrapper.OPEN:
+            self.wrapper.connection.close()
+        self.db_dir.cleanup()
+
+    def committedRows(self):
+        return self.reader.execute("SELECT COUNT(id) FROM KnownVideos").fetchone()[0]
+
+    def commits(self):
+        return self.statements.count("COMMIT")
+
+    def testWithoutBatchCommitsEachWrite(self):
+        for index in range(3):
+            nosub.addID(f"TestGuy{index}", f"AB7pBrudF{index:02d}", "KnownVideos", self.wrapper)
+            self.assertEqual(self.committedRows(), index + 1)
+
+    def testBatchCommitsBySize(self):
+        nosub.beginBatch(self.wrapper, size = 3, seconds = 3600)
+        for index in range(5):
+            nosub.addID(f"TestGuy{index}", f"AB7pBrudF{index:02d}", "KnownVideos", self.wrapper)
+
+        self.assertEqual(self.committedRows(), 3)
+        self.assertEqual(self.commits(), 1)
+
+        nosub.endBatch(self.wrapper)
+        self.assertEqual(self.committedRows(), 5)
+        self.assertEqual(self.commits(), 2)
+        self.assertIsNone(self.wrapper.batch)
+
+    def testBatchCommitsByTime(self):
+        nosub.beginBatch(self.wrapper, size = 100, seconds = 0)
+        nosub.addHandle("TestGuy1", "KnownVideos", self.wrapper)
+        self.assertEqual(self.committedRows(), 1)
+
+    def testCheckpointWaitsForTime(self):
+        nosub.beginBatch(self.wrapper, size = 100, seconds = 3600)
+        nosub.addID("TestGuy1", "AB7pBrudFbg", "KnownVideos", self.wrapper)
+        nosub.checkpointBatch(self.wrapper)
+        self.assertEqual(self.committedRows(), 0)
+        nosub.checkpointBatch(self.wrapper, force = True)
+        self.assertEqual(self.committedRows(), 1)
+
+    #what was opened before a failure should still be known
+    def testRunThatFailsKeepsEarlierWrites(self):
+        handles = ["ChannelA", "ChannelB", "ChannelC"]
+        pages = {f"https://www.youtube.com/@{handle}/videos": buildChannelPage("Videos", [videoItem(f"{handle[-1]}0000000000")]) for handle in handles}
+
+        def mockObtainHtmls(*args, **kwargs):
+            if args[0].endswith("@ChannelC/videos"):
+                raise Exception("Connection dropped")
+            return pageResponse(pages[args[0]])
+
+        def mockConnection(*args, **kwargs):
+            args[0].connection = sqlite3.connect(self.db_path, isolation_level = None)
+            args[0].status = nosub.ConnectionWrapper.OPEN
+
+        with patch("requests.Session.get", side_effect = mockObtainHtmls), patch("nosub.connectToDB", side_effect = mockConnection), \
+             patch("webbrowser.open_new_tab", return_value = None), patch("nosub.time.sleep", return_value = None):
+            with self.assertRaises(Exception):
+                nosub.normalExec([writeHandleFile(self, handles)], nosub.constant_infs.LOAD_TO_KNOWN, nosub.constant_infs.NO_LIMIT)
+
+        rows = self.reader.execute("SELECT handle, known_id FROM KnownVideos ORDER BY handle").fetchall()
+        self.assertEqual(rows, [("ChannelA", "A0000000000"), ("ChannelB", "B0000000000")])
+
+class KnownIndexTesting(unittest.TestCase):
+    def setUp(self):
+        self.wrapper = nosub.ConnectionWrapper(sqlite3.connect(":memory:", isolation_level = None), nosub.ConnectionWrapper.OPEN)
+        self.wrapper.connection.executescript(BatchedWriteTesting.create_tables)
+        self.wrapper.connection.execute("INSERT INTO KnownVideos (handle, known_id) VALUES ('TestGuy1', 'AB7pBrudFbg')")
+        self.statements = []
+        self.wrapper.connection.set_trace_callback(self.statements.append)
+
+    def tearDown(self):
+        self.wrapper.connection.close()
+
+    def selects(self):
+        return [statement for statement in self.statements if statement.startswith("SELECT")]
+
+    def testLookupsAfterLoadDoNotQuery(self):
+        nosub.loadKnowns("KnownVideos", self.wrapper)
+        self.assertEqual(len(self.selects()), 1)
+
+        self.assertTrue(nosub.findHandle("TestGuy1", "KnownVideos", self.wrapper))
+        self.assertFalse(nosub.findHandle("TestGuy2", "KnownVideos", self.wrapper))
+        self.assertTrue(nosub.findID("TestGuy1", "AB7pBrudFbg", "KnownVideos", self.wrapper))
+        self.assertFalse(nosub.findID("TestGuy1", "NotKnown123", "KnownVideos", self.wrapper))
+        self.assertEqual(len(self.selects()), 1)
+
+    def testWritesKeepIndexInStep(self):
+        nosub.loadKnowns("KnownVideos", self.wrapper)
+        nosub.addHandle("TestGuy2", "KnownVideos", self.wrapper)
+        self.assertTrue(nosub.findHandle("TestGuy2", "KnownVideos", self.wrapper))
+
+        nosub.addID("TestGuy2", "0123456789a", "KnownVideos", self.wrapper)
+        nosub.addID("TestGuy1", "ZYXWVUTSRQP", "KnownVideos", self.wrapper)
+        self.assertTrue(nosub.findID("TestGuy2", "0123456789a", "KnownVideos", self.wrapper))
+        self.assertTrue(nosub.findID("TestGuy1", "ZYXWVUTSRQP", "KnownVideos", self.wrapper))
+        self.assertFalse(nosub.findID("TestGuy1", "AB7pBrudFbg", "KnownVideos", self.wrapper))
+
+        rows = self.wrapper.connection.execute("SELECT handle, known_id FROM KnownVideos ORDER BY handle").fetchall()
+        self.assertEqual(dict(rows), self.wrapper.knowns["KnownVideos"])
+
+    #tables that weren't loaded still go to the database
+    def testUnloadedTableStillQueries(self):
+        self.assertTrue(nosub.findHandle("TestGuy1", "KnownVideos", self.wrapper))
+        self.assertEqual(len(self.selects()), 1)
+
+class UpsertTesting(unittest.TestCase):
+    def setUp(self):
+        self.wrapper = nosub.ConnectionWrapper(sqlite3.connect(":memory:", isolation_level = None), nosub.ConnectionWrapper.OPEN)
+        self.wrapper.connection.executescript(BatchedWriteTesting.create_tables)
+        self.statements = []
+        self.wrapper.connection.set_trace_callback(self.statements.append)
+
+    def tearDown(self):
+        self.wrapper.connection.close()
+
+    def rows(self):
+        return self.wrapper.connection.execute("SELECT handle, known_id FROM KnownVideos ORDER BY handle").fetchall()
+
+    def testAddAndUpdateAreOneStatement(self):
+        nosub.addID("TestGuy1", "AB7pBrudFbg", "KnownVideos", self.wrapper)
+        nosub.addID("TestGuy1", "0123456789a", "KnownVideos", self.wrapper)
+        self.assertEqual(len(self.statements), 2)
+        self.assertTrue(all(statement.startswith("INSERT") for statement in self.statements))
+        self.assertEqual(self.rows(), [("TestGuy1", "0123456789a")])
+
+    def testBulkAdd(self):
+        nosub.addID("TestGuy1", "AB7pBrudFbg", "KnownVideos", self.wrapper)
+        entries = [("TestGuy1", "0123456789a"), ("TestGuy2", "ZYXWVUTSRQP"), ("TestGuy3", "abcdefghijk")]
+        self.assertEqual(nosub.addIDs(entries, "KnownVideos", self.wrapper), 0)
+        self.assertEqual(self.rows(), entries)
+
+    def testBulkAddRejectsGarbage(self):
+        entries = [("TestGuy1", "0123456789a"), ("TestGuy2", "bad id")]
+        with patch("sys.stderr", new = io.StringIO()):
+            self.assertEqual(nosub.addIDs(entries, "KnownVideos", self.wrapper), -1)
+        self.assertEqual(self.rows(), [])
+
+    def testBulkAddDuplicateIdExits(self):
+        entries = [("TestGuy1", "0123456789a"), ("TestGuy2", "0123456789a")]
+        with patch("sys.stderr", new = io.StringIO()):
+            with self.assertRaises(SystemExit):
+                nosub.addIDs(entries, "KnownVideos", self.wrapper)
+        self.assertEqual(self.rows(), [])
+
+    def testBulkAddCountsTowardBatch(self):
+        nosub.beginBatch(self.wrapper, size = 3, seconds = 3600)
+        nosub.addIDs([("TestGuy1", "0123456789a"), ("TestGuy2", "ZYXWVUTSRQP")], "KnownVideos", self.wrapper)
+        self.assertEqual(self.wrapper.batch.pending, 2)
+        nosub.addID("TestGuy3", "abcdefghijk", "KnownVideos", self.wrapper)
+        self.assertEqual(self.wrapper.batch.pending, 0)
+        nosub.endBatch(self.wrapper)
+
+class DBProfileTesting(unittest.TestCase):
+    def setUp(self):
+        self.start_dir = os.getcwd()
+        self.db_dir = tempfile.TemporaryDirectory()
+        os.chdir(self.db_dir.name)
+        self.wrapper = nosub.ConnectionWrapper()
+
+    def tearDown(self):
+        nosub.closeConnection(self.wrapper)
+        os.chdir(self.start_dir)
+        self.db_dir.cleanup()
+
+    def pragma(self, name):
+        return self.wrapper.connection.execute(f"PRAGMA {name}").fetchone()[0]
+
+    def testDefaultLeavesJournal(self):
+        nosub.connectToDB(self.wrapper, nosub.dbPragmas())
+        self.assertEqual(self.pragma("journal_mode"), "delete")
+
+    def testFastProfile(self):
+        nosub.connectToDB(self.wrapper, nosub.dbPragmas(nosub.constant_db_profiles.FAST))
+        self.assertEqual(self.pragma("journal_mode"), "wal")
+        #NORMAL
+        self.assertEqual(self.pragma("synchronous"), 1)
+        self.assertEqual(self.pragma("cache_size"), -16384)
+
+    def testSizesReplaceProfile(self):
+        pragmas = dict(nosub.dbPragmas(nosub.constant_db_profiles.FAST, mmap_size = 0, cache_size = 2048))
+        self.assertEqual(pragmas["mmap_size"], 0)
+        self.assertEqual(pragmas["cache_size"], -2048)
+        self.assertEqual(pragmas["journal_mode"], "WAL")
+
+        nosub.connectToDB(self.wrapper, nosub.dbPragmas(cache_size = 2048))
+        self.assertEqual(self.pragma("cache_size"), -2048)
+        self.assertEqual(self.pragma("journal_mode"), "delete")
+
+    def testUnknownPragma(self):
+        with self.assertRaises(AssertionError):
+            nosub.connectToDB(self.wrapper, (("foreign_keys", "ON"),))
+
+#the known id going away from a page shouldn't make the rest of it look new
+class SeenHistoryTesting(unittest.TestCase):
+    def setUp(self):
+        create_tables = """
+        CREATE TABLE IF NOT EXISTS KnownVideos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            handle varchar(30) UNIQUE NOT NULL,
+            known_id varchar(11) UNIQUE NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS KnownReleases (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            handle varchar(30) UNIQUE NOT NULL,
+            known_id varchar(41) UNIQUE NOT NULL
+        );
+        """
+        setupRandomDB(self, create_tables)
+        self.videos = [videoItem(f"A{index:010d}", f"{index + 1} days ago") for index in range(5)]
+        self.releases = [releaseItem(f"OLAK5uy_A{index:032d}", f"AR{index:09d}") for index in range(5)]
+
+        patch("requests.Session.get", side_effect = self.mockObtainHtmls).start()
+        self.mock_browser = patch("webbrowser.open_new_tab", return_value = None).start()
+        patch("nosub.connectToDB", side_effect = self.mockConnectionToRndDB).start()
+        patch("nosub.time.sleep", return_value = None).start()
+        nosub.verboseprint = lambda *a, **k: None
+        self.handle_file = writeHandleFile(self, ["ChannelA"])
+
+    def tearDown(self):
+        patch.stopall()
+        tearDownRandomDB(self)
+
+    def mockConnectionToRndDB(self, *args, **kwargs):
+        args[0].connection = sqlite3.connect(self.connection_string)
+        args[0].status = nosub.ConnectionWrapper.OPEN
+
+    def mockObtainHtmls(self, *args, **kwargs):
+        if args[0].endswith("/videos"):
+            return pageResponse(buildChannelPage("Videos", self.videos))
+        return pageResponse(buildChannelPage("Releases", self.releases))
+
+    def testDeletedKnownVideoStopsAtSeen(self):
+        nosub.normalExec([self.handle_file], nosub.constant_infs.LOAD_TO_KNOWN, nosub.constant_infs.NO_LIMIT)
+        self.assertEqual(self.mock_browser.call_count, 1)
+
+        #newest video taken down and one new upload under the next
+        self.videos = [videoItem("A9999999999", "1 hour ago")] + self.videos[1:]
+        self.mock_browser.reset_mock()
+        nosub.normalExec([self.handle_file], nosub.constant_infs.LOAD_TO_KNOWN, nosub.constant_infs.NO_LIMIT)
+        self.assertEqual(self.mock_browser.call_args_list, [call("https://www.youtube.com/watch?v=A9999999999")])
+
+        #known id is deleted with nothing new above it
+        self.videos = self.videos[1:]
+        self.mock_browser.reset_mock()
+        nosub.normalExec([self.handle_file], nosub.constant_infs.LOAD_TO_KNOWN, nosub.constant_infs.NO_LIMIT)
+        self.mock_browser.assert_not_called()
+
+    #an upload -t stopped before isn't seen so a wider -t still opens it
+    def testNarrowTimeFrameLeavesNewUploadUnseen(self):
+        nosub.normalExec([self.handle_file], nosub.constant_infs.LOAD_TO_KNOWN, nosub.constant_infs.NO_LIMIT)
+        self.videos = [videoItem("A9999999999", "3 days ago")] + self.videos
+        self.mock_browser.reset_mock()
+        nosub.normalExec([self.handle_file], 60 * 24, nosub.constant_infs.NO_LIMIT)
+        self.mock_browser.assert_not_called()
+
+        nosub.normalExec([self.handle_file], 60 * 24 * 7, nosub.constant_infs.NO_LIMIT)
+        self.assertEqual(self.mock_browser.call_args_list, [call("https://www.youtube.com/watch?v=A9999999999")])
+
+    def testDeletedKnownReleaseStopsAtSeen(self):
+        nosub.releaseExec([self.handle_file], nosub.constant_infs.NO_LIMIT)
+        self.releases = self.releases[1:]
+        self.mock_browser.reset_mock()
+        nosub.releaseExec([self.handle_file], nosub.constant_infs.NO_LIMIT)
+        self.mock_browser.assert_not_called()
+
+    def testHistoryKeepsNewest(self):
+        self.videos = [videoItem(f"A{index:010d}", f"{index + 1} days ago") for index in range(nosub.seen_tables.HISTORY_SIZE + 5)]
+        nosub.normalExec([self.handle_file], nosub.constant_infs.LOAD_TO_KNOWN, nosub.constant_infs.NO_LIMIT)
+        self.videos = [videoItem("A9999999999", "1 hour ago")] + self.videos
+        nosub.normalExec([self.handle_file], nosub.constant_infs.LOAD_TO_KNOWN, nosub.constant_infs.NO_LIMIT)
+
+        rows = self.cursor.execute("SELECT seen_id FROM SeenVideos WHERE handle = 'ChannelA' ORDER BY id DESC").fetchall()
+        self.assertEqual(len(rows), nosub.seen_tables.HISTORY_SIZE)
+        self.assertEqual(rows[0][0], "A9999999999")
+        self.assertEqual(rows[-1][0], f"A{nosub.seen_tables.HISTORY_SIZE - 2:010d}")
+
+#channels answer with 304 when the validators sent match their current page
+class ConditionalRequestTesting(unittest.TestCase):
+    handles = ["ChannelA", "ChannelB", "ChannelC"]
+
+    def setUp(self):
+        create_tables = """
+        CREATE TABLE IF NOT EXISTS KnownVideos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            handle varchar(30) UNIQUE NOT NULL,
+            known_id varchar(11) UNIQUE NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS KnownReleases (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            handle varchar(30) UNIQUE NOT NULL,
+            known_id varchar(41) UNIQUE NOT NULL
+        );
+        """
+        setupRandomDB(self, create_tables)
+
+        self.stand_in = StandInServer()
+        self.versions = {}
+        for handle in self.handles:
+            self.setPage(handle, 1)
+            letter = handle[-1]
+            releases = buildChannelPage("Releases", [releaseItem(f"OLAK5uy_{letter}{0:032d}", f"{letter}R{0:09d}")])
+            #releases only give a last-modified date
+            self.stand_in.routes[f"/@{handle}/releases"] = self.conditionalRoute(releases, {"Last-Modified": "Wed, 21 Oct 2015 07:28:00 GMT"})
+
+        patch("nosub.constant_yt", self.stand_in.channelConstants()).start()
+        self.mock_browser = patch("webbrowser.open_new_tab", return_value = None).start()
+        patch("nosub.connectToDB", side_effect = self.mockConnectionToRndDB).start()
+        patch("nosub.time.sleep", return_value = None).start()
+        nosub.verboseprint = lambda *a, **k: None
+        nosub.openSession()
+        self.handle_file = writeHandleFile(self, self.handles)
+
+    def tearDown(self):
+        patch.stopall()
+        nosub.closeSession()
+        self.stand_in.close()
+        tearDownRandomDB(self)
+
+    def mockConnectionToRndDB(self, *args, **kwargs):
+        args[0].connection = sqlite3.connect(self.connection_string)
+        args[0].status = nosub.ConnectionWrapper.OPEN
+
+    def conditionalRoute(self, body, validators):
+        def route(handler):
+            if "ETag" in validators and handler.headers.get("If-None-Match") == validators["ETag"]:
+                return (304, b"", validators)
+            if "Last-Modified" in validators and handler.headers.get("If-Modified-Since") == validators["Last-Modified"]:
+                return (304, b"", validators)
+            return (200, body, validators)
+        return route
+
+    def setPage(self, handle, version):
+        letter = handle[-1]
+        #every version adds one upload on top of the ones before it
+        items = [videoItem(f"{letter}{version - index:02d}00000000", f"{index + 1} days ago") for index in range(version)]
+        self.stand_in.routes[f"/@{handle}/videos"] = self.conditionalRoute(buildChannelPage("Videos", items), {"ETag": f'"{handle}-{version}"'})
+
+    def sentConditions(self):
+        return [(path, headers.get("If-None-Match"), headers.get("If-Modified-Since")) for path, headers in self.stand_in.requests]
+
+    def testUnchangedHandlesAreSkipped(self):
+        nosub.normalExec([self.handle_file], nosub.constant_infs.LOAD_TO_KNOWN, nosub.constant_infs.NO_LIMIT)
+        self.assertEqual(self.mock_browser.call_count, 3)
+        self.assertEqual(nosub.connection_stats.skipped, 0)
+        self.assertTrue(all(match is None for _, match, _ in self.sentConditions()))
+
+        self.setPage("ChannelB", 2)
+        self.stand_in.requests.clear()
+        self.mock_browser.reset_mock()
+        nosub.normalExec([self.handle_file], nosub.constant_infs.LOAD_TO_KNOWN, nosub.constant_infs.NO_LIMIT)
+        self.assertEqual(self.mock_browser.call_args_list, [call("https://www.youtube.com/watch?v=B0200000000")])
+        self.assertEqual(nosub.connection_stats.skipped, 2)
+        self.assertEqual([match for _, match, _ in self.sentConditions()], ['"ChannelA-1"', '"ChannelB-1"', '"ChannelC-1"'])
+
+        rows = self.cursor.execute("SELECT handle, etag FROM HttpValidators WHERE tab = 'videos' ORDER BY handle").fetchall()
+        self.assertEqual(rows, [("ChannelA", '"ChannelA-1"'), ("ChannelB", '"ChannelB-2"'), ("ChannelC", '"ChannelC-1"')])
+
+    def testLastModifiedWithAsyncEngine(self):
+        settings = nosub.RunSettings(jobs = 3, engine = nosub.constant_engines.ASYNC)
+        nosub.releaseExec([self.handle_file], nosub.constant_infs.NO_LIMIT, settings)
+        self.assertEqual(self.mock_browser.call_count, 3)
+
+        self.stand_in.requests.clear()
+        self.mock_browser.reset_mock()
+        nosub.openSession()
+        nosub.releaseExec([self.handle_file], nosub.constant_infs.NO_LIMIT, settings)
+        self.mock_browser.assert_not_called()
+        self.assertEqual(nosub.connection_stats.skipped, 3)
+        self.assertEqual({since for _, _, since in self.sentConditions()}, {"Wed, 21 Oct 2015 07:28:00 GMT"})
+
+    #a page with an upload -t stopped before is read in full again so a wider -t finds it
+    def testNarrowTimeFrameDoesNotKeepValidators(self):
+        nosub.normalExec([self.handle_file], nosub.constant_infs.LOAD_TO_KNOWN, nosub.constant_infs.NO_LIMIT)
+        self.setPage("ChannelA", 2)
+        self.mock_browser.reset_mock()
+        nosub.normalExec([self.handle_file], 60, nosub.constant_infs.NO_LIMIT)
+        self.mock_browser.assert_not_called()
+
+        nosub.normalExec([self.handle_file], 60 * 24 * 2, nosub.constant_infs.NO_LIMIT)
+        self.assertEqual(self.mock_browser.call_args_list, [call("https://www.youtube.com/watch?v=A0200000000")])
+        rows = self.cursor.execute("SELECT etag FROM HttpValidators WHERE handle = 'ChannelA' AND tab = 'videos'").fetchall()
+        self.assertEqual(rows, [('"ChannelA-2"',)])
+
+    #a 304 without a Content-Length still has no body to wait for
+    def testBare304WithAsyncEngine(self):
+        settings = nosub.RunSettings(jobs = 3, engine = nosub.constant_engines.ASYNC, retry = nosub.RetryPolicy(read_timeout = 2))
+        nosub.normalExec([self.handle_file], nosub.constant_infs.LOAD_TO_KNOWN, nosub.constant_infs.NO_LIMIT, settings)
+
+        def bare304(handler):
+            handler.send_response(304)
+            handler.end_headers()
+        for handle in self.handles:
+            self.stand_in.routes[f"/@{handle}/videos"] = bare304
+        self.mock_browser.reset_mock()
+        nosub.connection_stats.reset()
+        started = time.monotonic()
+        nosub.normalExec([self.handle_file], nosub.constant_infs.LOAD_TO_KNOWN, nosub.constant_infs.NO_LIMIT, settings)
+
+        self.assertLess(time.monotonic() - started, 1)
+        self.mock_browser.assert_not_called()
+        self.assertEqual(nosub.connection_stats.skipped, 3)
+        self.assertEqual(nosub.connection_stats.takeFailures(), OrderedDict())
+
+    #a handle is only skipped when none of its tabs changed
+    def testBothSkipsOnlyWhenEveryTabIsUnchanged(self):
+        nosub.bothExec([self.handle_file], nosub.constant_infs.LOAD_TO_KNOWN, nosub.constant_infs.NO_LIMIT)
+        self.setPage("ChannelC", 2)
+        self.mock_browser.reset_mock()
+        nosub.openSession()
+        nosub.bothExec([self.handle_file], nosub.constant_infs.LOAD_TO_KNOWN, nosub.constant_infs.NO_LIMIT)
+        self.assertEqual(self.mock_browser.call_args_list, [call("https://www.youtube.com/watch?v=C0200000000")])
+        self.assertEqual(nosub.connection_stats.skipped, 2)
+
+    #validators aren't kept when the page couldn't be read
+    def testUnreadablePageIsNotRemembered(self):
+        self.stand_in.routes["/@ChannelA/videos"] = self.conditionalRoute(b"<html>nothing here</html>", {"ETag": '"broken"'})
+        with patch("sys.stderr", new = io.StringIO()):
+            nosub.normalExec([self.handle_file], nosub.constant_infs.LOAD_TO_KNOWN, nosub.constant_infs.NO_LIMIT)
+        rows = self.cursor.execute("SELECT handle FROM HttpValidators ORDER BY handle").fetchall()
+        self.assertEqual(rows, [("ChannelB",), ("ChannelC",)])
+
+class PageCacheTesting(unittest.TestCase):
+    handles = ["ChannelA", "ChannelB"]
+
+    def setUp(self):
+        create_videos = """
+        CREATE TABLE IF NOT EXISTS KnownVideos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            handle varchar(30) UNIQUE NOT NULL,
+            known_id varchar(11) UNIQUE NOT NULL
+        );
+        """
+        setupRandomDB(self, create_videos)
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.pages = {}
+        for handle in self.handles:
+            letter = handle[-1]
+            items = [videoItem(f"{letter}{index:010d}", f"{index + 1} days ago") for index in range(3)]
+            self.pages[f"https://www.youtube.com/@{handle}/videos"] = buildChannelPage("Videos", items)
+
+        self.mock_request = patch("requests.Session.get", side_effect = self.mockObtainHtmls).start()
+        self.mock_browser = patch("webbrowser.open_new_tab", return_value = None).start()
+        patch("nosub.connectToDB", side_effect = self.mockConnectionToRndDB).start()
+        patch("nosub.time.sleep", return_value = None).start()
+        nosub.verboseprint = lambda *a, **k: None
+        self.handle_file = writeHandleFile(self, self.handles)
+
+    def tearDown(self):
+        patch.stopall()
+        self.cache_dir.cleanup()
+        tearDownRandomDB(self)
+
+    def mockConnectionToRndDB(self, *args, **kwargs):
+        args[0].connection = sqlite3.connect(self.connection_string)
+        args[0].status = nosub.ConnectionWrapper.OPEN
+
+    def mockObtainHtmls(self, *args, **kwargs):
+        return pageResponse(self.pages[args[0]])
+
+    def settings(self, **kwargs):
+        return nosub.RunSettings(cache_dir = self.cache_dir.name, **kwargs)
+
+    def testWarmRunSkipsDownload(self):
+        first = fetchVideos(iter(self.handles), self.settings(cache_ttl = 600))
+        self.assertEqual(self.mock_request.call_count, 2)
+
+        #a changed page isn't seen while the cached one is fresh
+        self.pages["https://www.youtube.com/@ChannelA/videos"] = buildChannelPage("Videos", [videoItem("A9999999999")])
+        second = fetchVideos(iter(self.handles), self.settings(cache_ttl = 600, jobs = 2))
+        self.assertEqual(self.mock_request.call_count, 2)
+        self.assertEqual(first, second)
+
+    def testAsyncEngineUsesCache(self):
+        fetchVideos(iter(self.handles), self.settings(cache_ttl = 600))
+        with patch("nosub.AsyncFetcher.submit") as mock_submit:
+            results = fetchVideos(iter(self.handles), self.settings(cache_ttl = 600, engine = nosub.constant_engines.ASYNC))
+        mock_submit.assert_not_called()
+        self.assertEqual([handle for handle, _ in results], self.handles)
+
+    def testExpiredEntryIsFetched(self):
+        fetchVideos(iter(self.handles), self.settings(cache_ttl = 600))
+        later = nosub.time.time() + 601
+        with patch("nosub.time.time", return_value = later):
+            fetchVideos(iter(self.handles), self.settings(cache_ttl = 600))
+        self.assertEqual(self.mock_request.call_count, 4)
+
+    #a partial decode cut short by -n can't answer a run without a limit
+    def testSmallerLimitIsNotReused(self):
+        settings = self.settings(cache_ttl = 600, decode = nosub.constant_decodes.PARTIAL)
+        fetchVideos(iter(self.handles), settings, 1)
+        fetchVideos(iter(self.handles), settings, 1)
+        self.assertEqual(self.mock_request.call_count, 2)
+        results = fetchVideos(iter(self.handles), settings)
+        self.assertEqual(self.mock_request.call_count, 4)
+        self.assertEqual(len(results[0][1]), 3)
+
+    def testOfflineRunsFromCache(self):
+        with patch("sys.stderr", new = io.StringIO()) as fake_err:
+            nosub.normalExec([self.handle_file], nosub.constant_infs.LOAD_TO_KNOWN, nosub.constant_infs.NO_LIMIT, self.settings(offline = True))
+        self.mock_request.assert_not_called()
+        self.mock_browser.assert_not_called()
+        self.assertIn("No cached videos for handle ChannelA", fake_err.getvalue())
+
+        fetchVideos(iter(self.handles), self.settings(cache_ttl = 600))
+        with patch("nosub.time.time", return_value = nosub.time.time() + 10 ** 6):
+            nosub.normalExec([self.handle_file], nosub.constant_infs.LOAD_TO_KNOWN, nosub.constant_infs.NO_LIMIT, self.settings(offline = True))
+        self.assertEqual(self.mock_request.call_count, 2)
+        self.assertEqual(self.mock_browser.call_args_list, [call("https://www.youtube.com/watch?v=A0000000000"), call("https://www.youtube.com/watch?v=B0000000000")])
+
+    def testLeastRecentlyUsedIsEvicted(self):
+        contents = [videoItem(f"A{index:010d}") for index in range(3)]
+        cache = nosub.PageCache(self.cache_dir.name, 600, 1)
+        cache.put("ChannelA", "videos", nosub.constant_infs.NO_LIMIT, contents)
+        entry_size = cache.total
+        cache.max_bytes = entry_size * 2 + entry_size // 2
+
+        cache.put("ChannelB", "videos", nosub.constant_infs.NO_LIMIT, contents)
+        self.assertIsNotNone(cache.get("ChannelA", "videos"))
+        cache.put("ChannelC", "videos", nosub.constant_infs.NO_LIMIT, contents)
+
+        self.assertIsNotNone(cache.get("ChannelA", "videos"))
+        self.assertIsNone(cache.get("ChannelB", "videos"))
+        self.assertIsNotNone(cache.get("ChannelC", "videos"))
+        self.assertEqual(len(os.listdir(self.cache_dir.name)), 2)
+
+        #usage order survives into the next run through the file times
+        reopened = nosub.PageCache(self.cache_dir.name, 600, 1)
+        self.assertEqual(reopened.total, cache.total)
+        self.assertEqual(set(reopened.used), set(cache.used))
+
+class HandlePlanningTesting(unittest.TestCase):
+    def setUp(self):
+        nosub.verboseprint = lambda *a, **k: None
+
+    def testDuplicatesAcrossFilesAndCase(self):
+        first = writeHandleFile(self, ["MrBeast", "veritasium", "smartereveryday"])
+        second = writeHandleFile(self, ["Veritasium", "mrbeast", "TomScott", "veritasium"])
+        with patch("sys.stderr", new = io.StringIO()) as fake_err:
+            planned = nosub.planHandles([first, second])
+
+        self.assertEqual(planned, ["MrBeast", "veritasium", "smartereveryday", "TomScott"])
+        report = fake_err.getvalue().splitlines()
+        self.assertEqual(len(report), 3)
+        self.assertIn(f"Handle \"Veritasium\" in {second} is already listed as \"veritasium\" in {first}", report[0])
+
+    #each channel should only be fetched and opened once
+    def testExecutionFetchesOnce(self):
+        create_videos = """
+        CREATE TABLE IF NOT EXISTS KnownVideos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            handle varchar(30) UNIQUE NOT NULL,
+            known_id varchar(11) UNIQUE NOT NULL
+        );
+        """
+        setupRandomDB(self, create_videos)
+        self.addCleanup(tearDownRandomDB, self)
+
+        def mockConnection(*args, **kwargs):
+            args[0].connection = sqlite3.connect(self.connection_string)
+            args[0].status = nosub.ConnectionWrapper.OPEN
+
+        page = buildChannelPage("Videos", [videoItem("A0000000000")])
+        handle_files = [writeHandleFile(self, ["ChannelA"]), writeHandleFile(self, ["channela", "CHANNELA"])]
+        with patch("requests.Session.get", return_value = pageResponse(page)) as mock_request, patch("nosub.connectToDB", side_effect = mockConnection), \
+             patch("webbrowser.open_new_tab", return_value = None) as mock_browser, patch("nosub.time.sleep", return_value = None), patch("sys.stderr", new = io.StringIO()):
+            nosub.normalExec(handle_files, nosub.constant_infs.LOAD_TO_KNOWN, nosub.constant_infs.NO_LIMIT)
+
+        self.assertEqual(mock_request.call_count, 1)
+        self.assertEqual(mock_browser.call_count, 1)
+        rows = self.cursor.execute("SELECT handle FROM KnownVideos").fetchall()
+        self.assertEqual(rows, [("ChannelA",)])
+
+    #a later run with another spelling finds what the first run stored
+    def testOtherSpellingInLaterRun(self):
+        create_videos = """
+        CREATE TABLE IF NOT EXISTS KnownVideos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            handle varchar(30) UNIQUE NOT NULL,
+            known_id varchar(11) UNIQUE NOT NULL
+        );
+        """
+        setupRandomDB(self, create_videos)
+        self.addCleanup(tearDownRandomDB, self)
+
+        def mockConnection(*args, **kwargs):
+            args[0].connection = sqlite3.connect(self.connection_string)
+            args[0].status = nosub.ConnectionWrapper.OPEN
+
+        pages = [buildChannelPage("Videos", [videoItem("A0000000000")]), buildChannelPage("Videos", [videoItem("A0000000001"), videoItem("A0000000000")])]
+        with patch("requests.Session.get", side_effect = [pageResponse(page) for page in pages]) as mock_request, patch("nosub.connectToDB", side_effect = mockConnection), \
+             patch("webbrowser.open_new_tab", return_value = None) as mock_browser, patch("nosub.time.sleep", return_value = None):
+            nosub.normalExec([writeHandleFile(self, ["MrBeast"])], nosub.constant_infs.LOAD_TO_KNOWN, nosub.constant_infs.NO_LIMIT)
+            nosub.normalExec([writeHandleFile(self, ["mrbeast"])], nosub.constant_infs.LOAD_TO_KNOWN, nosub.constant_infs.NO_LIMIT)
+
+        self.assertEqual(mock_request.call_args_list[1].args[0], "https://www.youtube.com/@MrBeast/videos")
+        self.assertEqual(mock_browser.call_args_list[-1], call("https://www.youtube.com/watch?v=A0000000001"))
+        rows = self.cursor.execute("SELECT handle, known_id FROM KnownVideos").fetchall()
+        self.assertEqual(rows, [("MrBeast", "A0000000001")])
+
+class FeedSourceTesting(unittest.TestCase):
+    channel_id = "UCsXVk37bltHxD1rDPwtNM8Q"
+
+    def setUp(self):
+        create_tables = """
+        CREATE TABLE IF NOT EXISTS KnownVideos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            handle varchar(30) UNIQUE NOT NULL,
+            known_id varchar(11) UNIQUE NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS KnownReleases (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            handle varchar(30) UNIQUE NOT NULL,
+            known_id varchar(41) UNIQUE NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS ChannelIds (
+            handle varchar(30) PRIMARY KEY,
+            channel_id varchar(24) NOT NULL
+        );
+        """
+        setupRandomDB(self, create_tables)
+
+        self.stand_in = StandInServer()
+        items = [videoItem(f"A{index:010d}", f"{index + 1} days ago") for index in range(3)]
+        self.stand_in.routes["/@ChannelA/videos"] = (200, buildChannelPage("Videos", items, self.channel_id), {})
+        self.feed_path = f"/feeds/videos.xml?channel_id={self.channel_id}"
+        self.stand_in.routes[self.feed_path] = (200, buildFeed(self.channel_id, [
+            ("S0000000000", feedTime(10), True),
+            ("F0000000000", feedTime(90), False),
+            ("F0000000001", feedTime(60 * 30), False),
+            ("A0000000000", feedTime(60 * 24 * 2), False),
+        ]), {})
+
+        patch("nosub.constant_yt", self.stand_in.channelConstants()).start()
+        self.mock_browser = patch("webbrowser.open_new_tab", return_value = None).start()
+        patch("nosub.connectToDB", side_effect = self.mockConnectionToRndDB).start()
+        patch("nosub.time.sleep", return_value = None).start()
+        nosub.verboseprint = lambda *a, **k: None
+        nosub.openSession()
+        self.settings = nosub.RunSettings(source = nosub.constant_sources.FEED)
+
+    def tearDown(self):
+        patch.stopall()
+        nosub.closeSession()
+        self.stand_in.close()
+        tearDownRandomDB(self)
+
+    def mockConnectionToRndDB(self, *args, **kwargs):
+        args[0].connection = sqlite3.connect(self.connection_string)
+        args[0].status = nosub.ConnectionWrapper.OPEN
+
+    def paths(self):
+        return [path for path, _ in self.stand_in.requests]
+
+    def testFeedElementsSkipShorts(self):
+        elements = nosub.elementsFromFeed(self.stand_in.routes[self.feed_path][1])
+        ids = [element["richItemRenderer"]["content"]["videoRenderer"]["videoId"] for element in elements]
+        self.assertEqual(ids, ["F0000000000", "F0000000001", "A0000000000"])
+        published = elements[0]["richItemRenderer"]["content"]["videoRenderer"]["publishedAt"]
+        self.assertAlmostEqual(published, time.time() - 90 * 60, delta = 5)
+
+        self.assertIsNone(nosub.elementsFromFeed(b"<html>not a feed</html>"))
+        self.assertIsNone(nosub.elementsFromFeed(buildFeed(self.channel_id, [("S0000000000", feedTime(1), True)])))
+
+    #the page is read until the channel id is known, then only the feed
+    def testPageTeachesChannelId(self):
+        channel_ids = {}
+        first = fetchVideos(iter(["ChannelA"]), self.settings, channel_ids = channel_ids)
+        self.assertEqual(channel_ids, {"ChannelA": self.channel_id})
+        self.assertEqual(self.paths(), ["/@ChannelA/videos"])
+        self.assertEqual(len(first[0][1]), 3)
+
+        self.stand_in.requests.clear()
+        second = fetchVideos(iter(["ChannelA"]), self.settings, channel_ids = channel_ids)
+        self.assertEqual(self.paths(), [self.feed_path])
+        self.assertEqual(len(second[0][1]), 3)
+
+    def testFallsBackWhenFeedCantAnswer(self):
+        self.stand_in.routes[self.feed_path] = (404, b"", {})
+        results = fetchVideos(iter(["ChannelA"]), self.settings, channel_ids = {"ChannelA": self.channel_id})
+        self.assertEqual(self.paths(), [self.feed_path, "/@ChannelA/videos"])
+        self.assertEqual(len(results[0][1]), 3)
+
+    #the feed's times are exact where the page only says 1 day
+    def testTimeFrameIsExact(self):
+        self.cursor.execute("INSERT INTO KnownVideos (handle, known_id) VALUES ('ChannelA', 'A0000000000')")
+        self.cursor.execute(f"INSERT INTO ChannelIds (handle, channel_id) VALUES ('ChannelA', '{self.channel_id}')")
+        self.testing_db.commit()
+
+        nosub.normalExec([writeHandleFile(self, ["ChannelA"])], 60 * 2, nosub.constant_infs.NO_LIMIT, self.settings)
+
+        self.assertEqual(self.paths(), [self.feed_path])
+        self.assertEqual(self.mock_browser.call_args_list, [call("https://www.youtube.com/watch?v=F0000000000")])
+
+    def fullFeed(self):
+        #every entry of the feed is newer than the known id
+        entries = [(f"F{index:010d}", feedTime(60 * 24 * index + 60), False) for index in range(15)]
+        self.stand_in.routes[self.feed_path] = (200, buildFeed(self.channel_id, entries), {})
+        items = [videoItem(f"F{index:010d}", f"{index} days ago") for index in range(15)]
+        items += [videoItem(f"P{index:010d}", f"{index + 16} days ago") for index in range(3)]
+        self.stand_in.routes["/@ChannelA/videos"] = (200, buildChannelPage("Videos", items, self.channel_id), {})
+        self.cursor.execute("INSERT INTO KnownVideos (handle, known_id) VALUES ('ChannelA', 'K0000000000')")
+        self.cursor.execute(f"INSERT INTO ChannelIds (handle, channel_id) VALUES ('ChannelA', '{self.channel_id}')")
+        self.testing_db.commit()
+
+    def opened(self):
+        return [args[0][len("https://www.youtube.com/watch?v="):] for args, _ in self.mock_browser.call_args_list]
+
+    #the feed can't say what came before its 15 entries so the page is read
+    def testFullFeedFallsBackToPage(self):
+        self.fullFeed()
+        nosub.normalExec([writeHandleFile(self, ["ChannelA"])], 60 * 24 * 17, nosub.constant_infs.NO_LIMIT, self.settings)
+
+        self.assertEqual(self.paths(), [self.feed_path, "/@ChannelA/videos"])
+        self.assertEqual(self.opened(), [f"F{index:010d}" for index in range(15)] + ["P0000000000", "P0000000001"])
+
+    #the page read for a full feed waits on the same limiter as the feed
+    def testFallbackSharesLimiter(self):
+        self.fullFeed()
+        acquire = nosub.AimdLimiter.acquire
+        settings = nosub.RunSettings(source = nosub.constant_sources.FEED, concurrency = nosub.constant_concurrency.ADAPTIVE)
+        with patch.object(nosub.AimdLimiter, "acquire", autospec = True, side_effect = acquire) as mock_acquire:
+            nosub.normalExec([writeHandleFile(self, ["ChannelA"])], nosub.constant_infs.LOAD_TO_KNOWN, 16, settings)
+
+        self.assertEqual(self.paths(), [self.feed_path, "/@ChannelA/videos"])
+        self.assertEqual(mock_acquire.call_count, 2)
+        self.assertIs(mock_acquire.call_args_list[0].args[0], mock_acquire.call_args_list[1].args[0])
+
+    #offline only the cached feed is read
+    def testOfflineFullFeedStaysOnFeed(self):
+        self.fullFeed()
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        settings = nosub.RunSettings(source = nosub.constant_sources.FEED, cache_dir = cache_dir, cache_ttl = 600)
+        nosub.normalExec([writeHandleFile(self, ["ChannelA"])], nosub.constant_infs.LOAD_TO_KNOWN, 15, settings)
+        self.cursor.execute("UPDATE KnownVideos SET known_id = 'K0000000000' WHERE handle = 'ChannelA'")
+        self.cursor.execute("DELETE FROM SeenVideos")
+        self.testing_db.commit()
+
+        self.stand_in.requests.clear()
+        self.mock_browser.reset_mock()
+        settings.offline = True
+        nosub.normalExec([writeHandleFile(self, ["ChannelA"])], nosub.constant_infs.LOAD_TO_KNOWN, 16, settings)
+        self.assertEqual(self.paths(), [])
+        self.assertEqual(len(self.opened()), 15)
+
+    def testFullFeedAnswersSmallerLimit(self):
+        self.fullFeed()
+        nosub.normalExec([writeHandleFile(self, ["ChannelA"])], nosub.constant_infs.LOAD_TO_KNOWN, 15, self.settings)
+
+        self.assertEqual(self.paths(), [self.feed_path])
+        self.assertEqual(len(self.opened()), 15)
+
+    def testFullFeedFallsBackForLargerLimit(self):
+        self.fullFeed()
+        nosub.normalExec([writeHandleFile(self, ["ChannelA"])], nosub.constant_infs.LOAD_TO_KNOWN, 16, self.settings)
+
+        self.assertEqual(self.paths(), [self.feed_path, "/@ChannelA/videos"])
+        self.assertEqual(self.opened()[-1], "P0000000000")
+
+    #only the first run of a handle pays for reading the page
+    def testChannelIdIsKeptBetweenRuns(self):
+        handle_file = writeHandleFile(self, ["ChannelA"])
+        nosub.normalExec([handle_file], nosub.constant_infs.LOAD_TO_KNOWN, nosub.constant_infs.NO_LIMIT, self.settings)
+        self.assertEqual(self.paths(), ["/@ChannelA/videos"])
+        rows = self.cursor.execute("SELECT handle, channel_id FROM ChannelIds").fetchall()
+        self.assertEqual(rows, [("ChannelA", self.channel_id)])
+
+        self.stand_in.requests.clear()
+        nosub.normalExec([handle_file], nosub.constant_infs.LOAD_TO_KNOWN, nosub.constant_infs.NO_LIMIT, self.settings)
+        self.assertEqual(self.paths(), [self.feed_path])
+
+    #releases and page runs fill in the ids too
+    def testReleasePageResolves(self):
+        self.stand_in.routes["/@ChannelA/releases"] = (200, buildChannelPage("Releases", [], self.channel_id), {})
+        with patch("sys.stderr", new = io.StringIO()):
+            nosub.releaseExec([writeHandleFile(self, ["ChannelA"])], nosub.constant_infs.NO_LIMIT)
+        rows = self.cursor.execute("SELECT handle, channel_id FROM ChannelIds").fetchall()
+        self.assertEqual(rows, [("ChannelA", self.channel_id)])
+
+    def testStaleChannelIdIsRefreshed(self):
+        self.cursor.execute("INSERT INTO ChannelIds (handle, channel_id) VALUES ('ChannelA', 'UC0000000000000000000000')")
+        self.testing_db.commit()
+
+        nosub.normalExec([writeHandleFile(self, ["ChannelA"])], nosub.constant_infs.LOAD_TO_KNOWN, nosub.constant_infs.NO_LIMIT, self.settings)
+        self.assertEqual(self.paths(), ["/feeds/videos.xml?channel_id=UC0000000000000000000000", "/@ChannelA/videos"])
+        rows = self.cursor.execute("SELECT handle, channel_id FROM ChannelIds").fetchall()
+        self.assertEqual(rows, [("ChannelA", self.channel_id)])
+
+class LauncherTesting(unittest.TestCase):
+    def setUp(self):
+        self.mock_popen = patch("subprocess.Popen").start()
+        self.mock_browser = patch("webbrowser.open_new_tab", return_value = None).start()
+        self.mock_sleep = patch("nosub.time.sleep", return_value = None).start()
+        nosub.verboseprint = lambda *a, **k: None
+        self.urls = [f"https://www.youtube.com/watch?v=A{index:010d}" for index in range(5)]
+
+    def tearDown(self):
+        patch.stopall()
+
+    def launched(self):
+        return [popen_call.args[0] for popen_call in self.mock_popen.call_args_list]
+
+    def testBatchesUrls(self):
+        launcher = nosub.BatchLauncher("firefox --new-tab", batch_urls = 2, delay = 3)
+        for url in self.urls:
+            launcher.open(url)
+        self.assertEqual(len(self.mock_popen.call_args_list), 2)
+        launcher.close()
+
+        self.assertEqual(self.launched(), [
+            ["firefox", "--new-tab"] + self.urls[0:2],
+            ["firefox", "--new-tab"] + self.urls[2:4],
+            ["firefox", "--new-tab"] + self.urls[4:],
+        ])
+        #only between batches
+        self.assertEqual(self.mock_sleep.call_args_list, [call(3), call(3)])
+        self.mock_browser.assert_not_called()
+
+    def testCloseWithNothingPending(self):
+        launcher = nosub.BatchLauncher("firefox")
+        launcher.close()
+        self.mock_popen.assert_not_called()
+
+    def testBadUrl(self):
+        launcher = nosub.BatchLauncher("firefox")
+        with self.assertRaises(AssertionError):
+            launcher.open("https://example.com/not/youtube")
+
+    def testTabDelay(self):
+        launcher = nosub.TabLauncher(0.25)
+        launcher.open(self.urls[0])
+        self.mock_browser.assert_called_once_with(self.urls[0])
+        self.mock_sleep.assert_called_once_with(0.25)
+
+        self.mock_sleep.reset_mock()
+        nosub.TabLauncher(0).open(self.urls[1])
+        self.mock_sleep.assert_not_called()
+
+    def testExecutionUsesBatchLauncher(self):
+        create_videos = """
+        CREATE TABLE IF NOT EXISTS KnownVideos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            handle varchar(30) UNIQUE NOT NULL,
+            known_id varchar(11) UNIQUE NOT NULL
+        );
+        """
+        setupRandomDB(self, create_videos)
+        self.addCleanup(tearDownRandomDB, self)
+        self.cursor.execute("INSERT INTO KnownVideos (handle, known_id) VALUES ('ChannelA', 'A0000000003')")
+        self.testing_db.commit()
+
+        def mockConnection(*args, **kwargs):
+            args[0].connection = sqlite3.connect(self.connection_string)
+            args[0].status = nosub.ConnectionWrapper.OPEN
+
+        items = [videoItem(f"A{index:010d}") for index in range(5)]
+        settings = nosub.RunSettings(launcher = nosub.constant_launchers.BATCH, browser_command = "chromium", batch_urls = 10)
+        with patch("requests.Session.get", return_value = pageResponse(buildChannelPage("Videos", items))), patch("nosub.connectToDB", side_effect = mockConnection):
+            nosub.normalExec([writeHandleFile(self, ["ChannelA"])], nosub.constant_infs.LOAD_TO_KNOWN, nosub.constant_infs.NO_LIMIT, settings)
+
+        self.assertEqual(self.launched(), [["chromium"] + self.urls[0:3]])
+        self.mock_browser.assert_not_called()
+        self.mock_sleep.assert_not_called()
+
+#launcher that records what it was given
+class RecordingLauncher:
+    def __init__(self, on_open = None):
+        self.opened = []
+        self.closed = False
+        self.on_open = on_open
+
+    def open(self, path, found = None):
+        if self.on_open is not None:
+            self.on_open(path)
+        self.opened.append(path)
+
+    def close(self):
+        self.closed = True
+
+class OpenerPipelineTesting(unittest.TestCase):
+    handles = ["ChannelA", "ChannelB", "ChannelC"]
+
+    def setUp(self):
+        create_videos = """
+        CREATE TABLE IF NOT EXISTS KnownVideos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            handle varchar(30) UNIQUE NOT NULL,
+            known_id varchar(11) UNIQUE NOT NULL
+        );
+        """
+        setupRandomDB(self, create_videos)
+        self.fetched = []
+        self.all_fetched = threading.Event()
+        patch("requests.Session.get", side_effect = self.mockObtainHtmls).start()
+        patch("nosub.connectToDB", side_effect = self.mockConnectionToRndDB).start()
+        nosub.verboseprint = lambda *a, **k: None
+
+    def tearDown(self):
+        patch.stopall()
+        tearDownRandomDB(self)
+
+    def mockConnectionToRndDB(self, *args, **kwargs):
+        args[0].connection = sqlite3.connect(self.connection_string)
+        args[0].status = nosub.ConnectionWrapper.OPEN
+
+    def mockObtainHtmls(self, *args, **kwargs):
+        handle = args[0].split("@")[1].split("/")[0]
+        self.fetched.append(handle)
+        if len(self.fetched) == len(self.handles):
+            self.all_fetched.set()
+        return pageResponse(buildChannelPage("Videos", [videoItem(f"{handle[-1]}0000000000")]))
+
+    #the first open is held until every page has been fetched, which can only
+    #happen if fetching doesn't wait on the opener
+    def testFetchingContinuesWhileOpening(self):
+        waited = []
+        inner = RecordingLauncher(lambda path: waited.append(self.all_fetched.wait(5)))
+        with patch("nosub.TabLauncher", return_value = inner):
+            nosub.normalExec([writeHandleFile(self, self.handles)], nosub.constant_infs.LOAD_TO_KNOWN, nosub.constant_infs.NO_LIMIT)
+
+        self.assertTrue(waited[0])
+        self.assertEqual(inner.opened, [f"https://www.youtube.com/watch?v={letter}0000000000" for letter in "ABC"])
+        self.assertTrue(inner.closed)
+
+    #every handle is written before the first URL is opened, and with a batch
+    #of one those writes would be committed straight away if nothing waited.
+    #A file is used so a second connection only sees what was committed
+    def testWritesWaitForOpener(self):
+        db_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(db_dir.cleanup)
+        self.connection_string = os.path.join(db_dir.name, "knowns.db")
+        self.testing_db.close()
+        self.testing_db = sqlite3.connect(self.connection_string)
+        self.cursor = self.testing_db.cursor()
+        self.cursor.execute("CREATE TABLE KnownVideos (id INTEGER PRIMARY KEY AUTOINCREMENT, handle varchar(30) UNIQUE NOT NULL, known_id varchar(11) UNIQUE NOT NULL)")
+        self.cursor.executemany("INSERT INTO KnownVideos (handle, known_id) VALUES (?, ?)", [(handle, f"{handle[-1]}9999999999") for handle in self.handles])
+        self.testing_db.commit()
+
+        written = []
+        all_written = threading.Event()
+        add_id = nosub.addID
+        def record(handle, *args):
+            result = add_id(handle, *args)
+            written.append(handle)
+            if len(written) == len(self.handles):
+                all_written.set()
+            return result
+
+        #runs on the opener thread so it reads through a connection of its own
+        committed = []
+        def check(path):
+            if not committed:
+                all_written.wait(5)
+                reader = sqlite3.connect(self.connection_string)
+                committed.append(reader.execute("SELECT known_id FROM KnownVideos ORDER BY handle").fetchall())
+                reader.close()
+
+        settings = nosub.RunSettings(batch_size = 1)
+        with patch("nosub.TabLauncher", return_value = RecordingLauncher(check)), patch("nosub.addID", side_effect = record):
+            nosub.normalExec([writeHandleFile(self, self.handles)], nosub.constant_infs.LOAD_TO_KNOWN, nosub.constant_infs.NO_LIMIT, settings)
+
+        self.assertEqual(written, self.handles)
+        self.assertEqual(committed, [[(f"{handle[-1]}9999999999",) for handle in self.handles]])
+        rows = self.cursor.execute("SELECT known_id FROM KnownVideos ORDER BY handle").fetchall()
+        self.assertEqual(rows, [(f"{handle[-1]}0000000000",) for handle in self.handles])
+
+    def testErrorIsRaisedOnClose(self):
+        def fail(path):
+            raise RuntimeError("browser went away")
+
+        launcher = nosub.QueuedLauncher(RecordingLauncher(fail))
+        launcher.open("https://www.youtube.com/watch?v=A0000000000")
+        launcher.open("https://www.youtube.com/watch?v=A0000000001")
+        with self.assertRaises(RuntimeError):
+            launcher.close()
+
+    #the opener failing still ends the batch so the run's writes are kept
+    def testWritesKeptWhenOpeningFails(self):
+        def fail(path):
+            raise RuntimeError("browser went away")
+
+        with patch("nosub.TabLauncher", return_value = RecordingLauncher(fail)), patch("nosub.closeConnection", wraps = nosub.closeConnection) as mock_close:
+            with self.assertRaises(RuntimeError):
+                nosub.normalExec([writeHandleFile(self, self.handles)], nosub.constant_infs.LOAD_TO_KNOWN, nosub.constant_infs.NO_LIMIT)
+
+        mock_close.assert_called_once()
+        rows = self.cursor.execute("SELECT handle, known_id FROM KnownVideos ORDER BY handle").fetchall()
+        self.assertEqual(rows, [(handle, f"{handle[-1]}0000000000") for handle in self.handles])
+
+    def testBadUrlFailsWhereFound(self):
+        inner = RecordingLauncher()
+        launcher = nosub.QueuedLauncher(inner)
+        with self.assertRaises(AssertionError):
+            launcher.open("https://example.com/not/youtube")
+        launcher.close()
+        self.assertEqual(inner.opened, [])
+
+class OutputTesting(unittest.TestCase):
+    def setUp(self):
+        create_tables = """
+        CREATE TABLE IF NOT EXISTS KnownVideos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            handle varchar(30) UNIQUE NOT NULL,
+            known_id varchar(11) UNIQUE NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS KnownReleases (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            handle varchar(30) UNIQUE NOT NULL,
+            known_id varchar(41) UNIQUE NOT NULL
+        );
+        """
+        setupRandomDB(self, create_tables)
+        self.cursor.execute("INSERT INTO KnownVideos (handle, known_id) VALUES ('ChannelA', 'A0000000002')")
+        self.cursor.execute("INSERT INTO KnownReleases (handle, known_id) VALUES ('ChannelA', 'PLAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA1')")
+        self.testing_db.commit()
+
+        self.mock_browser = patch("webbrowser.open_new_tab", return_value = None).start()
+        self.mock_sleep = patch("nosub.time.sleep", return_value = None).start()
+        patch("requests.Session.get", side_effect = self.mockObtainHtmls).start()
+        patch("nosub.connectToDB", side_effect = self.mockConnectionToRndDB).start()
+        nosub.verboseprint = lambda *a, **k: None
+
+        self.output_file = f"{self.connection_string}.out"
+        self.addCleanup(lambda: os.path.exists(self.output_file) and os.remove(self.output_file))
+
+    def tearDown(self):
+        patch.stopall()
+        tearDownRandomDB(self)
+
+    def mockConnectionToRndDB(self, *args, **kwargs):
+        args[0].connection = sqlite3.connect(self.connection_string)
+        args[0].status = nosub.ConnectionWrapper.OPEN
+
+    def mockObtainHtmls(self, *args, **kwargs):
+        if args[0].endswith("/releases"):
+            items = [releaseItem(f"PLAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA{index}", f"A000000000{index}") for index in range(2)]
+            return pageResponse(buildChannelPage("Releases", items))
+        items = [videoItem("A0000000000", "3 hours ago"), videoItem("A0000000001", "2 days ago"), videoItem("A0000000002")]
+        return pageResponse(buildChannelPage("Videos", items))
+
+    def readOutput(self):
+        with open(self.output_file, encoding = "utf-8") as output:
+            return output.read()
+
+    def testJsonLines(self):
+        settings = nosub.RunSettings(output = nosub.constant_outputs.JSONL, output_file = self.output_file)
+        nosub.bothExec([writeHandleFile(self, ["ChannelA"])], nosub.constant_infs.LOAD_TO_KNOWN, nosub.constant_infs.NO_LIMIT, settings)
+
+        lines = [json.loads(line) for line in self.readOutput().splitlines()]
+        self.assertEqual(lines, [
+            {"handle": "ChannelA", "kind": "video", "id": "A0000000000", "published": "3 hours ago", "url": "https://www.youtube.com/watch?v=A0000000000"},
+            {"handle": "ChannelA", "kind": "video", "id": "A0000000001", "published": "2 days ago", "url": "https://www.youtube.com/watch?v=A0000000001"},
+            {"handle": "ChannelA", "kind": "release", "id": "PLAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA0", "published": None,
+             "url": "https://www.youtube.com/watch?v=A0000000000&list=PLAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA0"},
+        ])
+        self.mock_browser.assert_not_called()
+        self.mock_sleep.assert_not_called()
+
+        #what was written out is known like anything opened
+        self.cursor.execute("SELECT known_id FROM KnownVideos WHERE handle = 'ChannelA'")
+        self.assertEqual(self.cursor.fetchone()[0], "A0000000000")
+
+    def testText(self):
+        settings = nosub.RunSettings(output = nosub.constant_outputs.TEXT, output_file = self.output_file)
+        nosub.releaseExec([writeHandleFile(self, ["ChannelA"])], nosub.constant_infs.NO_LIMIT, settings)
+
+        self.assertEqual(self.readOutput(),
+            "ChannelA\trelease\tPLAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA0\t\thttps://www.youtube.com/watch?v=A0000000000&list=PLAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA0\n")
+
+    def testM3u(self):
+        settings = nosub.RunSettings(output = nosub.constant_outputs.M3U, output_file = self.output_file)
+        nosub.normalExec([writeHandleFile(self, ["ChannelA"])], nosub.constant_infs.LOAD_TO_KNOWN, 1, settings)
+
+        self.assertEqual(self.readOutput(), "#EXTM3U\n#EXTINF:-1,ChannelA - 3 hours ago\nhttps://www.youtube.com/watch?v=A0000000000\n")
+
+    #what's wrong with a handle is said on stderr so stdout stays JSON
+    def testBadHandleKeepsStdoutClean(self):
+        for engine, handles in ((nosub.constant_engines.THREAD, ["ChannelA", ""]), (nosub.constant_engines.ASYNC, [""])):
+            settings = nosub.RunSettings(output = nosub.constant_outputs.JSONL, engine = engine)
+            with patch("sys.stdout", new_callable = io.StringIO) as stdout, patch("sys.stderr", new_callable = io.StringIO) as stderr:
+                nosub.normalExec([writeHandleFile(self, handles)], nosub.constant_infs.LOAD_TO_KNOWN, nosub.constant_infs.NO_LIMIT, settings)
+
+            for line in stdout.getvalue().splitlines():
+                json.loads(line)
+            self.assertIn("not a valid handle", stderr.getvalue())
+
+    def testStdout(self):
+        settings = nosub.RunSettings(output = nosub.constant_outputs.JSONL)
+        with patch("sys.stdout", new_callable = io.StringIO) as stdout:
+            nosub.normalExec([writeHandleFile(self, ["ChannelA"])], nosub.constant_infs.LOAD_TO_KNOWN, nosub.constant_infs.NO_LIMIT, settings)
+
+        self.assertEqual([json.loads(line)["id"] for line in stdout.getvalue().splitlines()], ["A0000000000", "A0000000001"])
+        self.assertFalse(stdout.closed)
+
+    def testNothingNew(self):
+        self.cursor.execute("UPDATE KnownVideos SET known_id = 'A0000000000'")
+        self.testing_db.commit()
+        settings = nosub.RunSettings(output = nosub.constant_outputs.M3U, output_file = self.output_file)
+        nosub.normalExec([writeHandleFile(self, ["ChannelA"])], nosub.constant_infs.LOAD_TO_KNOWN, nosub.constant_infs.NO_LIMIT, settings)
+
+        #still a playlist a player can open
+        self.assertEqual(self.readOutput(), "#EXTM3U\n")
+
+    def testBadUrl(self):
+        launcher = nosub.OutputLauncher(nosub.constant_outputs.JSONL, self.output_file)
+        with self.assertRaises(AssertionError):
+            launcher.open("https://example.com/not/youtube")
+        launcher.close()
+        self.assertEqual(self.readOutput(), "")
+
+class AggregatedOpenTesting(unittest.TestCase):
+    def setUp(self):
+        self.mock_browser = patch("webbrowser.open_new_tab", return_value = None).start()
+        self.mock_sleep = patch("nosub.time.sleep", return_value = None).start()
+        nosub.verboseprint = lambda *a, **k: None
+
+    def tearDown(self):
+        patch.stopall()
+
+    def opened(self):
+        return [browser_call.args[0] for browser_call in self.mock_browser.call_args_list]
+
+    def testPlaylistChunks(self):
+        video_ids = [f"A{index:010d}" for index in range(120)]
+        paths = nosub.playlistPaths(video_ids)
+
+        self.assertEqual(len(paths), 3)
+        self.assertEqual(paths[0], "https://www.youtube.com/watch_videos?video_ids=" + ",".join(video_ids[0:50]))
+        self.assertEqual(paths[2], "https://www.youtube.com/watch_videos?video_ids=" + ",".join(video_ids[100:]))
+        self.assertEqual(nosub.playlistPaths([]), [])
+
+    def testPlaylistLauncher(self):
+        launcher = nosub.PlaylistLauncher(2)
+        release = "https://www.youtube.com/watch?v=A0000000000&list=PLAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA0"
+        for index in range(60):
+            launcher.open(f"https://www.youtube.com/watch?v=A{index:010d}")
+        launcher.open(release)
+        #only the release is opened before the end
+        self.assertEqual(self.opened(), [release])
+
+        launcher.close()
+        self.assertEqual(len(self.opened()), 3)
+        self.assertTrue(self.opened()[1].endswith("A0000000049"))
+        self.assertTrue(self.opened()[2].endswith("A0000000050,A0000000051,A0000000052,A0000000053,A0000000054,A0000000055,A0000000056,A0000000057,A0000000058,A0000000059"))
+
+    def testExecutionOpensOnePlaylist(self):
+        create_videos = """
+        CREATE TABLE IF NOT EXISTS KnownVideos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            handle varchar(30) UNIQUE NOT NULL,
+            known_id varchar(11) UNIQUE NOT NULL
+        );
+        """
+        setupRandomDB(self, create_videos)
+        self.addCleanup(tearDownRandomDB, self)
+        self.cursor.execute("INSERT INTO KnownVideos (handle, known_id) VALUES ('ChannelA', 'A0000000003')")
+        self.cursor.execute("INSERT INTO KnownVideos (handle, known_id) VALUES ('ChannelB', 'B0000000002')")
+        self.testing_db.commit()
+
+        def mockConnection(*args, **kwargs):
+            args[0].connection = sqlite3.connect(self.connection_string)
+            args[0].status = nosub.ConnectionWrapper.OPEN
+
+        def mockObtainHtmls(*args, **kwargs):
+            letter = args[0].split("@")[1][len("Channel")]
+            return pageResponse(buildChannelPage("Videos", [videoItem(f"{letter}{index:010d}") for index in range(5)]))
+
+        settings = nosub.RunSettings(launcher = nosub.constant_launchers.PLAYLIST)
+        with patch("requests.Session.get", side_effect = mockObtainHtmls), patch("nosub.connectToDB", side_effect = mockConnection):
+            nosub.normalExec([writeHandleFile(self, ["ChannelA", "ChannelB"])], nosub.constant_infs.LOAD_TO_KNOWN, nosub.constant_infs.NO_LIMIT, settings)
+
+        self.assertEqual(self.opened(), ["https://www.youtube.com/watch_videos?video_ids=A0000000000,A0000000001,A0000000002,B0000000000,B0000000001"])
+        self.mock_sleep.assert_called_once_with(nosub.constant_open.DELAY)
+
+    def testDigest(self):
+        digest_file = os.path.join(tempfile.mkdtemp(), "digest.html")
+        self.addCleanup(shutil.rmtree, os.path.dirname(digest_file))
+
+        launcher = nosub.DigestLauncher(digest_file)
+        launcher.open("https://www.youtube.com/watch?v=A0000000000", nosub.Found("Chan<nel>A", "video", "A0000000000", "2 days ago", "https://www.youtube.com/watch?v=A0000000000"))
+        release = "https://www.youtube.com/watch?v=B0000000000&list=PLAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA0"
+        launcher.open(release, nosub.Found("ChannelB", "release", "PLAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA0", None, release))
+        self.mock_browser.assert_not_called()
+        launcher.close()
+
+        with open(digest_file, encoding = "utf-8") as digest:
+            page = digest.read()
+        self.assertIn("<h2>Chan&lt;nel&gt;A</h2>", page)
+        self.assertIn("https://i.ytimg.com/vi/A0000000000/mqdefault.jpg", page)
+        self.assertIn("video 2 days ago</a>", page)
+        self.assertIn("href=\"https://www.youtube.com/watch?v=B0000000000&amp;list=PLAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA0\"", page)
+        self.assertEqual(self.opened(), [Path(digest_file).resolve().as_uri()])
+
+    def testEmptyDigestNotOpened(self):
+        digest_file = os.path.join(tempfile.mkdtemp(), "digest.html")
+        self.addCleanup(shutil.rmtree, os.path.dirname(digest_file))
+
+        nosub.DigestLauncher(digest_file).close()
+        self.assertTrue(os.path.exists(digest_file))
+        self.mock_browser.assert_not_called()
+
+class HandleScheduleTesting(unittest.TestCase):
+    def testDueInOrder(self):
+        schedule = nosub.HandleSchedule(10, 0)
+        schedule.update(["ChannelB", "ChannelA", "ChannelC"], 100)
+
+        self.assertEqual(schedule.wait(100), 0)
+        self.assertEqual(schedule.due(100), ["ChannelB", "ChannelA", "ChannelC"])
+        self.assertEqual(schedule.due(105), [])
+        self.assertEqual(schedule.wait(105), 5)
+        self.assertEqual(schedule.due(110), ["ChannelB", "ChannelA", "ChannelC"])
+
+    def testOwnInterval(self):
+        schedule = nosub.HandleSchedule(10, 0)
+        schedule.intervals["ChannelA"] = 2
+        schedule.update(["ChannelA", "ChannelB"], 0)
+        schedule.due(0)
+
+        self.assertEqual(schedule.due(4), ["ChannelA"])
+        self.assertEqual(schedule.due(10), ["ChannelA", "ChannelB"])
+
+    def testUpdate(self):
+        schedule = nosub.HandleSchedule(10, 0)
+        schedule.update(["ChannelA", "ChannelB"], 0)
+        schedule.due(0)
+
+        #ChannelB is dropped and ChannelC is checked straight away
+        schedule.update(["ChannelA", "ChannelC"], 3)
+        self.assertEqual(schedule.due(3), ["ChannelC"])
+        self.assertEqual(schedule.due(10), ["ChannelA"])
+        self.assertEqual(schedule.wait(10), 3)
+
+        schedule.update([], 10)
+        self.assertEqual(schedule.wait(10), math.inf)
+
+    def testJitter(self):
+        schedule = nosub.HandleSchedule(100, 0.2)
+        handles = [f"Channel{index}" for index in range(200)]
+        schedule.update(handles, 0)
+        schedule.due(0)
+
+        next_due = [schedule.next_due[handle] for handle in handles]
+        self.assertTrue(all(80 <= due <= 120 for due in next_due))
+        #spread out rather than all at once
+        self.assertGreater(len(set(next_due)), 150)
+
+class DaemonTesting(unittest.TestCase):
+    def setUp(self):
+        create_videos = """
+        CREATE TABLE IF NOT EXISTS KnownVideos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            handle varchar(30) UNIQUE NOT NULL,
+            known_id varchar(11) UNIQUE NOT NULL
+        );
+        """
+        setupRandomDB(self, create_videos)
+        self.fetched = []
+        self.fetched_lock = threading.Lock()
+        self.mock_browser = patch("webbrowser.open_new_tab", return_value = None).start()
+        patch("nosub.time.sleep", return_value = None).start()
+        patch("requests.Session.get", side_effect = self.mockObtainHtmls).start()
+        self.mock_connect = patch("nosub.connectToDB", side_effect = self.mockConnectionToRndDB).start()
+        nosub.verboseprint = lambda *a, **k: None
+
+    def tearDown(self):
+        patch.stopall()
+        tearDownRandomDB(self)
+
+    def mockConnectionToRndDB(self, *args, **kwargs):
+        args[0].connection = sqlite3.connect(self.connection_string, check_same_thread = False)
+        args[0].status = nosub.ConnectionWrapper.OPEN
+
+    def mockObtainHtmls(self, *args, **kwargs):
+        handle = args[0].split("@")[1].split("/")[0]
+        with self.fetched_lock:
+            self.fetched.append(handle)
+        return pageResponse(buildChannelPage("Videos", [videoItem(f"{handle[-1]}0000000000")]))
+
+    def fetchCount(self, handle):
+        with self.fetched_lock:
+            return self.fetched.count(handle)
+
+    def waitFor(self, condition):
+        deadline = time.time() + 5
+        while not condition():
+            self.assertLess(time.time(), deadline, "Daemon didn't get there in time")
+            #time.sleep is patched out
+            threading.Event().wait(0.01)
+
+    def testChecksAgainAndReloads(self):
+        handle_file = writeHandleFile(self, ["ChannelA", "ChannelB"])
+        settings = nosub.RunSettings(interval = 0.05, jitter = 0)
+        stop = threading.Event()
+        errors = []
+
+        def runDaemon():
+            try:
+                nosub.daemonExec([handle_file], (nosub.constant_yt.YT_VIDEOS,), nosub.constant_infs.LOAD_TO_KNOWN, nosub.constant_infs.NO_LIMIT, settings, stop)
+            except Exception as e:
+                errors.append(e)
+
+        daemon = threading.Thread(target = runDaemon)
+        daemon.start()
+        try:
+            self.waitFor(lambda: self.fetchCount("ChannelA") >= 3 and self.fetchCount("ChannelB") >= 3)
+            with open(handle_file, "w", encoding = "ascii") as handles:
+                handles.write("ChannelA\nChannelC\n")
+            self.waitFor(lambda: self.fetchCount("ChannelC") >= 2)
+            fetched_b = self.fetchCount("ChannelB")
+            self.waitFor(lambda: self.fetchCount("ChannelC") >= 4)
+        finally:
+            stop.set()
+            daemon.join(5)
+
+        self.assertFalse(daemon.is_alive())
+        self.assertEqual(errors, [])
+        #removed handles aren't checked anymore
+        self.assertEqual(self.fetchCount("ChannelB"), fetched_b)
+        #one connection for the whole time
+        self.assertEqual(self.mock_connect.call_count, 1)
+        #each new video is only opened the first time it's seen
+        self.assertEqual(sorted(browser_call.args[0] for browser_call in self.mock_browser.call_args_list),
+            ["https://www.youtube.com/watch?v=A0000000000", "https://www.youtube.com/watch?v=B0000000000", "https://www.youtube.com/watch?v=C0000000000"])
+
+    #every round adds to the output file instead of starting it over
+    def testOutputFileKeepsEveryRound(self):
+        def newUpload(*args, **kwargs):
+            with self.fetched_lock:
+                self.fetched.append("ChannelA")
+                uploads = len(self.fetched)
+            return pageResponse(buildChannelPage("Videos", [videoItem(f"A{index:010d}") for index in range(uploads, 0, -1)]))
+        patch("requests.Session.get", side_effect = newUpload).start()
+
+        output_file = f"{self.connection_string}.m3u"
+        self.addCleanup(lambda: os.path.exists(output_file) and os.remove(output_file))
+        settings = nosub.RunSettings(interval = 0.05, jitter = 0, output = nosub.constant_outputs.M3U, output_file = output_file)
+        stop = threading.Event()
+        daemon = threading.Thread(target = nosub.daemonExec, args = ([writeHandleFile(self, ["ChannelA"])], (nosub.constant_yt.YT_VIDEOS,),
+            nosub.constant_infs.LOAD_TO_KNOWN, nosub.constant_infs.NO_LIMIT, settings, stop))
+        daemon.start()
+        try:
+            self.waitFor(lambda: self.fetchCount("ChannelA") >= 3)
+        finally:
+            stop.set()
+            daemon.join(5)
+
+        self.assertFalse(daemon.is_alive())
+        with open(output_file, encoding = "utf-8") as output:
+            lines = output.read().splitlines()
+        self.assertEqual(lines[0], "#EXTM3U")
+        self.assertEqual(lines.count("#EXTM3U"), 1)
+        urls = [line for line in lines if not line.startswith("#")]
+        self.assertEqual(urls, [f"https://www.youtube.com/watch?v=A{index:010d}" for index in range(1, self.fetchCount("ChannelA") + 1)])
+
+class AdaptiveCheckTesting(unittest.TestCase):
+    day = 24 * 60 * 60
+
+    def setUp(self):
+        self.wrapper = nosub.ConnectionWrapper(sqlite3.connect(":memory:", isolation_level = None), nosub.ConnectionWrapper.OPEN)
+        self.wrapper.connection.executescript(BatchedWriteTesting.create_tables)
+        nosub.createRunTables(self.wrapper)
+        self.statements = []
+        self.wrapper.connection.set_trace_callback(self.statements.append)
+        self.settings = nosub.RunSettings(adaptive = True)
+        self.now = 1000 * self.day
+        nosub.verboseprint = lambda *a, **k: None
+
+    def tearDown(self):
+        self.wrapper.connection.close()
+
+    #uploads every gap days, the last one when it was last checked
+    def history(self, handle, uploads, gap, checked_days_ago, table = "KnownVideos"):
+        checked_at = self.now - checked_days_ago * self.day
+        for index in range(uploads):
+            nosub.addUpload(handle, table, self.wrapper, checked_at - index * gap * self.day)
+        nosub.addChecked(handle, [table], self.wrapper, checked_at)
+
+    def testCadencesInOneQuery(self):
+        self.history("Weekly", 4, 7, 1)
+        self.history("Daily", 10, 1, 1)
+        self.history("Rare", 2, 30, 1)
+        self.statements.clear()
+        nosub.loadCadences(self.wrapper)
+
+        self.assertEqual(len([statement for statement in self.statements if statement.lstrip().startswith("SELECT")]), 1)
+        self.assertAlmostEqual(self.wrapper.cadences[("Weekly", "KnownVideos")].gap, 7 * self.day)
+        self.assertAlmostEqual(self.wrapper.cadences[("Daily", "KnownVideos")].gap, self.day)
+        #not enough uploads to go by
+        self.assertIsNone(self.wrapper.cadences[("Rare", "KnownVideos")].gap)
+        self.assertEqual(self.wrapper.cadences[("Rare", "KnownVideos")].uploads, 2)
+
+    def testDueHandles(self):
+        self.history("WeeklyRecent", 4, 7, 1)
+        self.history("WeeklyOld", 4, 7, 6)
+        self.history("DailyRecent", 10, 1, 1)
+        self.history("Rare", 2, 30, 1)
+        nosub.loadCadences(self.wrapper)
+
+        handles = ["WeeklyRecent", "WeeklyOld", "DailyRecent", "Rare", "NeverChecked"]
+        self.assertEqual(nosub.dueHandles(handles, ("videos",), self.wrapper, self.settings, self.now), ["WeeklyOld", "DailyRecent", "Rare", "NeverChecked"])
+
+        #nothing is left longer than the max staleness
+        self.settings.max_staleness = 0.5 * self.day
+        self.assertEqual(nosub.dueHandles(handles, ("videos",), self.wrapper, self.settings, self.now), handles)
+
+        self.settings.adaptive = False
+        self.assertIs(nosub.dueHandles(handles, ("videos",), self.wrapper, self.settings, self.now), handles)
+
+    def testAnyTabDue(self):
+        self.history("Channel", 4, 7, 1)
+        nosub.loadCadences(self.wrapper)
+        self.assertEqual(nosub.dueHandles(["Channel"], ("videos",), self.wrapper, self.settings, self.now), [])
+        #releases were never checked
+        self.assertEqual(nosub.dueHandles(["Channel"], ("videos", "releases"), self.wrapper, self.settings, self.now), ["Channel"])
+
+    def testUploadsArePruned(self):
+        self.history("Daily", nosub.constant_adaptive.UPLOADS + 5, 1, 0)
+        count = self.wrapper.connection.execute("SELECT COUNT(*) FROM UploadTimes WHERE handle = 'Daily'").fetchone()[0]
+        self.assertEqual(count, nosub.constant_adaptive.UPLOADS)
+
+    def uploadCount(self, handle):
+        return self.wrapper.connection.execute("SELECT COUNT(*) FROM UploadTimes WHERE handle = ?", (handle,)).fetchone()[0]
+
+    def testNewTopIsAnUpload(self):
+        launcher = RecordingLauncher()
+        nosub.processVideos("Channel", [videoItem("A0000000000")], nosub.constant_infs.LOAD_TO_KNOWN, nosub.constant_infs.NO_LIMIT, self.wrapper, launcher)
+        #the first time a handle is seen says nothing about when it uploads
+        self.assertEqual(self.uploadCount("Channel"), 0)
+
+        nosub.processVideos("Channel", [videoItem("A0000000000")], nosub.constant_infs.LOAD_TO_KNOWN, nosub.constant_infs.NO_LIMIT, self.wrapper, launcher)
+        self.assertEqual(self.uploadCount("Channel"), 0)
+
+        #found even when the limits keep it from being opened
+        nosub.processVideos("Channel", [videoItem("A0000000001", "2 weeks ago"), videoItem("A0000000000")], 60, nosub.constant_infs.NO_LIMIT, self.wrapper, launcher)
+        self.assertEqual(self.uploadCount("Channel"), 1)
+        self.assertEqual(launcher.opened, ["https://www.youtube.com/watch?v=A0000000000"])
+
+    def testExecutionSkipsHandles(self):
+        self.history("ChannelA", 4, 7, 1)
+        self.history("ChannelB", 4, 7, 6)
+        self.wrapper.connection.execute("INSERT INTO KnownVideos (handle, known_id) VALUES ('ChannelA', 'A0000000000'), ('ChannelB', 'B0000000000')")
+
+        fetched = []
+        def mockObtainHtmls(*args, **kwargs):
+            handle = args[0].split("@")[1].split("/")[0]
+            fetched.append(handle)
+            return pageResponse(buildChannelPage("Videos", [videoItem(f"{handle[-1]}0000000000")]))
+
+        #the run shares the in memory database, so it's left open for the checks below
+        def mockConnection(*args, **kwargs):
+            args[0].connection = self.wrapper.connection
+            args[0].status = nosub.ConnectionWrapper.OPEN
+
+        handle_file = writeHandleFile(self, ["ChannelA", "ChannelB", "ChannelC"])
+        with patch("requests.Session.get", side_effect = mockObtainHtmls), patch("nosub.connectToDB", side_effect = mockConnection), \
+             patch("webbrowser.open_new_tab", return_value = None), patch("nosub.time.sleep", return_value = None), \
+             patch("nosub.time.time", return_value = self.now), patch("nosub.closeConnection"):
+            nosub.normalExec([handle_file], nosub.constant_infs.LOAD_TO_KNOWN, nosub.constant_infs.NO_LIMIT, self.settings)
+
+        self.assertEqual(fetched, ["ChannelB", "ChannelC"])
+        checked = dict(self.wrapper.connection.execute("SELECT handle, checked_at FROM HandleChecks"))
+        self.assertEqual(checked["ChannelB"], self.now)
+        self.assertEqual(checked["ChannelC"], self.now)
+        self.assertEqual(checked["ChannelA"], self.now - self.day)
+
+class RetryTesting(unittest.TestCase):
+    url = "https://www.youtube.com/@ChannelA/videos"
+
+    def setUp(self):
+        self.mock_sleep = patch("nosub.time.sleep", return_value = None).start()
+        patch("nosub.random.uniform", side_effect = lambda low, high: high).start()
+        nosub.verboseprint = lambda *a, **k: None
+
+    def tearDown(self):
+        patch.stopall()
+
+    def responses(self, *responses):
+        return patch("requests.Session.get", side_effect = list(responses)).start()
+
+    def testRetriesServerErrors(self):
+        mock_get = self.responses(pageResponse(b"", 503), pageResponse(b"", 502), pageResponse(b"page"))
+        response = nosub.fetchPage(self.url, retry = nosub.RetryPolicy(2, 10, 3))
+
+        self.assertEqual(response.content, b"page")
+        self.assertEqual(mock_get.call_count, 3)
+        self.assertEqual(mock_get.call_args.kwargs["timeout"], (2, 10))
+        #doubling each time
+        self.assertEqual(self.mock_sleep.call_args_list, [call(1), call(2)])
+
+    def testHonorsRetryAfter(self):
+        throttled = pageResponse(b"", 429)
+        throttled.headers["Retry-After"] = "7"
+        self.responses(throttled, pageResponse(b"page"))
+
+        self.assertEqual(nosub.fetchPage(self.url).content, b"page")
+        self.assertEqual(self.mock_sleep.call_args_list, [call(7)])
+
+    def testRetryAfterDate(self):
+        throttled = pageResponse(b"", 503)
+        throttled.headers["Retry-After"] = email.utils.formatdate(time.time() + 30, usegmt = True)
+        self.responses(throttled, pageResponse(b"page"))
+
+        nosub.fetchPage(self.url)
+        self.assertAlmostEqual(self.mock_sleep.call_args.args[0], 30, delta = 2)
+
+    def testRetryAfterTooLong(self):
+        throttled = pageResponse(b"", 429)
+        throttled.headers["Retry-After"] = "3600"
+        mock_get = self.responses(throttled, pageResponse(b"page"))
+
+        self.assertEqual(nosub.fetchPage(self.url), nosub.FetchFailure(nosub.constant_failures.THROTTLED, "HTTP 429"))
+        self.assertEqual(mock_get.call_count, 1)
+        self.mock_sleep.assert_not_called()
+
+    def testGivesUp(self):
+        mock_get = self.responses(requests.ConnectTimeout("slow"), requests.ConnectionError("refused"), requests.ReadTimeout("stalled"))
+        failure = nosub.fetchPage(self.url, retry = nosub.RetryPolicy(retries = 2))
+
+        self.assertEqual(failure.reason, nosub.constant_failures.TIMEOUT)
+        self.assertEqual(mock_get.call_count, 3)
+
+    def testNotFoundIsNotRetried(self):
+        mock_get = self.responses(pageResponse(b"", 404))
+        self.assertEqual(nosub.fetchPage(self.url).status_code, 404)
+        self.assertEqual(mock_get.call_count, 1)
+
+    def testDeadline(self):
+        mock_get = self.responses(pageResponse(b"page"))
+        failure = nosub.fetchPage(self.url, retry = nosub.RetryPolicy(deadline = time.monotonic() - 1))
+
+        self.assertEqual(failure.reason, nosub.constant_failures.DEADLINE)
+        mock_get.assert_not_called()
+
+    #a wait that would go past the deadline isn't started
+    def testBackoffStopsAtDeadline(self):
+        mock_get = self.responses(pageResponse(b"", 503), pageResponse(b"page"))
+        failure = nosub.fetchPage(self.url, retry = nosub.RetryPolicy(deadline = time.monotonic() + 0.5))
+
+        self.assertEqual(failure.reason, nosub.constant_failures.SERVER)
+        self.assertEqual(mock_get.call_count, 1)
+        self.mock_sleep.assert_not_called()
+
+class FailureSummaryTesting(unittest.TestCase):
+    handles = ["ChannelA", "ChannelB", "ChannelC", "ChannelD"]
+
+    def setUp(self):
+        create_videos = """
+        CREATE TABLE IF NOT EXISTS KnownVideos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            handle varchar(30) UNIQUE NOT NULL,
+            known_id varchar(11) UNIQUE NOT NULL
+        );
+        """
+        setupRandomDB(self, create_videos)
+
+        self.stand_in = StandInServer()
+        self.stand_in.routes["/@ChannelA/videos"] = (200, buildChannelPage("Videos", [videoItem("A0000000000")]), {})
+        self.stand_in.routes["/@ChannelB/videos"] = self.stall
+        self.stand_in.routes["/@ChannelC/videos"] = (503, b"", {"Retry-After": "0"})
+        #ChannelD has no route so it's a 404
+
+        patch("nosub.constant_yt", self.stand_in.channelConstants()).start()
+        self.mock_browser = patch("webbrowser.open_new_tab", return_value = None).start()
+        patch("nosub.connectToDB", side_effect = self.mockConnectionToRndDB).start()
+        patch("nosub.time.sleep", return_value = None).start()
+        patch("nosub.random.uniform", return_value = 0).start()
+        nosub.verboseprint = lambda *a, **k: None
+        nosub.connection_stats.reset()
+        nosub.openSession()
+
+    def tearDown(self):
+        nosub.closeSession()
+        patch.stopall()
+        self.stand_in.close()
+        tearDownRandomDB(self)
+
+    def mockConnectionToRndDB(self, *args, **kwargs):
+        args[0].connection = sqlite3.connect(self.connection_string)
+        args[0].status = nosub.ConnectionWrapper.OPEN
+
+    #time.sleep is patched out
+    def stall(self, handler):
+        threading.Event().wait(0.5)
+        return (200, buildChannelPage("Videos", [videoItem("B0000000000")]), {})
+
+    def runEngine(self, engine):
+        settings = nosub.RunSettings(engine = engine, jobs = 4, retry = nosub.RetryPolicy(1, 0.1, 1))
+        with patch("sys.stderr", new_callable = io.StringIO) as stderr:
+            nosub.normalExec([writeHandleFile(self, self.handles)], nosub.constant_infs.LOAD_TO_KNOWN, nosub.constant_infs.NO_LIMIT, settings)
+            nosub.reportFailures()
+        return stderr.getvalue()
+
+    def checkSummary(self, output):
+        self.assertIn("3 handles could not be checked", output)
+        self.assertIn("  timed out (1): ChannelB", output)
+        self.assertIn("  server error (1): ChannelC", output)
+        self.assertIn("  does not exist (1): ChannelD", output)
+        self.assertNotIn("does not have extractable video content", output)
+        self.mock_browser.assert_called_once_with("https://www.youtube.com/watch?v=A0000000000")
+
+        #the 503 was tried twice
+        self.assertEqual([path for path, _ in self.stand_in.requests].count("/@ChannelC/videos"), 2)
+        self.cursor.execute("SELECT handle FROM KnownVideos ORDER BY handle")
+        self.assertEqual(self.cursor.fetchall(), [("ChannelA",)])
+
+    def testThreadEngine(self):
+        self.checkSummary(self.runEngine(nosub.constant_engines.THREAD))
+
+    def testAsyncEngine(self):
+        self.checkSummary(self.runEngine(nosub.constant_engines.ASYNC))
+
+    def testDeadlineSkipsTheRest(self):
+        settings = nosub.RunSettings(retry = nosub.RetryPolicy(deadline = time.monotonic() - 1))
+        with patch("sys.stderr", new_callable = io.StringIO) as stderr:
+            nosub.normalExec([writeHandleFile(self, self.handles)], nosub.constant_infs.LOAD_TO_KNOWN, nosub.constant_infs.NO_LIMIT, settings)
+            nosub.reportFailures()
+
+        self.assertEqual(stderr.getvalue(), "4 handles could not be checked\n  not reached before the deadline (4): ChannelA, ChannelB, ChannelC, ChannelD\n")
+        self.assertEqual(self.stand_in.requests, [])
+
+class AimdLimiterTesting(unittest.TestCase):
+    def setUp(self):
+        nosub.verboseprint = lambda *a, **k: None
+
+    def fill(self, limiter):
+        tickets = []
+        while True:
+            ticket = limiter.tryAcquire()
+            if ticket is None:
+                return tickets
+            tickets.append(ticket)
+
+    def testSlowStart(self):
+        limiter = nosub.AimdLimiter(16)
+        #doubles every round while everything comes back fine, the clock stands
+        #still so a pause of the test isn't taken for a slow response
+        with patch("nosub.time.monotonic", return_value = 0.0):
+            for expected in (1, 2, 4, 8, 16, 16):
+                tickets = self.fill(limiter)
+                self.assertEqual(len(tickets), expected)
+                for ticket in tickets:
+                    limiter.release(ticket)
+
+    def testCutOncePerWindow(self):
+        limiter = nosub.AimdLimiter(16)
+        limiter.limit = 8.0
+        tickets = self.fill(limiter)
+        self.assertEqual(len(tickets), 8)
+
+        #every request in flight was throttled but it only halves once
+        for ticket in tickets:
+            limiter.release(ticket, True)
+        self.assertEqual(limiter.allowed(), 4)
+        self.assertEqual(limiter.cuts, 1)
+
+        #the next window can cut again
+        tickets = self.fill(limiter)
+        limiter.release(tickets[0], True)
+        self.assertEqual(limiter.allowed(), 2)
+
+        for ticket in tickets[1:]:
+            limiter.release(ticket)
+        self.assertEqual(limiter.in_flight, 0)
+        self.assertEqual(nosub.AimdLimiter(4).allowed(), 1)
+
+    def testAdditiveAfterCut(self):
+        limiter = nosub.AimdLimiter(16)
+        limiter.limit = 8.0
+        limiter.release(limiter.tryAcquire(), True)
+        self.assertEqual(limiter.limit, 4.0)
+
+        #one more for every limit responses
+        for _ in range(4):
+            limiter.release(limiter.tryAcquire())
+        self.assertEqual(limiter.allowed(), 4)
+        self.assertLess(limiter.limit, 5)
+        limiter.release(limiter.tryAcquire())
+        self.assertEqual(limiter.allowed(), 5)
+
+    def testLatencySpike(self):
+        limiter = nosub.AimdLimiter(16)
+        limiter.limit = 8.0
+        clock = [100.0]
+        with patch("nosub.time.monotonic", side_effect = lambda: clock[0]):
+            for _ in range(nosub.constant_aimd.SAMPLES):
+                ticket = limiter.tryAcquire()
+                clock[0] += 0.1
+                limiter.release(ticket)
+            self.assertEqual(limiter.cuts, 0)
+
+            #twice as slow is still fine
+            ticket = limiter.tryAcquire()
+            clock[0] += 0.2
+            limiter.release(ticket)
+            self.assertEqual(limiter.cuts, 0)
+
+            ticket = limiter.tryAcquire()
+            clock[0] += 2
+            limiter.release(ticket)
+            self.assertEqual(limiter.cuts, 1)
+
+    def testAcquireWaits(self):
+        limiter = nosub.AimdLimiter(4)
+        ticket = limiter.acquire()
+        acquired = threading.Event()
+        waiter = threading.Thread(target = lambda: (limiter.acquire(), acquired.set()))
+        waiter.start()
+
+        self.assertFalse(acquired.wait(0.1))
+        limiter.release(ticket)
+        self.assertTrue(acquired.wait(5))
+        waiter.join()
+
+#Answers 429 to any request made while too many others are in flight, like
+#youtube does when it's being asked for pages too quickly
+class ThrottlingTesting(unittest.TestCase):
+    handles = [f"Channel{index:02d}" for index in range(48)]
+    allowed = 3
+
+    def setUp(self):
+        create_videos = """
+        CREATE TABLE IF NOT EXISTS KnownVideos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            handle varchar(30) UNIQUE NOT NULL,
+            known_id varchar(11) UNIQUE NOT NULL
+        );
+        """
+        setupRandomDB(self, create_videos)
+
+        self.in_flight = 0
+        self.most_in_flight = 0
+        self.throttled = 0
+        self.lock = threading.Lock()
+        self.stand_in = StandInServer()
+        for handle in self.handles:
+            self.stand_in.routes[f"/@{handle}/videos"] = self.throttle
+
+        patch("nosub.constant_yt", self.stand_in.channelConstants()).start()
+        self.mock_browser = patch("webbrowser.open_new_tab", return_value = None).start()
+        patch("nosub.connectToDB", side_effect = self.mockConnectionToRndDB).start()
+        patch("nosub.time.sleep", return_value = None).start()
+        patch("nosub.random.uniform", return_value = 0).start()
+        nosub.verboseprint = lambda *a, **k: None
+        nosub.connection_stats.reset()
+        nosub.openSession(16)
+
+    def tearDown(self):
+        nosub.closeSession()
+        patch.stopall()
+        self.stand_in.close()
+        tearDownRandomDB(self)
+
+    def mockConnectionToRndDB(self, *args, **kwargs):
+        args[0].connection = sqlite3.connect(self.connection_string)
+        args[0].status = nosub.ConnectionWrapper.OPEN
+
+    def throttle(self, handler):
+        with self.lock:
+            self.in_flight = self.in_flight + 1
+            self.most_in_flight = max(self.most_in_flight, self.in_flight)
+            too_many = self.in_flight > self.allowed
+            if too_many:
+                self.throttled = self.throttled + 1
+        try:
+            if too_many:
+                return (429, b"", {})
+            #time.sleep is patched out
+            threading.Event().wait(0.02)
+            handle = handler.path.split("@")[1].split("/")[0]
+            return (200, buildChannelPage("Videos", [videoItem(f"V{int(handle[-2:]):010d}")]), {})
+        finally:
+            with self.lock:
+                self.in_flight = self.in_flight - 1
+
+    def runEngine(self, engine, concurrency):
+        settings = nosub.RunSettings(engine = engine, jobs = 16, concurrency = concurrency, retry = nosub.RetryPolicy(retries = 20))
+        with patch("sys.stderr", new_callable = io.StringIO):
+            nosub.normalExec([writeHandleFile(self, self.handles)], nosub.constant_infs.LOAD_TO_KNOWN, nosub.constant_infs.NO_LIMIT, settings)
+        return self.throttled, nosub.connection_stats.takeFailures()
+
+    def testThreadEngineBacksOff(self):
+        fixed, _ = self.runEngine(nosub.constant_engines.THREAD, nosub.constant_concurrency.FIXED)
+        self.throttled = 0
+        self.cursor.execute("DELETE FROM KnownVideos")
+        self.cursor.execute("DELETE FROM SeenVideos")
+        self.testing_db.commit()
+        self.mock_browser.reset_mock()
+        adaptive, failures = self.runEngine(nosub.constant_engines.THREAD, nosub.constant_concurrency.ADAPTIVE)
+
+        self.assertEqual(failures, OrderedDict())
+        self.assertEqual(self.mock_browser.call_count, len(self.handles))
+        self.assertGreater(fixed, 0)
+        self.assertLess(adaptive, fixed / 2)
+
+    def testAsyncEngineBacksOff(self):
+        adaptive, failures = self.runEngine(nosub.constant_engines.ASYNC, nosub.constant_concurrency.ADAPTIVE)
+
+        self.assertEqual(failures, OrderedDict())
+        self.assertEqual(self.mock_browser.call_count, len(self.handles))
+        self.assertLess(adaptive, len(self.handles))
+
+class PaginationTesting(unittest.TestCase):
+    browse_path = "/youtubei/v1/browse"
+
+    def setUp(self):
+        create_videos = """
+        CREATE TABLE IF NOT EXISTS KnownVideos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            handle varchar(30) UNIQUE NOT NULL,
+            known_id varchar(11) UNIQUE NOT NULL
+        );
+        """
+        setupRandomDB(self, create_videos)
+        self.cursor.execute("INSERT INTO KnownVideos (handle, known_id) VALUES ('ChannelA', 'K0000000000')")
+        self.testing_db.commit()
+
+        first_page = [videoItem("P0000000001", "1 day ago"), videoItem("P0000000002", "3 days ago"), videoItem("P0000000003", "1 week ago"), continuationItem("PAGE2")]
+        self.next_pages = {
+            "PAGE2": [videoItem("P0000000004", "2 weeks ago"), videoItem("P0000000005", "3 weeks ago"), continuationItem("PAGE3")],
+            "PAGE3": [videoItem("P0000000006", "2 months ago"), videoItem("P0000000007", "3 months ago")],
+        }
+        self.stand_in = StandInServer()
+        self.stand_in.routes["/@ChannelA/videos"] = (200, buildChannelPage("Videos", first_page), {})
+        self.stand_in.routes[self.browse_path] = self.nextPage
+
+        patch("nosub.constant_yt", self.stand_in.channelConstants()).start()
+        self.mock_browser = patch("webbrowser.open_new_tab", return_value = None).start()
+        patch("nosub.connectToDB", side_effect = self.mockConnectionToRndDB).start()
+        patch("nosub.time.sleep", return_value = None).start()
+        nosub.verboseprint = lambda *a, **k: None
+        nosub.connection_stats.reset()
+        nosub.openSession()
+
+    def tearDown(self):
+        nosub.closeSession()
+        patch.stopall()
+        self.stand_in.close()
+        tearDownRandomDB(self)
+
+    def mockConnectionToRndDB(self, *args, **kwargs):
+        args[0].connection = sqlite3.connect(self.connection_string)
+        args[0].status = nosub.ConnectionWrapper.OPEN
+
+    def nextPage(self, handler):
+        items = self.next_pages[self.stand_in.bodies[-1]["continuation"]]
+        data = {"onResponseReceivedActions": [{"appendContinuationItemsAction": {"continuationItems": items}}]}
+        return (200, json.dumps(data).encode("utf-8"), {})
+
+    def opened(self):
+        return [args[0][len("https://www.youtube.com/watch?v="):] for args, _ in self.mock_browser.call_args_list]
+
+    def runChecks(self, time_frame, max_loads, max_pages = nosub.constant_pages.MAX_PAGES):
+        settings = nosub.RunSettings(max_pages = max_pages)
+        nosub.normalExec([writeHandleFile(self, ["ChannelA"])], time_frame, max_loads, settings)
+
+    def testShortCheckStaysOnFirstPage(self):
+        self.cursor.execute("UPDATE KnownVideos SET known_id = 'P0000000002' WHERE handle = 'ChannelA'")
+        self.testing_db.commit()
+        self.runChecks(nosub.constant_infs.LOAD_TO_KNOWN, nosub.constant_infs.NO_LIMIT)
+
+        self.assertEqual(self.opened(), ["P0000000001"])
+        self.assertEqual(self.stand_in.bodies, [])
+
+    def testTimeFrameOnFirstPage(self):
+        self.runChecks(60 * 24 * 5, nosub.constant_infs.NO_LIMIT)
+
+        self.assertEqual(self.opened(), ["P0000000001", "P0000000002"])
+        self.assertEqual(self.stand_in.bodies, [])
+
+    #the next page is only asked for once the first has run out
+    def testTimeFrameFollowsContinuation(self):
+        self.runChecks(60 * 24 * 15, nosub.constant_infs.NO_LIMIT)
+
+        self.assertEqual(self.opened(), ["P0000000001", "P0000000002", "P0000000003", "P0000000004"])
+        self.assertEqual([body["continuation"] for body in self.stand_in.bodies], ["PAGE2"])
+        self.assertEqual(self.stand_in.bodies[0]["context"]["client"]["clientName"], nosub.constant_pages.CLIENT_NAME)
+        known = self.cursor.execute("SELECT known_id FROM KnownVideos WHERE handle = 'ChannelA'").fetchone()
+        self.assertEqual(known, ("P0000000001",))
+
+    def testMaxLoadsFollowsEveryPage(self):
+        self.runChecks(nosub.constant_infs.LOAD_TO_KNOWN, 100)
+
+        self.assertEqual(self.opened(), [f"P000000000{index}" for index in range(1, 8)])
+        self.assertEqual([body["continuation"] for body in self.stand_in.bodies], ["PAGE2", "PAGE3"])
+
+    def testMaxPagesIsKept(self):
+        self.runChecks(nosub.constant_infs.LOAD_TO_KNOWN, 100, max_pages = 2)
+
+        self.assertEqual(len(self.opened()), 5)
+        self.assertEqual(len(self.stand_in.bodies), 1)
+
+    #an offline run only reads what was cached
+    def testOfflineStaysOnCachedPage(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        settings = nosub.RunSettings(cache_dir = cache_dir, cache_ttl = 600)
+        nosub.normalExec([writeHandleFile(self, ["ChannelA"])], 60, nosub.constant_infs.NO_LIMIT, settings)
+        self.cursor.execute("UPDATE KnownVideos SET known_id = 'K0000000000' WHERE handle = 'ChannelA'")
+        self.cursor.execute("DELETE FROM SeenVideos")
+        self.testing_db.commit()
+
+        settings.offline = True
+        nosub.normalExec([writeHandleFile(self, ["ChannelA"])], nosub.constant_infs.LOAD_TO_KNOWN, 100, settings)
+        self.assertEqual(self.opened(), ["P0000000001", "P0000000002", "P0000000003"])
+        self.assertEqual(self.stand_in.bodies, [])
+
+    def testFailedPageKeepsFirstPage(self):
+        self.stand_in.routes[self.browse_path] = (500, b"", {})
+        self.runChecks(nosub.constant_infs.LOAD_TO_KNOWN, 100)
+
+        self.assertEqual(self.opened(), ["P0000000001", "P0000000002", "P0000000003"])
+        self.assertEqual(len(self.stand_in.bodies), nosub.constant_retry.RETRIES + 1)
+
 class InitTest(unittest.TestCase):
     def hi():
         print()
@@ -1,4 +1,5 @@
 import requests
+from requests.adapters import HTTPAdapter
 import webbrowser
 from bs4 import BeautifulSoup
 import sys
@@ -10,6 +11,28 @@ import time
 import sqlite3
 import math
 from collections import namedtuple
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import Future
+from urllib.parse import urlsplit
+from urllib.parse import urljoin
+import asyncio
+import threading
+import ssl
+import zlib
+import hashlib
+from collections import OrderedDict
+import xml.etree.ElementTree as ElementTree
+import subprocess
+import shlex
+import queue
+import html
+import heapq
+import random
+import signal
+import email.utils
+from pathlib import Path
+from datetime import datetime
 
 Constant_Codes = namedtuple('_Constant_Codes', ["EXIT_SUCCESS", "EXIT_FAILURE"])
 exit_codes = Constant_Codes(EXIT_SUCCESS = 0, EXIT_FAILURE = 1)
@@ -17,16 +40,128 @@ exit_codes = Constant_Codes(EXIT_SUCCESS = 0, EXIT_FAILURE = 1)
 Constant_DB = namedtuple('_Constant_DB', ["V_TABLE", "R_TABLE", "DB_NAME"])
 db_tables = Constant_DB(V_TABLE = "KnownVideos", R_TABLE = "KnownReleases", DB_NAME = "knowns.db")
 
-Constant_YT = namedtuple('_Constant_YT', ["YT_BASE", "YTER_PAGE", "YT_VIDEOS", "YT_RELEASES", "YTER_LEN", "V_ID_LEN", "R_ID_LEN"])
-constant_yt = Constant_YT(YT_BASE = "https://www.youtube.com/watch?v=", YTER_PAGE = "https://www.youtube.com/@", YT_VIDEOS = "videos", YT_RELEASES = "releases", YTER_LEN = 25, V_ID_LEN = 11, R_ID_LEN = 41)
-
-Constant_Limits = namedtuple('_Constant_Max', ["VIDEO_URL_LENGTH", "RELEASE_URL_LENGTH", "HNDL_LENGTH_MAX"])
-constant_limits = Constant_Limits(VIDEO_URL_LENGTH = 43, RELEASE_URL_LENGTH = 90, HNDL_LENGTH_MAX = 30)
+#the last ids seen on each handle's page, keyed by the known table they go with
+Constant_Seen = namedtuple('_Constant_Seen', ["V_TABLE", "R_TABLE", "HISTORY_SIZE"])
+seen_tables = Constant_Seen(V_TABLE = "SeenVideos", R_TABLE = "SeenReleases", HISTORY_SIZE = 30)
+
+#etag and last-modified of each handle's tabs from the last time they were fetched
+VALIDATORS_TABLE = "HttpValidators"
+#the UC channel id each handle belongs to
+CHANNELS_TABLE = "ChannelIds"
+#when new uploads were found for each handle, and when it was last checked
+UPLOADS_TABLE = "UploadTimes"
+CHECKS_TABLE = "HandleChecks"
+
+Constant_YT = namedtuple('_Constant_YT', ["YT_BASE", "YTER_PAGE", "YT_VIDEOS", "YT_RELEASES", "YTER_LEN", "V_ID_LEN", "R_ID_LEN", "YT_FEED", "YT_WATCH_VIDEOS", "YT_THUMBNAIL", "YT_BROWSE"])
+constant_yt = Constant_YT(YT_BASE = "https://www.youtube.com/watch?v=", YTER_PAGE = "https://www.youtube.com/@", YT_VIDEOS = "videos", YT_RELEASES = "releases", YTER_LEN = 25, V_ID_LEN = 11, R_ID_LEN = 41,
+                          YT_FEED = "https://www.youtube.com/feeds/videos.xml?channel_id=", YT_WATCH_VIDEOS = "https://www.youtube.com/watch_videos?video_ids=",
+                          YT_THUMBNAIL = "https://i.ytimg.com/vi/", YT_BROWSE = "https://www.youtube.com/youtubei/v1/browse?prettyPrint=false")
+
+#WATCH_VIDEOS_MAX is the most ids youtube puts in a watch_videos playlist
+Constant_Limits = namedtuple('_Constant_Max', ["VIDEO_URL_LENGTH", "RELEASE_URL_LENGTH", "HNDL_LENGTH_MAX", "JOB_WINDOW", "WATCH_VIDEOS_MAX"])
+constant_limits = Constant_Limits(VIDEO_URL_LENGTH = 43, RELEASE_URL_LENGTH = 90, HNDL_LENGTH_MAX = 30, JOB_WINDOW = 2, WATCH_VIDEOS_MAX = 50)
+
+Constant_HTTP = namedtuple('_Constant_HTTP', ["USER_AGENT", "POOL_SIZE"])
+constant_http = Constant_HTTP(USER_AGENT = "python-requests/" + requests.__version__, POOL_SIZE = 10)
+
+#CONNECT and READ are the seconds a request waits to connect and for the server
+#to send something. A request that times out, can't connect or is answered with
+#one of STATUSES is tried again up to RETRIES times, waiting a random part of
+#BACKOFF doubled for each try, at most BACKOFF_MAX. A Retry-After is waited on
+#if it's no longer than RETRY_AFTER_MAX
+Constant_Retry = namedtuple('_Constant_Retry', ["CONNECT", "READ", "RETRIES", "BACKOFF", "BACKOFF_MAX", "RETRY_AFTER_MAX", "STATUSES"])
+constant_retry = Constant_Retry(CONNECT = 5, READ = 20, RETRIES = 3, BACKOFF = 1, BACKOFF_MAX = 30, RETRY_AFTER_MAX = 120, STATUSES = (429, 500, 502, 503, 504))
+
+#why a handle couldn't be checked, as said in the run summary
+Constant_Failures = namedtuple('_Constant_Failures', ["TIMEOUT", "CONNECTION", "THROTTLED", "SERVER", "NOT_FOUND", "NO_DATA", "DEADLINE"])
+constant_failures = Constant_Failures(TIMEOUT = "timed out", CONNECTION = "could not connect", THROTTLED = "rate limited", SERVER = "server error",
+                                      NOT_FOUND = "does not exist", NO_DATA = "page data not found", DEADLINE = "not reached before the deadline")
+
+Constant_Extractors = namedtuple('_Constant_Extractors', ["SCAN", "SOUP"])
+constant_extractors = Constant_Extractors(SCAN = "scan", SOUP = "soup")
+
+Constant_Decodes = namedtuple('_Constant_Decodes', ["FULL", "PARTIAL"])
+constant_decodes = Constant_Decodes(FULL = "full", PARTIAL = "partial")
+
+Constant_Launchers = namedtuple('_Constant_Launchers', ["TAB", "BATCH", "PLAYLIST", "DIGEST"])
+constant_launchers = Constant_Launchers(TAB = "tab", BATCH = "batch", PLAYLIST = "playlist", DIGEST = "digest")
+
+#DELAY is the seconds waited after each tab, or each batch of URLs
+Constant_Open = namedtuple('_Constant_Open', ["DELAY", "BATCH_URLS", "DIGEST_FILE"])
+constant_open = Constant_Open(DELAY = 1, BATCH_URLS = 20, DIGEST_FILE = "nosub_digest.html")
+
+#browser opens the URLs, the others write them out for other programs to read
+Constant_Outputs = namedtuple('_Constant_Outputs', ["BROWSER", "JSONL", "TEXT", "M3U"])
+constant_outputs = Constant_Outputs(BROWSER = "browser", JSONL = "jsonl", TEXT = "text", M3U = "m3u")
+
+Constant_Kinds = namedtuple('_Constant_Kinds', ["VIDEO", "RELEASE"])
+constant_kinds = Constant_Kinds(VIDEO = "video", RELEASE = "release")
+
+#what is known about a new URL when it's found. published is youtube's
+#relative time like "2 days ago", releases don't have one
+Found = namedtuple('Found', ["handle", "kind", "id", "published", "url"])
+
+Constant_Sources = namedtuple('_Constant_Sources', ["PAGE", "FEED"])
+constant_sources = Constant_Sources(PAGE = "page", FEED = "feed")
+
+Constant_Concurrency = namedtuple('_Constant_Concurrency', ["FIXED", "ADAPTIVE"])
+constant_concurrency = Constant_Concurrency(FIXED = "fixed", ADAPTIVE = "adaptive")
+
+#How the adaptive concurrency reacts. DECREASE is what the limit is multiplied
+#by when youtube pushes back. A response taking SPIKE times the usual latency
+#counts as pushing back once SAMPLES responses have set what usual is, and
+#ALPHA is the weight a new response gets in the usual latency.
+#CONGESTION are the statuses that mean too many requests are being made
+Constant_AIMD = namedtuple('_Constant_AIMD', ["DECREASE", "SPIKE", "SAMPLES", "ALPHA", "CONGESTION"])
+constant_aimd = Constant_AIMD(DECREASE = 0.5, SPIKE = 3, SAMPLES = 5, ALPHA = 0.2, CONGESTION = (429, 503))
+
+Constant_Engines = namedtuple('_Constant_Engines', ["THREAD", "ASYNC"])
+constant_engines = Constant_Engines(THREAD = "thread", ASYNC = "async")
+
+Constant_Batch = namedtuple('_Constant_Batch', ["SIZE", "SECONDS"])
+constant_batch = Constant_Batch(SIZE = 100, SECONDS = 5)
+
+#TTL of 0 leaves the cache off unless running offline
+Constant_Cache = namedtuple('_Constant_Cache', ["DIR", "TTL", "MAX_MB"])
+constant_cache = Constant_Cache(DIR = "page_cache", TTL = 0, MAX_MB = 64)
+
+Constant_DB_Profiles = namedtuple('_Constant_DB_Profiles', ["DEFAULT", "FAST"])
+constant_db_profiles = Constant_DB_Profiles(DEFAULT = "default", FAST = "fast")
+
+#pragmas set when a connection opens, default leaves sqlite as it is
+#cache_size is negative so it's in KiB instead of pages
+db_profile_pragmas = {
+    constant_db_profiles.DEFAULT: (),
+    constant_db_profiles.FAST: (("journal_mode", "WAL"), ("synchronous", "NORMAL"), ("mmap_size", 268435456), ("cache_size", -16384)),
+}
+
+#INTERVAL is the seconds between checks of a handle, and JITTER how much of it
+#each check is moved by at random. The handle files are looked at for changes
+#at least every RELOAD_SECONDS
+Constant_Daemon = namedtuple('_Constant_Daemon', ["INTERVAL", "JITTER", "RELOAD_SECONDS"])
+constant_daemon = Constant_Daemon(INTERVAL = 3600, JITTER = 0.1, RELOAD_SECONDS = 30)
+
+#The items of a tab past its first page are asked for with the continuation
+#token at the end of the page, as the CLIENT_NAME client at CLIENT_VERSION.
+#At most MAX_PAGES pages of a tab are read
+Constant_Pages = namedtuple('_Constant_Pages', ["CLIENT_NAME", "CLIENT_VERSION", "MAX_PAGES"])
+constant_pages = Constant_Pages(CLIENT_NAME = "WEB", CLIENT_VERSION = "2.20240101.00.00", MAX_PAGES = 10)
+
+#A handle is checked again once it's more likely than not, CHANCE, to have
+#uploaded going by the gaps between its last UPLOADS uploads. MIN_UPLOADS are
+#needed before that's guessed at and MAX_STALENESS is the longest it's left
+Constant_Adaptive = namedtuple('_Constant_Adaptive', ["CHANCE", "MIN_UPLOADS", "UPLOADS", "MAX_STALENESS"])
+constant_adaptive = Constant_Adaptive(CHANCE = 0.5, MIN_UPLOADS = 3, UPLOADS = 20, MAX_STALENESS = 7 * 24 * 60 * 60)
 
 Constant_Infs = namedtuple('_Constant_Infs', ["LOAD_TO_KNOWN","NO_LIMIT"])
 constant_infs = Constant_Infs(LOAD_TO_KNOWN = math.inf, NO_LIMIT = math.inf)
 
-verboseprint = None
+verboseprint = lambda *a, **k: None
+
+#one keep-alive session is shared by everything that talks to youtube in a run
+#so the DNS lookup and TCP/TLS handshakes are paid once instead of per handle
+http_session = None
+session_lock = threading.RLock()
 
 #wrapper class to allow a connection to be passed by reference
 #per basis so that the connection isn't global.
@@ -38,6 +173,295 @@ class ConnectionWrapper:
     def __init__(self, connection = None, status = CLOSED):
         self.connection = connection
         self.status = status
+        self.batch = None
+        #table -> {handle: known_id} for the tables loaded with loadKnowns
+        self.knowns = {}
+        #table -> {handle: set of seen ids} for the tables loaded with loadSeen
+        self.seen = {}
+        #handle -> UC channel id, loaded with loadChannelIds and added to
+        #from the pages that are read
+        self.channel_ids = {}
+        #what the database has for channel_ids
+        self.saved_channel_ids = {}
+        #ValidatorStore for conditional requests once loaded with loadValidators
+        self.validators = None
+        #(handle, table) -> Cadence, loaded with loadCadences
+        self.cadences = {}
+
+#Groups writes into one transaction so a run doesn't pay for a disk flush on
+#every handle. The transaction is committed once size writes are waiting or
+#seconds have passed since the first one, and at the end of the run.
+#A crash only loses the writes since the last commit, which means those
+#handles will have their newest items loaded again next time instead of
+#the database being left half written. Nothing is committed while the opener
+#still has URLs waiting, so what's marked known has always been opened.
+class WriteBatch:
+    def __init__(self, size: int, seconds: float):
+        self.size = size
+        self.seconds = seconds
+        self.pending = 0
+        self.first_write = None
+        #QueuedLauncher the writes wait on, set with holdBatch
+        self.opener = None
+
+#Counts how many requests went out on a brand new connection compared to one
+#that was kept alive. Updated from worker threads so it's behind a lock
+class ConnectionStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.new = 0
+        #handles where no tab changed since the last run
+        self.skipped = 0
+        #handle -> what kept it from being checked
+        self.failures = OrderedDict()
+
+    def reset(self):
+        with self.lock:
+            self.requests = 0
+            self.new = 0
+            self.skipped = 0
+            self.failures = OrderedDict()
+
+    def countRequest(self):
+        with self.lock:
+            self.requests = self.requests + 1
+
+    def countNewConnection(self):
+        with self.lock:
+            self.new = self.new + 1
+
+    def countSkipped(self):
+        with self.lock:
+            self.skipped = self.skipped + 1
+
+    def reused(self):
+        with self.lock:
+            return self.requests - self.new
+
+    #only the first failure of a handle is kept
+    def countFailure(self, handle: str, reason: str):
+        with self.lock:
+            self.failures.setdefault(handle, reason)
+
+    def failure(self, handle: str):
+        with self.lock:
+            return self.failures.get(handle)
+
+    def takeFailures(self):
+        with self.lock:
+            failures = self.failures
+            self.failures = OrderedDict()
+            return failures
+
+connection_stats = ConnectionStats()
+
+#A request that couldn't get an answer worth reading
+FetchFailure = namedtuple('FetchFailure', ["reason", "detail"])
+
+#How long requests wait and how they're retried. deadline is the
+#time.monotonic() time after which no more requests are started, and what's
+#left of it also caps how long one can wait
+class RetryPolicy:
+    def __init__(self, connect_timeout: float = constant_retry.CONNECT, read_timeout: float = constant_retry.READ, retries: int = constant_retry.RETRIES, deadline: float = None):
+        assert connect_timeout > 0, f"Connect timeout is not usable {connect_timeout=}"
+        assert read_timeout > 0, f"Read timeout is not usable {read_timeout=}"
+        assert retries >= 0, f"Retries is not usable {retries=}"
+
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.deadline = deadline
+
+    def remaining(self) -> float:
+        if self.deadline is None:
+            return math.inf
+        return self.deadline - time.monotonic()
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    #(connect, read) as requests takes it
+    def timeout(self):
+        remaining = self.remaining()
+        return (min(self.connect_timeout, remaining), min(self.read_timeout, remaining))
+
+    #full jitter so clients that failed together don't all come back together
+    def delay(self, attempt: int, retry_after: float = None) -> float:
+        backoff = random.uniform(0, min(constant_retry.BACKOFF_MAX, constant_retry.BACKOFF * 2 ** attempt))
+        if retry_after is not None:
+            backoff = max(backoff, retry_after)
+        return backoff
+
+#Given back in place of elements when the server says a tab hasn't changed
+NOT_MODIFIED = object()
+
+#The validators from the database are only read while fetching. What the
+#responses give back is kept in fresh until the handle has been processed,
+#so a run that stops part way through doesn't skip handles it never checked.
+class ValidatorStore:
+    def __init__(self, known = None):
+        self.lock = threading.Lock()
+        #(handle, tab) -> (etag, last_modified)
+        self.known = known if known is not None else {}
+        self.fresh = {}
+
+    def headers(self, handle: str, tab: str):
+        etag, last_modified = self.known.get((handle, tab), (None, None))
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        return headers
+
+    def remember(self, handle: str, tab: str, headers):
+        etag = headers.get("etag")
+        last_modified = headers.get("last-modified")
+        if etag is None and last_modified is None:
+            return
+
+        with self.lock:
+            self.fresh[(handle, tab)] = (etag, last_modified)
+
+    def take(self, handle: str, tab: str):
+        with self.lock:
+            return self.fresh.pop((handle, tab), None)
+
+#urllib3 makes a new connection with _new_conn, so the pools for the session
+#are swapped for ones that report back when that happens
+class CountingAdapter(HTTPAdapter):
+    def __init__(self, stats: ConnectionStats, *args, **kwargs):
+        self.stats = stats
+        super().__init__(*args, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            scheme: countingPool(pool_class, self.stats) for scheme, pool_class in self.poolmanager.pool_classes_by_scheme.items()
+        }
+
+    def send(self, *args, **kwargs):
+        self.stats.countRequest()
+        return super().send(*args, **kwargs)
+
+def countingPool(pool_class, stats: ConnectionStats):
+    class CountingPool(pool_class):
+        def _new_conn(self):
+            stats.countNewConnection()
+            return super()._new_conn()
+
+    return CountingPool
+
+class PartialDecodeError(Exception):
+    pass
+
+#Walks through JSON text without decoding it. Values that are needed are
+#decoded one at a time with raw_decode, everything else is skipped over.
+#members and elements expect the opening { or [ to already be consumed and
+#each value they stop on has to be consumed with value or skip before moving on
+class JsonCursor:
+    decoder = json.JSONDecoder()
+    whitespace = re.compile(r"[ \t\n\r]*")
+    key_pattern = re.compile(r'[ \t\n\r]*"((?:[^"\\]|\\.)*)"[ \t\n\r]*:')
+
+    def __init__(self, text: str, index: int = 0):
+        self.text = text
+        self.index = index
+
+    def peek(self):
+        self.index = self.whitespace.match(self.text, self.index).end()
+        if self.index >= len(self.text):
+            raise PartialDecodeError("ran out of data")
+        return self.text[self.index]
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise PartialDecodeError(f"expected {char} at {self.index}")
+        self.index = self.index + 1
+
+    def key(self):
+        match = self.key_pattern.match(self.text, self.index)
+        if not match:
+            raise PartialDecodeError(f"expected a key at {self.index}")
+        self.index = match.end()
+        return match.group(1)
+
+    def value(self):
+        self.peek()
+        value, self.index = self.decoder.raw_decode(self.text, self.index)
+        return value
+
+    def skip(self):
+        self.value()
+
+    def more(self, close: str):
+        char = self.peek()
+        self.index = self.index + 1
+        if char == ",":
+            return True
+        if char == close:
+            return False
+        raise PartialDecodeError(f"expected , or {close} at {self.index - 1}")
+
+    def members(self):
+        if self.peek() == "}":
+            self.index = self.index + 1
+            return
+
+        while True:
+            yield self.key()
+            if not self.more("}"):
+                return
+
+    def elements(self):
+        if self.peek() == "]":
+            self.index = self.index + 1
+            return
+
+        while True:
+            yield
+            if not self.more("]"):
+                return
+
+#Options that change how a run is carried out rather than what gets loaded.
+#main fills this in from the arguments and hands it down to the executions
+class RunSettings:
+    def __init__(self, jobs = 1, engine = constant_engines.THREAD, pool_size = constant_http.POOL_SIZE, extractor = constant_extractors.SCAN, decode = constant_decodes.FULL,
+                 batch_size = constant_batch.SIZE, batch_seconds = constant_batch.SECONDS, db_pragmas = (),
+                 cache_dir = constant_cache.DIR, cache_ttl = constant_cache.TTL, cache_mb = constant_cache.MAX_MB, offline = False,
+                 source = constant_sources.PAGE, launcher = constant_launchers.TAB, browser_command = None, batch_urls = constant_open.BATCH_URLS,
+                 open_delay = constant_open.DELAY, output = constant_outputs.BROWSER, output_file = None, digest_file = constant_open.DIGEST_FILE,
+                 interval = constant_daemon.INTERVAL, jitter = constant_daemon.JITTER, adaptive = False, max_staleness = constant_adaptive.MAX_STALENESS, retry = None,
+                 concurrency = constant_concurrency.FIXED, max_pages = constant_pages.MAX_PAGES):
+        self.jobs = jobs
+        self.engine = engine
+        self.pool_size = pool_size
+        self.extractor = extractor
+        self.decode = decode
+        self.batch_size = batch_size
+        self.batch_seconds = batch_seconds
+        self.db_pragmas = db_pragmas
+        self.cache_dir = cache_dir
+        self.cache_ttl = cache_ttl
+        self.cache_mb = cache_mb
+        self.offline = offline
+        self.source = source
+        self.launcher = launcher
+        self.browser_command = browser_command
+        self.batch_urls = batch_urls
+        self.open_delay = open_delay
+        self.output = output
+        #None writes to stdout
+        self.output_file = output_file
+        self.digest_file = digest_file
+        self.interval = interval
+        self.jitter = jitter
+        self.adaptive = adaptive
+        self.max_staleness = max_staleness
+        self.retry = retry if retry is not None else RetryPolicy()
+        self.concurrency = concurrency
+        self.max_pages = max_pages
 
 def main():
     global verboseprint
@@ -63,6 +487,39 @@ def main():
     parser.add_argument("-r", "--releases", action="store_true", default=False, help="Specify to check ONLY releases")
     parser.add_argument("-t", "--time", nargs=2, help="Specify the time frame to load videos. It must be in the format of the number and then the unit such as \"1 year\"")
     parser.add_argument("-n", "--number", type=int, nargs=1, help="Specify at most how many videos to load")
+    parser.add_argument("-j", "--jobs", type=int, nargs=1, help="Specify how many channel pages to fetch at the same time")
+    parser.add_argument("--engine", choices=constant_engines, default=constant_engines.THREAD, help="Specify how pages are fetched. async keeps up to --jobs requests in flight on a single event loop")
+    parser.add_argument("--concurrency", choices=constant_concurrency, default=constant_concurrency.FIXED, help="Specify adaptive to start with few requests at once and find how many youtube allows, up to --jobs")
+    parser.add_argument("--pool-size", type=int, nargs=1, help="Specify how many connections to youtube are kept open for reuse")
+    parser.add_argument("--timeout", type=float, nargs=1, help="Specify how many seconds a request waits for youtube to send something")
+    parser.add_argument("--connect-timeout", type=float, nargs=1, help="Specify how many seconds a request waits to connect to youtube")
+    parser.add_argument("--retries", type=int, nargs=1, help="Specify how many times a request that failed is tried again")
+    parser.add_argument("--deadline", type=float, nargs=1, help="Specify the most seconds the run spends fetching, handles not reached by then are skipped")
+    parser.add_argument("--max-pages", type=int, nargs=1, help="Specify how many pages of a tab are read when -t or -n needs more than the first page has")
+    parser.add_argument("--source", choices=constant_sources, default=constant_sources.PAGE, help="Specify feed to check videos with the channel's Atom feed and only read the videos page when the feed can't be used")
+    parser.add_argument("--extractor", choices=constant_extractors, default=constant_extractors.SCAN, help="Specify how the page data is found. scan reads the raw page and falls back to soup when it can't")
+    parser.add_argument("--decode", choices=constant_decodes, default=constant_decodes.FULL, help="Specify partial to only decode the tab being checked instead of all the page data")
+    parser.add_argument("--batch-size", type=int, nargs=1, help="Specify how many database writes are grouped into one commit")
+    parser.add_argument("--batch-seconds", type=float, nargs=1, help="Specify the most seconds database writes wait before being committed")
+    parser.add_argument("--db-profile", choices=constant_db_profiles, default=constant_db_profiles.DEFAULT, help="Specify fast to open the database with WAL journaling, synchronous=NORMAL, memory mapping and a larger cache")
+    parser.add_argument("--db-mmap-size", type=int, nargs=1, help="Specify how many bytes of the database are memory mapped. 0 turns it off")
+    parser.add_argument("--db-cache-size", type=int, nargs=1, help="Specify how many KiB of the database are cached in memory")
+    parser.add_argument("--launcher", choices=constant_launchers, default=constant_launchers.TAB, help="Specify batch to hand many URLs to the browser at once with --browser-command, playlist to open new videos as one playlist or digest to open a page listing them")
+    parser.add_argument("--browser-command", type=str, nargs=1, help="Specify the command the batch launcher runs with the URLs added to the end. The BROWSER environment variable is used if not given")
+    parser.add_argument("--batch-urls", type=int, nargs=1, help="Specify the most URLs given to the browser at once by the batch launcher")
+    parser.add_argument("--digest-file", type=str, nargs=1, help="Specify the HTML file the digest launcher writes")
+    parser.add_argument("--open-delay", type=float, nargs=1, help="Specify how many seconds to wait after opening a tab, or a batch of URLs")
+    parser.add_argument("--output", choices=constant_outputs, default=constant_outputs.BROWSER, help="Specify jsonl, text or m3u to write new URLs out instead of opening them in the browser")
+    parser.add_argument("--output-file", type=str, nargs=1, help="Specify the file --output writes to instead of stdout")
+    parser.add_argument("--cache-ttl", type=float, nargs=1, help="Specify how many seconds the contents of a channel page are reused from the cache")
+    parser.add_argument("--cache-size", type=float, nargs=1, help="Specify how many MB the cache can take up before the least recently used pages are removed")
+    parser.add_argument("--cache-dir", type=str, nargs=1, help="Specify the folder the cache is kept in")
+    parser.add_argument("--offline", action="store_true", default=False, help="Only use pages from the cache no matter how old they are")
+    parser.add_argument("--daemon", action="store_true", default=False, help="Keep running and check each handle again every --interval seconds")
+    parser.add_argument("--interval", type=float, nargs=1, help="Specify how many seconds the daemon waits between checks of a handle")
+    parser.add_argument("--jitter", type=float, nargs=1, help="Specify how much of the interval, from 0 to 1, each check is moved by at random")
+    parser.add_argument("--adaptive", action="store_true", default=False, help="Only check handles that have likely uploaded since they were last checked, going by how often they upload")
+    parser.add_argument("--max-staleness", type=float, nargs=1, help="Specify the most seconds --adaptive leaves a handle without being checked")
     parser.add_argument("-v", "--verbose", action="store_true", default=False, help="Print out extra information")
     parser.add_argument("--clear-knowns", action="store_true", default=False, help="Clear files used to store information about videos and releases")
 
@@ -122,7 +579,184 @@ def main():
             print("Number must be greater than zero for --number (-n) option", file = sys.stderr)
             sys.exit(exit_codes.EXIT_FAILURE)
 
+    settings = RunSettings(engine = args.engine, extractor = args.extractor, decode = args.decode, source = args.source, concurrency = args.concurrency)
+    if args.jobs:
+        if args.jobs[0] > 0:
+            settings.jobs = args.jobs[0]
+        else:
+            print("Number of jobs must be greater than zero for --jobs (-j) option", file = sys.stderr)
+            sys.exit(exit_codes.EXIT_FAILURE)
+
+    if args.batch_size:
+        if args.batch_size[0] > 0:
+            settings.batch_size = args.batch_size[0]
+        else:
+            print("Batch size must be greater than zero for --batch-size option", file = sys.stderr)
+            sys.exit(exit_codes.EXIT_FAILURE)
+
+    if args.batch_seconds:
+        if args.batch_seconds[0] >= 0:
+            settings.batch_seconds = args.batch_seconds[0]
+        else:
+            print("Batch seconds can not be negative for --batch-seconds option", file = sys.stderr)
+            sys.exit(exit_codes.EXIT_FAILURE)
+
+    mmap_size = None
+    if args.db_mmap_size:
+        if args.db_mmap_size[0] >= 0:
+            mmap_size = args.db_mmap_size[0]
+        else:
+            print("Memory map size can not be negative for --db-mmap-size option", file = sys.stderr)
+            sys.exit(exit_codes.EXIT_FAILURE)
+
+    cache_size = None
+    if args.db_cache_size:
+        if args.db_cache_size[0] > 0:
+            cache_size = args.db_cache_size[0]
+        else:
+            print("Cache size must be greater than zero for --db-cache-size option", file = sys.stderr)
+            sys.exit(exit_codes.EXIT_FAILURE)
+
+    settings.db_pragmas = dbPragmas(args.db_profile, mmap_size, cache_size)
+
+    settings.launcher = args.launcher
+    if args.browser_command:
+        settings.browser_command = args.browser_command[0]
+    elif os.environ.get("BROWSER"):
+        settings.browser_command = os.environ["BROWSER"]
+
+    if settings.launcher == constant_launchers.BATCH and not settings.browser_command:
+        print("The batch launcher needs --browser-command or the BROWSER environment variable to be set", file = sys.stderr)
+        sys.exit(exit_codes.EXIT_FAILURE)
+
+    if args.batch_urls:
+        if args.batch_urls[0] > 0:
+            settings.batch_urls = args.batch_urls[0]
+        else:
+            print("Batch URLs must be greater than zero for --batch-urls option", file = sys.stderr)
+            sys.exit(exit_codes.EXIT_FAILURE)
+
+    if args.digest_file:
+        if not os.path.isdir(os.path.dirname(os.path.abspath(args.digest_file[0]))):
+            print(f"The folder for the digest file {args.digest_file[0]} does not exist", file = sys.stderr)
+            sys.exit(exit_codes.EXIT_FAILURE)
+        settings.digest_file = args.digest_file[0]
+
+    if args.open_delay:
+        if args.open_delay[0] >= 0:
+            settings.open_delay = args.open_delay[0]
+        else:
+            print("Open delay can not be negative for --open-delay option", file = sys.stderr)
+            sys.exit(exit_codes.EXIT_FAILURE)
+
+    settings.output = args.output
+    if args.output_file:
+        if settings.output == constant_outputs.BROWSER:
+            print("--output-file needs --output to be jsonl, text or m3u", file = sys.stderr)
+            sys.exit(exit_codes.EXIT_FAILURE)
+        if not os.path.isdir(os.path.dirname(os.path.abspath(args.output_file[0]))):
+            print(f"The folder for the output file {args.output_file[0]} does not exist", file = sys.stderr)
+            sys.exit(exit_codes.EXIT_FAILURE)
+        settings.output_file = args.output_file[0]
+
+    if args.cache_ttl:
+        if args.cache_ttl[0] >= 0:
+            settings.cache_ttl = args.cache_ttl[0]
+        else:
+            print("Cache TTL can not be negative for --cache-ttl option", file = sys.stderr)
+            sys.exit(exit_codes.EXIT_FAILURE)
+
+    if args.cache_size:
+        if args.cache_size[0] > 0:
+            settings.cache_mb = args.cache_size[0]
+        else:
+            print("Cache size must be greater than zero for --cache-size option", file = sys.stderr)
+            sys.exit(exit_codes.EXIT_FAILURE)
+
+    if args.cache_dir:
+        settings.cache_dir = args.cache_dir[0]
+    settings.offline = args.offline
+
+    if (args.interval or args.jitter) and not args.daemon:
+        print("--interval and --jitter can only be used with --daemon", file = sys.stderr)
+        sys.exit(exit_codes.EXIT_FAILURE)
+
+    if args.interval:
+        if args.interval[0] > 0:
+            settings.interval = args.interval[0]
+        else:
+            print("Interval must be greater than zero for --interval option", file = sys.stderr)
+            sys.exit(exit_codes.EXIT_FAILURE)
+
+    if args.jitter:
+        if 0 <= args.jitter[0] <= 1:
+            settings.jitter = args.jitter[0]
+        else:
+            print("Jitter must be from 0 to 1 for --jitter option", file = sys.stderr)
+            sys.exit(exit_codes.EXIT_FAILURE)
+
+    settings.adaptive = args.adaptive
+    if args.max_staleness:
+        if not args.adaptive:
+            print("--max-staleness can only be used with --adaptive", file = sys.stderr)
+            sys.exit(exit_codes.EXIT_FAILURE)
+        if args.max_staleness[0] > 0:
+            settings.max_staleness = args.max_staleness[0]
+        else:
+            print("Max staleness must be greater than zero for --max-staleness option", file = sys.stderr)
+            sys.exit(exit_codes.EXIT_FAILURE)
+
+    if args.timeout:
+        if args.timeout[0] > 0:
+            settings.retry.read_timeout = args.timeout[0]
+        else:
+            print("Timeout must be greater than zero for --timeout option", file = sys.stderr)
+            sys.exit(exit_codes.EXIT_FAILURE)
+
+    if args.connect_timeout:
+        if args.connect_timeout[0] > 0:
+            settings.retry.connect_timeout = args.connect_timeout[0]
+        else:
+            print("Connect timeout must be greater than zero for --connect-timeout option", file = sys.stderr)
+            sys.exit(exit_codes.EXIT_FAILURE)
+
+    if args.retries:
+        if args.retries[0] >= 0:
+            settings.retry.retries = args.retries[0]
+        else:
+            print("Retries can not be negative for --retries option", file = sys.stderr)
+            sys.exit(exit_codes.EXIT_FAILURE)
+
+    if args.deadline:
+        if args.daemon:
+            print("--deadline can not be used with --daemon", file = sys.stderr)
+            sys.exit(exit_codes.EXIT_FAILURE)
+        if args.deadline[0] <= 0:
+            print("Deadline must be greater than zero for --deadline option", file = sys.stderr)
+            sys.exit(exit_codes.EXIT_FAILURE)
+
+    if args.max_pages:
+        if args.max_pages[0] > 0:
+            settings.max_pages = args.max_pages[0]
+        else:
+            print("Max pages must be greater than zero for --max-pages option", file = sys.stderr)
+            sys.exit(exit_codes.EXIT_FAILURE)
+
+    #every worker should be able to keep its connection and --both has a worker
+    #per tab for every job
+    tab_count = 2 if normal_exec and release_exec else 1
+    settings.pool_size = max(constant_http.POOL_SIZE, settings.jobs * tab_count)
+    if args.pool_size:
+        if args.pool_size[0] > 0:
+            settings.pool_size = args.pool_size[0]
+        else:
+            print("Pool size must be greater than zero for --pool-size option", file = sys.stderr)
+            sys.exit(exit_codes.EXIT_FAILURE)
+
     verboseprint = print if args.verbose else lambda *a, **k: None
+    if args.verbose and settings.output != constant_outputs.BROWSER and settings.output_file is None:
+        #stdout is left to the output alone
+        verboseprint = lambda *a, **k: print(*a, file = sys.stderr, **k)
 
     if args.clear_knowns:
         conn_wrapped = ConnectionWrapper()
@@ -130,171 +764,1359 @@ def main():
         cursor = conn_wrapped.connection.cursor()
         cursor.execute("DELETE FROM KnownVideos")
         cursor.execute("DELETE FROM KnownReleases")
+        cursor.execute(f"DELETE FROM {seen_tables.V_TABLE}")
+        cursor.execute(f"DELETE FROM {seen_tables.R_TABLE}")
+        cursor.execute(f"DELETE FROM {VALIDATORS_TABLE}")
+        cursor.execute(f"DELETE FROM {CHANNELS_TABLE}")
+        cursor.execute(f"DELETE FROM {UPLOADS_TABLE}")
+        cursor.execute(f"DELETE FROM {CHECKS_TABLE}")
         conn_wrapped.connection.commit()
         closeConnection(conn_wrapped)
         sys.exit(exit_codes.EXIT_SUCCESS)
 
     assert normal_exec or release_exec , "Uh oh how did this happen? Some how both executions are false?"
 
-    if normal_exec and release_exec:
-        normalExec(args.file, time_frame, max_loads)
-        releaseExec(args.file, max_loads)
+    openSession(settings.pool_size)
+    if args.deadline:
+        settings.retry.deadline = time.monotonic() + args.deadline[0]
+
+    if args.daemon:
+        tabs = ()
+        if normal_exec:
+            tabs = tabs + (constant_yt.YT_VIDEOS,)
+        if release_exec:
+            tabs = tabs + (constant_yt.YT_RELEASES,)
+
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+        try:
+            daemonExec(args.file, tabs, time_frame, max_loads, settings, stop)
+        except KeyboardInterrupt:
+            pass
+    elif normal_exec and release_exec:
+        bothExec(args.file, time_frame, max_loads, settings)
     elif normal_exec:
-        normalExec(args.file, time_frame, max_loads)
+        normalExec(args.file, time_frame, max_loads, settings)
     else:
-        releaseExec(args.file, max_loads)
+        releaseExec(args.file, max_loads, settings)
+
+    verboseprint(f"Connections made {connection_stats.new}, connections reused {connection_stats.reused()}")
+    verboseprint(f"Handles skipped for not changing since the last run {connection_stats.skipped}")
+    reportFailures()
+    closeSession()
 
     #end of main
 
-def releaseExec(files, max_loads: int):
+#Opens the run's connection with what it needs to check the tables given.
+#Every lookup afterwards is answered from memory
+def prepareConnection(conn_wrapped: ConnectionWrapper, tables, settings: RunSettings):
+    connectToDB(conn_wrapped, settings.db_pragmas)
+    createRunTables(conn_wrapped)
+    for table in tables:
+        loadKnowns(table, conn_wrapped)
+        loadSeen(table, conn_wrapped)
+    loadValidators(conn_wrapped)
+    loadChannelIds(conn_wrapped)
+    if settings.adaptive:
+        loadCadences(conn_wrapped)
+    beginBatch(conn_wrapped, settings.batch_size, settings.batch_seconds)
+
+#Checks videos and releases in one pass. Each handle is read once and both of
+#its tabs are fetched at the same time over the shared session, then the
+#results for the handle are processed together on one connection
+def bothExec(files, time_frame: int, max_loads: int, settings = None):
     assert files, "Not given any files"
+    assert time_frame > 0, f"Time frame is not usable {time_frame=}"
     assert max_loads > 0, f"Max loads is not usable {max_loads=}"
 
-    global verboseprint
+    if settings is None:
+        settings = RunSettings()
 
+    tabs = (constant_yt.YT_VIDEOS, constant_yt.YT_RELEASES)
     conn_wrapped = ConnectionWrapper()
-    connectToDB(conn_wrapped)
-    for file_name in files:
-        with open(file_name, encoding = "ascii") as open_file:
-            for raw_handle in open_file:
-                handle = raw_handle.rstrip("\n")
-                verboseprint(f"checking handle {handle}")
-
-                releases = obtainElements(constant_yt.YT_RELEASES, handle)
-                if not releases:
-                    print(f"Handle \"{handle}\" does not have extractable release content", file = sys.stderr)
-                    continue
-
-                load_count = max_loads
-                new_handle = False
-                verboseprint(f"checking handle {handle}")
-                if not findHandle(handle, db_tables.R_TABLE, conn_wrapped):
-                    addHandle(handle, db_tables.R_TABLE, conn_wrapped)
-                    if load_count == constant_infs.LOAD_TO_KNOWN:
-                        load_count = 1
-                    new_handle = True
-
-                releases_loaded = 0
-                for content in releases:
-                    if releases_loaded >= load_count:
-                        break
-
-                    playlist_id = None
-                    playlist_path = None
-                    try:
-                        element = content["richItemRenderer"]["content"]["playlistRenderer"]
-                        playlist_id = element["playlistId"]
-                        playlist_path = element["navigationEndpoint"]["commandMetadata"]["webCommandMetadata"]["url"]
-                    except KeyError:
-                        #go to next url
-                        break
-
-                    if findID(handle, playlist_id, db_tables.R_TABLE, conn_wrapped):
-                        break
-
-                    release_path = "https://www.youtube.com" + playlist_path
-                    releases_loaded = releases_loaded + 1
-                    openPathWithBrowser(release_path)
-
-                    #sleep to prevent spamming
-                    time.sleep(1)
-
-                if releases_loaded == 0:
-                    verboseprint(f"No new releases for channel {handle}")
-                elif new_handle or releases_loaded > 0:
-                    first_id = releases[0]["richItemRenderer"]["content"]["playlistRenderer"]["playlistId"]
-                    addID(handle, first_id, db_tables.R_TABLE, conn_wrapped) != 0
-
-    #end of big for loop
-    closeConnection(conn_wrapped)
+    prepareConnection(conn_wrapped, (db_tables.V_TABLE, db_tables.R_TABLE), settings)
+    launcher = makeLauncher(settings)
+    holdBatch(conn_wrapped, launcher)
+    try:
+        handles = dueHandles(planHandles(files, conn_wrapped), tabs, conn_wrapped, settings)
+        limiter = makeLimiter(settings, tabs)
+        for handle, results in fetchTabs(tabs, handles, settings, max_loads, conn_wrapped.validators, conn_wrapped.channel_ids, limiter):
+            processHandle(handle, tabs, results, time_frame, max_loads, conn_wrapped, launcher, settings, limiter)
+    finally:
+        #what was found is opened even if the run stopped part way, and what
+        #was written is kept even if opening it fails
+        try:
+            launcher.close()
+        finally:
+            endBatch(conn_wrapped)
+            closeConnection(conn_wrapped)
+
+def releaseExec(files, max_loads: int, settings = None):
+    assert files, "Not given any files"
+    assert max_loads > 0, f"Max loads is not usable {max_loads=}"
 
-def normalExec(files, time_frame: int, max_loads: int):
+    if settings is None:
+        settings = RunSettings()
+
+    conn_wrapped = ConnectionWrapper()
+    prepareConnection(conn_wrapped, (db_tables.R_TABLE,), settings)
+    launcher = makeLauncher(settings)
+    holdBatch(conn_wrapped, launcher)
+    try:
+        #nothing past max_loads is ever looked at so it's the most that needs decoding
+        tabs = (constant_yt.YT_RELEASES,)
+        handles = dueHandles(planHandles(files, conn_wrapped), tabs, conn_wrapped, settings)
+        limiter = makeLimiter(settings, tabs)
+        for handle, results in fetchTabs(tabs, handles, settings, max_loads, conn_wrapped.validators, conn_wrapped.channel_ids, limiter):
+            processHandle(handle, tabs, results, constant_infs.LOAD_TO_KNOWN, max_loads, conn_wrapped, launcher, settings, limiter)
+
+        #end of big for loop
+    finally:
+        #what was found is opened even if the run stopped part way, and what
+        #was written is kept even if opening it fails
+        try:
+            launcher.close()
+        finally:
+            endBatch(conn_wrapped)
+            closeConnection(conn_wrapped)
+
+#Everything done with the tabs fetched for a handle, results is in the same
+#order as tabs. Shared by every execution so they treat a handle the same way
+def processHandle(handle: str, tabs, results, time_frame: int, max_loads: int, conn_wrapped: ConnectionWrapper, launcher, settings = None, limiter = None):
+    if settings is None:
+        settings = RunSettings()
+    #nothing is downloaded offline so only the page that was cached is read
+    max_pages = 1 if settings.offline else settings.max_pages
+
+    failed = connection_stats.failure(handle) is not None
+    if not failed:
+        addChecked(handle, [tabTable(tab_wanted) for tab_wanted in tabs], conn_wrapped)
+    if all(elements is NOT_MODIFIED for elements in results):
+        notModified(handle)
+        return
+
+    for tab_wanted, elements in zip(tabs, results):
+        #what went wrong was already said when it was fetched
+        if elements is None and failed:
+            continue
+        if tab_wanted == constant_yt.YT_VIDEOS:
+            #the page isn't cached apart from the feed, so offline there's nothing more to read
+            read_page = None
+            if not settings.offline:
+                read_page = lambda: obtainElements(constant_yt.YT_VIDEOS, handle, settings.extractor, settings.decode, max_loads, retry = settings.retry, limiter = limiter)
+            processVideos(handle, elements, time_frame, max_loads, conn_wrapped, launcher, max_pages, settings.retry, read_page)
+        else:
+            processReleases(handle, elements, max_loads, conn_wrapped, launcher, max_pages, settings.retry)
+    saveValidators(handle, tabs, results, conn_wrapped)
+    saveChannelId(handle, conn_wrapped)
+    checkpointBatch(conn_wrapped)
+
+#Keeps running and checks each handle again once its interval has passed. The
+#session, the connection and everything loaded into it stay open between
+#checks instead of being set up again for every run. Every handle has its own
+#time it's next due, moved at random by the jitter so handles listed together
+#drift apart instead of all being checked at once. The handle files are read
+#again when they change so handles can be added or removed while it runs.
+#Runs until stop is set
+def daemonExec(files, tabs, time_frame: int, max_loads: int, settings = None, stop = None):
     assert files, "Not given any files"
+    assert tabs, "Not given any tabs"
     assert time_frame > 0, f"Time frame is not usable {time_frame=}"
     assert max_loads > 0, f"Max loads is not usable {max_loads=}"
 
+    if settings is None:
+        settings = RunSettings()
+    if stop is None:
+        stop = threading.Event()
+
+    conn_wrapped = ConnectionWrapper()
+    prepareConnection(conn_wrapped, tuple(tabTable(tab_wanted) for tab_wanted in tabs), settings)
+    schedule = HandleSchedule(settings.interval, settings.jitter)
+    stamps = fileStamps(files)
+    #written output goes to the same file or stream for as long as it runs so
+    #one round doesn't write over the last
+    output = makeLauncher(settings) if settings.output != constant_outputs.BROWSER else None
+    try:
+        schedule.update(planHandles(files, conn_wrapped), time.time())
+        while not stop.is_set():
+            new_stamps = fileStamps(files)
+            if new_stamps != stamps:
+                stamps = new_stamps
+                reloadHandles(files, schedule, conn_wrapped)
+
+            round_start = time.time()
+            due = schedule.due(round_start)
+            if due:
+                verboseprint(f"Checking {len(due)} handles")
+                #a browser launcher per round so the ones that open at the end still open
+                launcher = output if output is not None else makeLauncher(settings)
+                holdBatch(conn_wrapped, launcher)
+                limiter = makeLimiter(settings, tabs)
+                try:
+                    for handle, results in fetchTabs(tabs, due, settings, max_loads, conn_wrapped.validators, conn_wrapped.channel_ids, limiter):
+                        processHandle(handle, tabs, results, time_frame, max_loads, conn_wrapped, launcher, settings, limiter)
+                finally:
+                    if output is None:
+                        launcher.close()
+                checkpointBatch(conn_wrapped, True)
+                reportFailures()
+
+                #each handle's next check goes by how often it uploads, but never
+                #sooner than the interval
+                if settings.adaptive:
+                    loadCadences(conn_wrapped)
+                    for handle in due:
+                        schedule.intervals[handle] = max(settings.interval, handleWait(handle, tabs, conn_wrapped, settings.max_staleness))
+                        schedule.push(handle, round_start + schedule.nextInterval(handle))
+
+            stop.wait(min(schedule.wait(time.time()), constant_daemon.RELOAD_SECONDS))
+    finally:
+        try:
+            if output is not None:
+                output.close()
+        finally:
+            endBatch(conn_wrapped)
+            closeConnection(conn_wrapped)
+
+#The known table that goes with a tab
+def tabTable(tab_wanted: str) -> str:
+    assert tab_wanted in (constant_yt.YT_VIDEOS, constant_yt.YT_RELEASES), f"Invalid tab given {tab_wanted}"
+    return db_tables.V_TABLE if tab_wanted == constant_yt.YT_VIDEOS else db_tables.R_TABLE
+
+#A file that can't be read leaves the handles as they were
+def reloadHandles(files, schedule, conn_wrapped: ConnectionWrapper = None):
+    for file in files:
+        if not checkFile(file):
+            return
+
+    try:
+        handles = planHandles(files, conn_wrapped)
+    except (OSError, UnicodeDecodeError) as e:
+        print(f"Could not read the handle files again: {e}", file = sys.stderr)
+        return
+
+    verboseprint("Handle files changed, using the new list")
+    schedule.update(handles, time.time())
+
+def fileStamps(files):
+    stamps = []
+    for file in files:
+        try:
+            stat = os.stat(file)
+            stamps.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            stamps.append(None)
+    return stamps
+
+#When each handle is next checked, kept in a heap ordered by that time.
+#Entries for handles that were removed or rescheduled are left in the heap
+#and skipped when they come up rather than searched for
+class HandleSchedule:
+    def __init__(self, interval: float = constant_daemon.INTERVAL, jitter: float = constant_daemon.JITTER):
+        assert interval > 0, f"Interval is not usable {interval=}"
+        assert 0 <= jitter <= 1, f"Jitter is not usable {jitter=}"
+
+        self.interval = interval
+        self.jitter = jitter
+        self.heap = []
+        #handle -> the due time of its live entry
+        self.next_due = {}
+        #handle -> its own interval when it has one
+        self.intervals = {}
+        #keeps handles due at the same time in the order they were added
+        self.added = 0
+
+    #handles that are new are due now, ones no longer listed are dropped
+    def update(self, handles, now: float):
+        listed = set(handles)
+        for handle in list(self.next_due):
+            if handle not in listed:
+                del self.next_due[handle]
+                self.intervals.pop(handle, None)
+
+        for handle in handles:
+            if handle not in self.next_due:
+                self.push(handle, now)
+
+    def push(self, handle: str, due: float):
+        self.next_due[handle] = due
+        self.added = self.added + 1
+        heapq.heappush(self.heap, (due, self.added, handle))
+
+    def live(self, entry) -> bool:
+        due, added, handle = entry
+        return self.next_due.get(handle) == due
+
+    #Takes the handles that are due and schedules their next check
+    def due(self, now: float):
+        handles = []
+        while self.heap and self.heap[0][0] <= now:
+            entry = heapq.heappop(self.heap)
+            if not self.live(entry):
+                continue
+            handle = entry[2]
+            handles.append(handle)
+            self.push(handle, now + self.nextInterval(handle))
+        return handles
+
+    def nextInterval(self, handle: str) -> float:
+        interval = self.intervals.get(handle, self.interval)
+        return interval * (1 + random.uniform(-self.jitter, self.jitter))
+
+    #seconds until the next handle is due
+    def wait(self, now: float) -> float:
+        while self.heap and not self.live(self.heap[0]):
+            heapq.heappop(self.heap)
+        if not self.heap:
+            return math.inf
+        return max(0, self.heap[0][0] - now)
+
+def processReleases(handle: str, releases, max_loads: int, conn_wrapped: ConnectionWrapper, launcher = None, max_pages: int = 1, retry = None):
     global verboseprint
 
+    if launcher is None:
+        launcher = TabLauncher()
+
+    if releases is NOT_MODIFIED:
+        verboseprint(f"Releases of {handle} have not changed since the last run")
+        return
+
+    if not releases:
+        print(f"Handle \"{handle}\" does not have extractable release content", file = sys.stderr)
+        return
+
+    load_count = max_loads
+    new_handle = False
+    verboseprint(f"checking handle {handle}")
+    if not findHandle(handle, db_tables.R_TABLE, conn_wrapped):
+        addHandle(handle, db_tables.R_TABLE, conn_wrapped)
+        if load_count == constant_infs.LOAD_TO_KNOWN:
+            load_count = 1
+        new_handle = True
+
+    releases_loaded = 0
+    opened = set()
+    #-n is the only limit that can be past the first page
+    pages = max_pages if max_loads != constant_infs.NO_LIMIT else 1
+    for content in tabItems(releases, pages, retry):
+        playlist_id = None
+        playlist_path = None
+        try:
+            element = content["richItemRenderer"]["content"]["playlistRenderer"]
+            playlist_id = element["playlistId"]
+            playlist_path = element["navigationEndpoint"]["commandMetadata"]["webCommandMetadata"]["url"]
+        except KeyError:
+            #go to next url
+            break
+
+        #stopping at anything seen before means a deleted known id doesn't
+        #make the whole page look new
+        if findID(handle, playlist_id, db_tables.R_TABLE, conn_wrapped) or findSeen(handle, playlist_id, db_tables.R_TABLE, conn_wrapped):
+            break
+
+        release_path = "https://www.youtube.com" + playlist_path
+        releases_loaded = releases_loaded + 1
+        opened.add(playlist_id)
+        launcher.open(release_path, Found(handle, constant_kinds.RELEASE, playlist_id, None, release_path))
+        #checked here so the next item, which could be on the next page, isn't asked for
+        if releases_loaded >= load_count:
+            break
+
+    page_ids = pageIds(releases, "playlistRenderer", "playlistId")
+    if not new_handle and newTop(handle, page_ids, db_tables.R_TABLE, conn_wrapped):
+        addUpload(handle, db_tables.R_TABLE, conn_wrapped)
+
+    if releases_loaded == 0:
+        verboseprint(f"No new releases for channel {handle}")
+    elif new_handle or releases_loaded > 0:
+        first_id = releases[0]["richItemRenderer"]["content"]["playlistRenderer"]["playlistId"]
+        addID(handle, first_id, db_tables.R_TABLE, conn_wrapped) != 0
+
+    seen_ids = handledIds(handle, page_ids, opened, db_tables.R_TABLE, conn_wrapped)
+    if seen_ids and not findSeen(handle, seen_ids[0], db_tables.R_TABLE, conn_wrapped):
+        addSeen(handle, seen_ids, db_tables.R_TABLE, conn_wrapped)
+
+def normalExec(files, time_frame: int, max_loads: int, settings = None):
+    assert files, "Not given any files"
+    assert time_frame > 0, f"Time frame is not usable {time_frame=}"
+    assert max_loads > 0, f"Max loads is not usable {max_loads=}"
+
+    if settings is None:
+        settings = RunSettings()
+
     conn_wrapped = ConnectionWrapper()
-    connectToDB(conn_wrapped)
+    prepareConnection(conn_wrapped, (db_tables.V_TABLE,), settings)
+    launcher = makeLauncher(settings)
+    holdBatch(conn_wrapped, launcher)
+    try:
+        #nothing past max_loads is ever looked at so it's the most that needs decoding
+        tabs = (constant_yt.YT_VIDEOS,)
+        handles = dueHandles(planHandles(files, conn_wrapped), tabs, conn_wrapped, settings)
+        limiter = makeLimiter(settings, tabs)
+        for handle, results in fetchTabs(tabs, handles, settings, max_loads, conn_wrapped.validators, conn_wrapped.channel_ids, limiter):
+            processHandle(handle, tabs, results, time_frame, max_loads, conn_wrapped, launcher, settings, limiter)
+
+        #end of big for loop
+    finally:
+        #what was found is opened even if the run stopped part way, and what
+        #was written is kept even if opening it fails
+        try:
+            launcher.close()
+        finally:
+            endBatch(conn_wrapped)
+            closeConnection(conn_wrapped)
+
+#read_page gives the elements of the videos page for when videos came from the
+#feed and every entry in it was wanted
+def processVideos(handle: str, videos, time_frame: int, max_loads: int, conn_wrapped: ConnectionWrapper, launcher = None, max_pages: int = 1, retry = None, read_page = None):
+    global verboseprint
+
+    if launcher is None:
+        launcher = TabLauncher()
+
+    if videos is NOT_MODIFIED:
+        verboseprint(f"Videos of {handle} have not changed since the last run")
+        return
+
+    if not videos:
+        print(f"Handle \"{handle}\" does not have extractable video content", file = sys.stderr)
+        return
+
+    load_count = max_loads
+    new_handle = False
+    verboseprint(f"checking handle {handle}")
+    if not findHandle(handle, db_tables.V_TABLE, conn_wrapped):
+        addHandle(handle, db_tables.V_TABLE, conn_wrapped)
+        if max_loads == constant_infs.NO_LIMIT and time_frame == constant_infs.LOAD_TO_KNOWN:
+            #if neither limit isn't placed then it isn't known when to stop
+            load_count = 1
+        new_handle = True
+
+    videos_loaded = 0
+    opened = set()
+
+    #-t and -n are the only limits that can be past the first page, stopping
+    #at the known id never looks further than it
+    pages = max_pages if time_frame != constant_infs.LOAD_TO_KNOWN or max_loads != constant_infs.NO_LIMIT else 1
+
+    if read_page is not None and fromFeed(videos):
+        items = feedItems(videos, read_page, pages, retry)
+    else:
+        items = tabItems(videos, pages, retry)
+
+    #load other content
+    for content in items:
+        try:
+            element = content["richItemRenderer"]["content"]["videoRenderer"]
+            video_id = element["videoId"]
+        except KeyError:
+            #reached the end of what could be loaded
+            break
+
+        #stopping at anything seen before means a deleted known id doesn't
+        #make the whole page look new
+        if findID(handle, video_id, db_tables.V_TABLE, conn_wrapped) or findSeen(handle, video_id, db_tables.V_TABLE, conn_wrapped):
+            break
+
+        time_phrase = None
+        converted_time = None
+        try:
+            if "publishedAt" in element:
+                #the feed gives the exact time
+                converted_time = (time.time() - element["publishedAt"]) / 60
+            else:
+                time_phrase = (element["publishedTimeText"]["simpleText"]).split(" ")
+                converted_time = convertToMinutes(time_phrase[0], time_phrase[1])
+        except KeyError:
+            verboseprint("Loading premiere video")
+            converted_time = 0
+
+        #then check the time as a new video could have an id
+        #not in range
+        if converted_time > time_frame:
+            break
+
+        video_path = constant_yt.YT_BASE + video_id
+        videos_loaded = videos_loaded + 1
+        opened.add(video_id)
+        published = element.get("publishedTimeText", {}).get("simpleText")
+        launcher.open(video_path, Found(handle, constant_kinds.VIDEO, video_id, published, video_path))
+        #checked here so the next item, which could be on the next page, isn't asked for
+        if videos_loaded >= load_count:
+            break
+
+    page_ids = pageIds(videos, "videoRenderer", "videoId")
+    if not new_handle and newTop(handle, page_ids, db_tables.V_TABLE, conn_wrapped):
+        addUpload(handle, db_tables.V_TABLE, conn_wrapped)
+
+    #No new videos
+    if videos_loaded == 0:
+        time_phrase = (videos[0]["richItemRenderer"]["content"]["videoRenderer"]["publishedTimeText"]["simpleText"]).split(" ")
+        verboseprint(f"Youtube channel {handle} has not uploaded in {time_phrase[0]} {time_phrase[1]}")
+
+    if new_handle or videos_loaded > 0:
+        first_id = videos[0]["richItemRenderer"]["content"]["videoRenderer"]["videoId"]
+        addID(handle, first_id, db_tables.V_TABLE, conn_wrapped)
+
+    seen_ids = handledIds(handle, page_ids, opened, db_tables.V_TABLE, conn_wrapped)
+    if seen_ids and not findSeen(handle, seen_ids[0], db_tables.V_TABLE, conn_wrapped):
+        addSeen(handle, seen_ids, db_tables.V_TABLE, conn_wrapped)
+
+#Says why a handle couldn't be checked. Past the deadline every handle left
+#fails the same way so those are only in the summary
+def failHandle(handle: str, failure: FetchFailure):
+    if failure.reason != constant_failures.DEADLINE:
+        print(f"Could not check handle {handle}, it {failure.reason}: {failure.detail}", file = sys.stderr)
+    connection_stats.countFailure(handle, failure.reason)
+
+#The handles that couldn't be checked grouped by why
+def reportFailures():
+    failures = connection_stats.takeFailures()
+    if not failures:
+        return
+
+    by_reason = OrderedDict()
+    for handle, reason in failures.items():
+        by_reason.setdefault(reason, []).append(handle)
+
+    print(f"{len(failures)} handles could not be checked", file = sys.stderr)
+    for reason, handles in by_reason.items():
+        print(f"  {reason} ({len(handles)}): {', '.join(handles)}", file = sys.stderr)
+
+def notModified(handle: str):
+    verboseprint(f"Handle {handle} has not changed since the last run")
+    connection_stats.countSkipped()
+
+#Whether the top of the page is something not there the last time it was checked
+def newTop(handle: str, page_ids, table: str, conn_wrapped: ConnectionWrapper) -> bool:
+    if not page_ids:
+        return False
+    return not findID(handle, page_ids[0], table, conn_wrapped) and not findSeen(handle, page_ids[0], table, conn_wrapped)
+
+#The ids of a page that are done with once the known id is saved. That's the
+#ones opened and the known or seen id the page reached with everything after it.
+#A new item -t or -n stopped before isn't one, so a run with a wider -t still finds it
+def handledIds(handle: str, page_ids, opened, table: str, conn_wrapped: ConnectionWrapper):
+    reached = len(page_ids)
+    for index, id in enumerate(page_ids):
+        if findID(handle, id, table, conn_wrapped) or findSeen(handle, id, table, conn_wrapped):
+            reached = index
+            break
+    return [id for index, id in enumerate(page_ids) if index >= reached or id in opened]
+
+#The ids at the top of a page, newest first, up to the size of the history
+def pageIds(elements, renderer: str, id_key: str):
+    page_ids = []
+    for content in elements:
+        if len(page_ids) >= seen_tables.HISTORY_SIZE:
+            break
+        try:
+            page_ids.append(content["richItemRenderer"]["content"][renderer][id_key])
+        except KeyError:
+            break
+
+    return page_ids
+
+def readHandles(files):
+    assert files, "Not given any files"
+
     for file_name in files:
         with open(file_name, encoding = "ascii") as open_file:
             for raw_handle in open_file:
-                handle = raw_handle.rstrip("\n")
-
-                videos = obtainElements(constant_yt.YT_VIDEOS, handle)
-                if not videos:
-                    print(f"Handle \"{handle}\" does not have extractable video content", file = sys.stderr)
-                    continue
-
-                load_count = max_loads
-                new_handle = False
-                verboseprint(f"checking handle {handle}")
-                if not findHandle(handle, db_tables.V_TABLE, conn_wrapped):
-                    addHandle(handle, db_tables.V_TABLE, conn_wrapped)
-                    if max_loads == constant_infs.NO_LIMIT and time_frame == constant_infs.LOAD_TO_KNOWN:
-                        #if neither limit isn't placed then it isn't known when to stop
-                        load_count = 1
-                    new_handle = True
-
-                videos_loaded = 0
-
-                #load other content
-                for content in videos:
-                    if videos_loaded >= load_count:
-                        break
-
-                    try:
-                        element = content["richItemRenderer"]["content"]["videoRenderer"]
-                        video_id = element["videoId"]
-                    except KeyError:
-                        #reached continuation element
-                        break
-
-                    if findID(handle, video_id, db_tables.V_TABLE, conn_wrapped):
-                        break
-
-                    time_phrase = None
-                    converted_time = None
-                    try:
-                        time_phrase = (element["publishedTimeText"]["simpleText"]).split(" ")
-                        converted_time = convertToMinutes(time_phrase[0], time_phrase[1])
-                    except KeyError:
-                        verboseprint("Loading premiere video")
-                        converted_time = 0
-
-                    #then check the time as a new video could have an id
-                    #not in range
-                    if converted_time > time_frame:
-                        break
-
-                    video_path = constant_yt.YT_BASE + video_id
-                    videos_loaded = videos_loaded + 1
-                    openPathWithBrowser(video_path)
-
-                    #sleep to prevent spamming
-                    time.sleep(1)
-
-                #No new videos
-                if videos_loaded == 0:
-                    time_phrase = (videos[0]["richItemRenderer"]["content"]["videoRenderer"]["publishedTimeText"]["simpleText"]).split(" ")
-                    verboseprint(f"Youtube channel {handle} has not uploaded in {time_phrase[0]} {time_phrase[1]}")
-
-                if new_handle or videos_loaded > 0:
-                    first_id = videos[0]["richItemRenderer"]["content"]["videoRenderer"]["videoId"]
-                    addID(handle, first_id, db_tables.V_TABLE, conn_wrapped)
-
-    #end of big for loop
-    closeConnection(conn_wrapped)
+                yield raw_handle.rstrip("\n")
+
+#Every file is read before anything is fetched so a channel that is listed
+#more than once, in any of the files, is only checked once. Youtube handles
+#aren't case sensitive so they're compared casefolded, but the spelling seen
+#first is the one used, unless the database already has the handle under
+#another spelling. Handles stay in the order they were first seen.
+def planHandles(files, conn_wrapped: ConnectionWrapper = None):
+    assert files, "Not given any files"
 
-def openPathWithBrowser(path: str):
+    planned = []
+    first_seen = {}
+    duplicates = 0
+    for file_name in files:
+        for handle in readHandles([file_name]):
+            canonical = handle.casefold()
+            if canonical in first_seen:
+                seen_handle, seen_file = first_seen[canonical]
+                print(f"Handle \"{handle}\" in {file_name} is already listed as \"{seen_handle}\" in {seen_file}, it will only be checked once", file = sys.stderr)
+                duplicates = duplicates + 1
+                continue
+
+            first_seen[canonical] = (handle, file_name)
+            planned.append(handle)
+
+    verboseprint(f"Checking {len(planned)} handles, skipped {duplicates} duplicates")
+    if conn_wrapped is not None:
+        planned = canonicalHandles(planned, conn_wrapped)
+    return planned
+
+#The spelling every table keys a handle by is the one it was first stored
+#with, so a handle listed as MrBeast in one run and mrbeast in the next is
+#still the same channel. Handles the database doesn't have keep their spelling
+def canonicalHandles(handles, conn_wrapped: ConnectionWrapper):
+    stored = {}
+    for table in (db_tables.V_TABLE, db_tables.R_TABLE):
+        for handle in storedHandles(table, conn_wrapped):
+            stored.setdefault(handle.casefold(), handle)
+
+    canonical = []
+    for handle in handles:
+        stored_handle = stored.get(handle.casefold(), handle)
+        if stored_handle != handle:
+            verboseprint(f"Handle \"{handle}\" is checked as \"{stored_handle}\", the spelling it was first stored with")
+        canonical.append(stored_handle)
+    return canonical
+
+#Yields (handle, elements) in the same order the handles were given in, with
+#the elements of every tab given as a list in the same order as the tabs.
+#With more than one job the pages are fetched and parsed on a thread pool,
+#but only a window of handles are in flight at once so memory stays bounded.
+#The caller still does all of the database and browser work on its own thread
+#so those happen in the same order as the serial path.
+#The tabs of a handle are always fetched at the same time.
+#With validators the requests are conditional and a tab that hasn't changed
+#comes back as NOT_MODIFIED instead of its elements.
+#channel_ids is used by the feed source and any handle missing from it gets
+#its id from the page when the page is read.
+#The limiter can be given so pages read after fetching, like the videos page a
+#feed needs, share it. Otherwise one is made for the run when it's wanted.
+def fetchTabs(tabs, handles, settings, limit = constant_infs.NO_LIMIT, validators = None, channel_ids = None, limiter = None):
+    assert tabs, "Not given any tabs"
+    for tab_wanted in tabs:
+        assert tab_wanted in (constant_yt.YT_VIDEOS, constant_yt.YT_RELEASES), f"Invalid tab given {tab_wanted}"
+    assert settings.jobs > 0, f"Job count is not usable {settings.jobs=}"
+    assert settings.engine in constant_engines, f"Invalid engine given {settings.engine}"
+
+    cache = openPageCache(settings)
+    if limiter is None:
+        limiter = makeLimiter(settings, tabs)
+    try:
+        #the feed falls back to the page on its own which the event loop
+        #isn't set up for, so it always goes through the workers
+        if settings.engine == constant_engines.ASYNC and not settings.offline and settings.source == constant_sources.PAGE:
+            yield from asyncFetchTabs(tabs, handles, settings, limit, validators, cache, channel_ids, limiter)
+            return
+
+        if settings.jobs == 1 and len(tabs) == 1:
+            for handle in handles:
+                yield handle, [cachedElements(cache, tabs[0], handle, settings, limit, validators, channel_ids, limiter)]
+            return
+
+        #a little more than the worker count so workers aren't left idle while
+        #the caller is busy with the results. With a limiter the workers past
+        #its limit wait on it instead of making requests
+        window = settings.jobs * constant_limits.JOB_WINDOW
+        with ThreadPoolExecutor(max_workers = settings.jobs * len(tabs)) as executor:
+            submit = lambda handle: [executor.submit(cachedElements, cache, tab_wanted, handle, settings, limit, validators, channel_ids, limiter) for tab_wanted in tabs]
+            yield from resultsInOrder(handles, submit, window)
+    finally:
+        if cache is not None:
+            cache.close()
+
+def makeLimiter(settings, tabs):
+    if settings.concurrency != constant_concurrency.ADAPTIVE:
+        return None
+    return AimdLimiter(settings.jobs * len(tabs))
+
+#obtainElements that goes through the cache first when there is one
+def cachedElements(cache, tab_wanted: str, handle: str, settings, limit = constant_infs.NO_LIMIT, validators = None, channel_ids = None, limiter = None):
+    if cache is None:
+        return sourceElements(tab_wanted, handle, settings, limit, validators, channel_ids, limiter)
+
+    elements = cache.get(handle, tab_wanted, limit)
+    if elements is not None:
+        return elements
+
+    if cache.offline:
+        print(f"No cached {tab_wanted} for handle {handle}", file = sys.stderr)
+        return None
+
+    elements = sourceElements(tab_wanted, handle, settings, limit, validators, channel_ids, limiter)
+    cache.put(handle, tab_wanted, decodedLimit(settings, limit), elements)
+    return elements
+
+#Videos come from the feed when it's wanted and able to answer,
+#otherwise from the page
+def sourceElements(tab_wanted: str, handle: str, settings, limit = constant_infs.NO_LIMIT, validators = None, channel_ids = None, limiter = None):
+    if settings.source == constant_sources.FEED and tab_wanted == constant_yt.YT_VIDEOS and validateHandle(handle):
+        channel_id = channel_ids.get(handle) if channel_ids is not None else None
+        if channel_id is not None:
+            elements = feedElements(channel_id, limit, settings.retry, limiter)
+            if elements is not None:
+                return elements
+            #the id may be out of date so it's taken from the page again
+            verboseprint(f"Feed for {handle} could not be used, reading the videos page")
+            channel_ids.pop(handle, None)
+
+    return obtainElements(tab_wanted, handle, settings.extractor, settings.decode, limit, validators, channel_ids, settings.retry, limiter)
+
+#only a partial decode stops at the limit, a full one has the whole tab
+def decodedLimit(settings, limit):
+    return limit if settings.decode == constant_decodes.PARTIAL else constant_infs.NO_LIMIT
+
+#The event loop only downloads. Parsing is CPU work that would stall every
+#other request on the loop, so it's done here on the caller's thread while
+#the loop keeps the next pages coming in.
+#Tabs found in the cache are handed back as their elements in place of a response.
+def asyncFetchTabs(tabs, handles, settings, limit = constant_infs.NO_LIMIT, validators = None, cache = None, channel_ids = None, limiter = None):
+    fetcher = AsyncFetcher(settings.retry, limiter)
+    try:
+        def submit(handle):
+            if not validateHandle(handle):
+                print(f"Handle given is not a valid handle {handle}", file = sys.stderr)
+                return [completedFuture(None) for _ in tabs]
+
+            futures = []
+            for tab_wanted in tabs:
+                cached = cache.get(handle, tab_wanted, limit) if cache is not None else None
+                if cached is not None:
+                    futures.append(completedFuture(cached))
+                else:
+                    futures.append(fetcher.submit(constant_yt.YTER_PAGE + handle + "/" + tab_wanted, validators.headers(handle, tab_wanted) if validators else None))
+            return futures
+
+        #the window is the number of requests in flight as each one is
+        #started on the loop as soon as it's submitted
+        window = max(1, settings.jobs // len(tabs))
+        for handle, responses in resultsInOrder(handles, submit, window):
+            elements = []
+            for tab_wanted, response in zip(tabs, responses):
+                if isinstance(response, FetchFailure):
+                    failHandle(handle, response)
+                    elements.append(None)
+                elif not isinstance(response, AsyncResponse):
+                    elements.append(response)
+                elif response.status_code == 304:
+                    elements.append(NOT_MODIFIED)
+                else:
+                    if validators:
+                        validators.remember(handle, tab_wanted, response.headers)
+                    learnChannelId(channel_ids, handle, response.status_code, response.content)
+                    elements.append(elementsFromPage(tab_wanted, handle, response.status_code, response.content, settings.extractor, settings.decode, limit))
+                    if cache is not None:
+                        cache.put(handle, tab_wanted, decodedLimit(settings, limit), elements[-1])
+            yield handle, elements
+    finally:
+        fetcher.close()
+
+#submit is expected to start the work and return a list of concurrent futures
+#for it. The results are given back as a list in the same order.
+def resultsInOrder(handles, submit, window: int):
+    assert window > 0, f"Window is not usable {window=}"
+
+    in_flight = deque()
+    for handle in handles:
+        in_flight.append((handle, submit(handle)))
+        if len(in_flight) >= window:
+            done_handle, futures = in_flight.popleft()
+            yield done_handle, [future.result() for future in futures]
+
+    while in_flight:
+        done_handle, futures = in_flight.popleft()
+        yield done_handle, [future.result() for future in futures]
+
+def completedFuture(result):
+    future = Future()
+    future.set_result(result)
+    return future
+
+def openPageCache(settings):
+    if settings.offline or settings.cache_ttl > 0:
+        return PageCache(settings.cache_dir, settings.cache_ttl, settings.cache_mb, settings.offline)
+    return None
+
+#Keeps the elements already taken out of a channel page so a rerun soon after
+#doesn't download or parse it again. Each handle and tab is a compressed JSON
+#file named by the hash of the key. When the folder grows past max_mb the
+#least recently used files are removed. Workers share it so it's locked.
+class PageCache:
+    SUFFIX = ".json.z"
+
+    def __init__(self, directory: str, ttl: float, max_mb: float, offline: bool = False):
+        assert ttl >= 0, f"TTL is not usable {ttl=}"
+        assert max_mb > 0, f"Cache size is not usable {max_mb=}"
+
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_mb * 1024 * 1024
+        self.offline = offline
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok = True)
+
+        #file name -> size, from least to most recently used
+        self.used = OrderedDict()
+        self.total = 0
+        found = []
+        for entry in os.scandir(directory):
+            if entry.is_file() and entry.name.endswith(self.SUFFIX):
+                stat = entry.stat()
+                found.append((stat.st_mtime, entry.name, stat.st_size))
+        for _, name, size in sorted(found):
+            self.used[name] = size
+            self.total = self.total + size
+
+    #handles aren't case sensitive so neither is their entry
+    def fileName(self, handle: str, tab: str) -> str:
+        return hashlib.sha256(f"{handle.casefold()}/{tab}".encode("utf-8")).hexdigest() + self.SUFFIX
+
+    #None when there isn't a usable entry. Offline ignores the TTL
+    def get(self, handle: str, tab: str, limit = constant_infs.NO_LIMIT):
+        name = self.fileName(handle, tab)
+        path = os.path.join(self.directory, name)
+        try:
+            with open(path, "rb") as cache_file:
+                entry = json.loads(zlib.decompress(cache_file.read()))
+        except (OSError, ValueError, zlib.error):
+            return self.miss()
+
+        if entry.get("handle") != handle or entry.get("tab") != tab:
+            return self.miss()
+        if not self.offline and time.time() - entry["stored"] > self.ttl:
+            return self.miss()
+        #a page stored with a smaller limit is missing entries this run wants
+        stored_limit = entry["limit"]
+        if stored_limit is not None and (limit == constant_infs.NO_LIMIT or stored_limit < limit):
+            return self.miss()
+
+        with self.lock:
+            self.hits = self.hits + 1
+            if name in self.used:
+                self.used.move_to_end(name)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        return entry["contents"]
+
+    def miss(self):
+        with self.lock:
+            self.misses = self.misses + 1
+        return None
+
+    def put(self, handle: str, tab: str, limit, contents):
+        if not contents or contents is NOT_MODIFIED:
+            return
+
+        entry = {
+            "handle": handle,
+            "tab": tab,
+            "stored": time.time(),
+            "limit": None if limit == constant_infs.NO_LIMIT else limit,
+            "contents": contents,
+        }
+        data = zlib.compress(json.dumps(entry, separators = (",", ":")).encode("utf-8"))
+        name = self.fileName(handle, tab)
+        path = os.path.join(self.directory, name)
+        #written to the side first so a reader never sees half a file
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, "wb") as cache_file:
+                cache_file.write(data)
+            os.replace(temp_path, path)
+        except OSError as e:
+            verboseprint(f"Could not cache {tab} of {handle}: {e}")
+            return
+
+        with self.lock:
+            self.total = self.total - self.used.pop(name, 0) + len(data)
+            self.used[name] = len(data)
+            self.evict()
+
+    #lock is expected to be held
+    def evict(self):
+        while self.total > self.max_bytes and self.used:
+            name, size = self.used.popitem(last = False)
+            self.total = self.total - size
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+    def close(self):
+        verboseprint(f"Cache hits {self.hits}, cache misses {self.misses}")
+
+AsyncResponse = namedtuple('AsyncResponse', ["status_code", "headers", "content"])
+
+#Minimal HTTP/1.1 client on asyncio streams so thousands of requests can be
+#in flight from one thread. Only what's needed for GETting channel pages is
+#handled: keep-alive, chunked bodies, gzip/deflate and redirects.
+#The event loop runs on its own thread so the rest of the program can stay
+#synchronous and just wait on the futures handed back by submit.
+class AsyncFetcher:
+    MAX_REDIRECTS = 10
+    REDIRECTS = (301, 302, 303, 307, 308)
+
+    def __init__(self, retry: RetryPolicy = None, limiter = None):
+        self.retry = retry if retry is not None else RetryPolicy()
+        self.limiter = limiter
+        #made on the loop the first time it's needed
+        self.slot_freed = None
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target = self.loop.run_forever, daemon = True)
+        self.thread.start()
+        self.ssl_context = ssl.create_default_context()
+        #(scheme, host, port) -> idle connections that can be reused
+        self.idle = {}
+
+    def submit(self, url: str, headers = None):
+        return asyncio.run_coroutine_threadsafe(self.get(url, headers), self.loop)
+
+    def close(self):
+        if self.loop.is_closed():
+            return
+
+        asyncio.run_coroutine_threadsafe(self.closeIdle(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+    async def closeIdle(self):
+        for connections in self.idle.values():
+            for _, writer in connections:
+                writer.close()
+        self.idle.clear()
+
+    #Retried the same way as fetchPage. Gives back a FetchFailure instead of
+    #raising so one handle doesn't stop the rest
+    async def get(self, url: str, headers = None):
+        failure = None
+        retry_after = None
+        for attempt in range(self.retry.retries + 1):
+            if attempt > 0:
+                wait = self.retry.delay(attempt - 1, retry_after)
+                if (retry_after is not None and retry_after > constant_retry.RETRY_AFTER_MAX) or wait >= self.retry.remaining():
+                    return failure
+                await asyncio.sleep(wait)
+
+            if self.retry.expired():
+                return FetchFailure(constant_failures.DEADLINE, url)
+
+            retry_after = None
+            response = None
+            ticket = await self.acquire()
+            try:
+                response = await self.follow(url, headers)
+            except asyncio.TimeoutError as e:
+                failure = FetchFailure(constant_failures.TIMEOUT, str(e) or "no answer in time")
+                continue
+            except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+                failure = FetchFailure(constant_failures.CONNECTION, str(e))
+                continue
+            finally:
+                await self.release(ticket, congested(response, failure))
+
+            if response.status_code not in constant_retry.STATUSES:
+                return response
+            failure = statusFailure(response.status_code)
+            retry_after = retryAfter(response.headers)
+
+        return failure
+
+    #The limiter is shared with nothing else so its slots are waited on here
+    #without blocking the loop
+    async def acquire(self):
+        if self.limiter is None:
+            return None
+        if self.slot_freed is None:
+            self.slot_freed = asyncio.Condition()
+
+        ticket = None
+        def take():
+            nonlocal ticket
+            ticket = self.limiter.tryAcquire()
+            return ticket is not None
+
+        async with self.slot_freed:
+            await self.slot_freed.wait_for(take)
+        return ticket
+
+    async def release(self, ticket, was_congested: bool):
+        if ticket is None:
+            return
+        self.limiter.release(ticket, was_congested)
+        async with self.slot_freed:
+            self.slot_freed.notify_all()
+
+    async def follow(self, url: str, headers = None):
+        for _ in range(self.MAX_REDIRECTS + 1):
+            response = await self.request(url, headers)
+            location = response.headers.get("location")
+            if response.status_code not in self.REDIRECTS or not location:
+                return response
+            url = urljoin(url, location)
+
+        return response
+
+    async def request(self, url: str, headers = None):
+        parts = urlsplit(url)
+        secure = parts.scheme == "https"
+        port = parts.port or (443 if secure else 80)
+        key = (parts.scheme, parts.hostname, port)
+        target = parts.path or "/"
+        if parts.query:
+            target = target + "?" + parts.query
+
+        request = (
+            f"GET {target} HTTP/1.1\r\n"
+            f"Host: {parts.netloc}\r\n"
+            f"User-Agent: {constant_http.USER_AGENT}\r\n"
+            "Accept-Encoding: gzip, deflate\r\n"
+            "Accept: */*\r\n"
+            "Connection: keep-alive\r\n"
+            + "".join(f"{name}: {value}\r\n" for name, value in (headers or {}).items())
+            + "\r\n"
+        ).encode("ascii")
+
+        #an idle connection may have been closed by the server in the meantime
+        #so it gets one retry on a fresh connection
+        while True:
+            reused = bool(self.idle.get(key))
+            connection_stats.countRequest()
+            if reused:
+                reader, writer = self.idle[key].pop()
+            else:
+                connection_stats.countNewConnection()
+                timeout = self.retry.timeout()
+                reader, writer = await asyncio.wait_for(asyncio.open_connection(parts.hostname, port, ssl = self.ssl_context if secure else None), timeout[0])
+
+            try:
+                writer.write(request)
+                await writer.drain()
+                status_code, headers, content, keep_alive = await asyncio.wait_for(self.readResponse(reader), self.retry.timeout()[1])
+                break
+            except asyncio.TimeoutError:
+                writer.close()
+                raise
+            except (ConnectionError, asyncio.IncompleteReadError):
+                writer.close()
+                if not reused:
+                    raise
+
+        if keep_alive:
+            self.idle.setdefault(key, []).append((reader, writer))
+        else:
+            writer.close()
+
+        return AsyncResponse(status_code, headers, content)
+
+    async def readResponse(self, reader):
+        #a 1xx only says the real response is coming
+        while True:
+            status_line = await reader.readline()
+            if not status_line:
+                raise ConnectionResetError("Connection closed before a response was given")
+
+            version, status_code = status_line.decode("latin-1").split(" ", 2)[:2]
+            status_code = int(status_code)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+            if not 100 <= status_code < 200:
+                break
+
+        keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+        #these never have a body even without a Content-Length so reading to
+        #the end would wait on a connection that's kept open
+        if status_code in (204, 304):
+            content = b""
+        elif "chunked" in headers.get("transfer-encoding", "").lower():
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+            #skip any trailers
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            content = b"".join(chunks)
+        elif "content-length" in headers:
+            content = await reader.readexactly(int(headers["content-length"]))
+        else:
+            content = await reader.read()
+            keep_alive = False
+
+        encoding = headers.get("content-encoding", "").lower()
+        if encoding == "gzip":
+            content = zlib.decompress(content, 16 + zlib.MAX_WBITS)
+        elif encoding == "deflate":
+            content = zlib.decompress(content)
+
+        return status_code, headers, content, keep_alive
+
+def checkPath(path: str):
     assert constant_yt.YT_BASE in path, f"Youtube URL trying to load doesn't contain the Youtube URL base {path=}"
     assert len(path) == constant_limits.VIDEO_URL_LENGTH or len(path) == constant_limits.RELEASE_URL_LENGTH, f"Path trying to load doesn't match any expected length {path=} ({len(path)})"
+
+def openPathWithBrowser(path: str):
+    checkPath(path)
     verboseprint(f"Loading URL {path}")
     try:
         webbrowser.open_new_tab(path)
     except Exception as e:
-        print(e)
+        print(e, file = sys.stderr)
+
+#The launcher runs on its own thread so pages keep being fetched and checked
+#while it waits between opens. Writing the URLs out doesn't wait so it doesn't need one
+def makeLauncher(settings):
+    if settings.output != constant_outputs.BROWSER:
+        return OutputLauncher(settings.output, settings.output_file)
+    if settings.launcher == constant_launchers.BATCH:
+        return QueuedLauncher(BatchLauncher(settings.browser_command, settings.batch_urls, settings.open_delay))
+    if settings.launcher == constant_launchers.PLAYLIST:
+        return QueuedLauncher(PlaylistLauncher(settings.open_delay))
+    if settings.launcher == constant_launchers.DIGEST:
+        return QueuedLauncher(DigestLauncher(settings.digest_file))
+    return QueuedLauncher(TabLauncher(settings.open_delay))
+
+#Hands URLs to another launcher through a queue that a thread empties in the
+#same order they were found. close waits for everything queued to be opened.
+#URLs are checked before being queued so a bad one fails where it was found.
+class QueuedLauncher:
+    def __init__(self, launcher):
+        self.launcher = launcher
+        self.queue = queue.Queue()
+        self.error = None
+        #URLs queued that haven't been opened yet
+        self.lock = threading.Lock()
+        self.waiting = 0
+        self.thread = threading.Thread(target = self.run, daemon = True)
+        self.thread.start()
+
+    def open(self, path: str, found: Found = None):
+        checkPath(path)
+        with self.lock:
+            self.waiting = self.waiting + 1
+        self.queue.put((path, found))
+
+    #Whether any URL queued so far is still waiting to be opened
+    def busy(self) -> bool:
+        with self.lock:
+            return self.waiting > 0
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            #after a failure the rest are still taken so close isn't left waiting
+            if self.error is None:
+                try:
+                    self.launcher.open(*item)
+                except Exception as e:
+                    self.error = e
+            with self.lock:
+                self.waiting = self.waiting - 1
+
+        try:
+            self.launcher.close()
+        except Exception as e:
+            if self.error is None:
+                self.error = e
+
+    def close(self):
+        if not self.thread.is_alive():
+            return
+
+        self.queue.put(None)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+
+#Opens every URL in its own tab as soon as it's found
+class TabLauncher:
+    def __init__(self, delay: float = constant_open.DELAY):
+        assert delay >= 0, f"Delay is not usable {delay=}"
+        self.delay = delay
+
+    def open(self, path: str, found: Found = None):
+        openPathWithBrowser(path)
+
+        #sleep to prevent spamming
+        if self.delay > 0:
+            time.sleep(self.delay)
+
+    def close(self):
+        pass
+
+#Collects URLs and starts the browser command once for every batch_urls of
+#them, like "firefox URL URL URL". Browsers given more than one URL open each
+#in a tab of the window already open, so a run doesn't start a process per URL
+class BatchLauncher:
+    def __init__(self, command: str, batch_urls: int = constant_open.BATCH_URLS, delay: float = constant_open.DELAY):
+        assert command, "The batch launcher needs a browser command"
+        assert batch_urls > 0, f"Batch size is not usable {batch_urls=}"
+        assert delay >= 0, f"Delay is not usable {delay=}"
+
+        self.command = shlex.split(command)
+        self.batch_urls = batch_urls
+        self.delay = delay
+        self.pending = []
+        self.launched = 0
+
+    def open(self, path: str, found: Found = None):
+        checkPath(path)
+        verboseprint(f"Queued URL {path}")
+        self.pending.append(path)
+        if len(self.pending) >= self.batch_urls:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+
+        #the browser gets a moment with the last batch before the next one
+        if self.launched > 0 and self.delay > 0:
+            time.sleep(self.delay)
+
+        urls = self.pending
+        self.pending = []
+        verboseprint(f"Opening {len(urls)} URLs")
+        try:
+            subprocess.Popen(self.command + urls, stdout = subprocess.DEVNULL, stderr = subprocess.DEVNULL)
+        except OSError as e:
+            print(e, file = sys.stderr)
+        self.launched = self.launched + 1
+
+    def close(self):
+        self.flush()
+
+#Puts the new videos of the whole run into watch_videos playlists, one for
+#every WATCH_VIDEOS_MAX of them, and opens those at the end instead of a tab
+#per video. A release is already a playlist so it still gets its own tab
+class PlaylistLauncher:
+    def __init__(self, delay: float = constant_open.DELAY):
+        assert delay >= 0, f"Delay is not usable {delay=}"
+        self.delay = delay
+        self.video_ids = []
+        self.releases = TabLauncher(delay)
+
+    def open(self, path: str, found: Found = None):
+        checkPath(path)
+        if len(path) != constant_limits.VIDEO_URL_LENGTH:
+            self.releases.open(path, found)
+            return
+
+        verboseprint(f"Queued URL {path}")
+        self.video_ids.append(path[len(constant_yt.YT_BASE):])
+
+    def close(self):
+        for path in playlistPaths(self.video_ids):
+            verboseprint(f"Loading URL {path}")
+            try:
+                webbrowser.open_new_tab(path)
+            except Exception as e:
+                print(e, file = sys.stderr)
+
+            if self.delay > 0:
+                time.sleep(self.delay)
+        self.video_ids = []
+
+#The watch_videos URLs that play every id given, in order
+def playlistPaths(video_ids):
+    paths = []
+    for start in range(0, len(video_ids), constant_limits.WATCH_VIDEOS_MAX):
+        chunk = video_ids[start:start + constant_limits.WATCH_VIDEOS_MAX]
+        for video_id in chunk:
+            assert validateVideoId(video_id), f"Video id is not valid {video_id=}"
+        paths.append(constant_yt.YT_WATCH_VIDEOS + ",".join(chunk))
+    return paths
+
+#Writes an HTML page listing everything the run found, grouped by handle, and
+#opens it once at the end. Nothing is opened when nothing was found
+class DigestLauncher:
+    def __init__(self, file: str = constant_open.DIGEST_FILE):
+        self.file = file
+        self.found = []
+
+    def open(self, path: str, found: Found = None):
+        checkPath(path)
+        if found is None:
+            found = Found(None, None, None, None, path)
+        verboseprint(f"Listed URL {path}")
+        self.found.append(found)
+
+    def close(self):
+        with open(self.file, "w", encoding = "utf-8") as digest:
+            digest.write(digestPage(self.found))
+
+        if self.found:
+            path = Path(self.file).resolve().as_uri()
+            verboseprint(f"Loading URL {path}")
+            try:
+                webbrowser.open_new_tab(path)
+            except Exception as e:
+                print(e, file = sys.stderr)
+        self.found = []
+
+def digestPage(found):
+    by_handle = OrderedDict()
+    for item in found:
+        by_handle.setdefault(item.handle, []).append(item)
+
+    page = ["<!DOCTYPE html>", "<html><head><meta charset=\"utf-8\"><title>NoSub</title></head><body>"]
+    page.append(f"<h1>{len(found)} new</h1><p>{datetime.now().strftime('%Y-%m-%d %H:%M')}</p>")
+    for handle, items in by_handle.items():
+        page.append(f"<h2>{html.escape(handle or '')}</h2><ul>")
+        for item in items:
+            thumbnail = ""
+            if item.kind == constant_kinds.VIDEO:
+                thumbnail = f"<img src=\"{constant_yt.YT_THUMBNAIL}{item.id}/mqdefault.jpg\" width=\"160\" loading=\"lazy\" alt=\"\"> "
+            label = " ".join(field for field in (item.kind, item.published) if field) or item.url
+            page.append(f"<li><a href=\"{html.escape(item.url)}\">{thumbnail}{html.escape(label)}</a></li>")
+        page.append("</ul>")
+    page.append("</body></html>")
+    return "\n".join(page) + "\n"
+
+#Writes every URL found to stdout or a file instead of opening it, for runs
+#without a browser like from cron. Each one is written and flushed as soon
+#as it's found so whatever reads it doesn't wait on the end of the run.
+#jsonl is one object per line, text is the fields of Found separated by tabs
+#and m3u is a playlist a media player can open
+class OutputLauncher:
+    def __init__(self, output_format: str, file: str = None):
+        assert output_format in (constant_outputs.JSONL, constant_outputs.TEXT, constant_outputs.M3U), f"Output format is not usable {output_format=}"
+
+        self.output_format = output_format
+        self.owns_stream = file is not None
+        self.stream = open(file, "w", encoding = "utf-8") if self.owns_stream else sys.stdout
+        if self.output_format == constant_outputs.M3U:
+            self.write("#EXTM3U\n")
+
+    def open(self, path: str, found: Found = None):
+        checkPath(path)
+        if found is None:
+            found = Found(None, None, None, None, path)
+
+        if self.output_format == constant_outputs.JSONL:
+            self.write(json.dumps(found._asdict()) + "\n")
+        elif self.output_format == constant_outputs.TEXT:
+            self.write("\t".join("" if field is None else field for field in found) + "\n")
+        else:
+            title = " - ".join(field for field in (found.handle, found.published) if field)
+            self.write(f"#EXTINF:-1,{title or path}\n{path}\n")
+
+    def write(self, text: str):
+        self.stream.write(text)
+        self.stream.flush()
+
+    def close(self):
+        if self.owns_stream:
+            self.stream.close()
+        else:
+            self.stream.flush()
 
 
 def checkFile(file):
@@ -358,57 +2180,306 @@ def convertToMinutes(number_string, unit_string):
 
     return minutes
 
-#will not account for elements past the first scroll page
+#only has the elements of the first scroll page, the continuation item at
+#its end is what tabItems follows for the ones after it
 #the important thing is that only the page that gets loaded
 #will have the proper contents
 #loading from home (featured) will not have the same info
 #as loading directly into videos or releases
-def obtainElements(tab_wanted: str, handle: str):
+def obtainElements(tab_wanted: str, handle: str, extractor: str = None, decode: str = None, limit = constant_infs.NO_LIMIT, validators = None, channel_ids = None, retry = None, limiter = None):
     assert handle is not None, "Can't obtain elements from a None handle"
     assert tab_wanted in (constant_yt.YT_VIDEOS, constant_yt.YT_RELEASES), f"Invalid tab given {tab_wanted}"
 
     if not validateHandle(handle):
-        print(f"Handle given is not a valid handle {handle}")
+        print(f"Handle given is not a valid handle {handle}", file = sys.stderr)
         return None
 
     #keep in mind if the tab doesn't exist it will default to the home page
     page_to_load = constant_yt.YTER_PAGE + handle + "/" + tab_wanted
-    response = requests.get(page_to_load)
+    conditions = validators.headers(handle, tab_wanted) if validators else None
+    response = fetchPage(page_to_load, conditions or None, retry, limiter)
+    if isinstance(response, FetchFailure):
+        failHandle(handle, response)
+        return None
 
-    if response.status_code == 404:
-        print(f"Error 404: channel {handle} does not exist.", file = sys.stderr)
+    if response.status_code == 304:
+        return NOT_MODIFIED
+    if validators:
+        validators.remember(handle, tab_wanted, response.headers)
+    learnChannelId(channel_ids, handle, response.status_code, response.content)
+
+    return elementsFromPage(tab_wanted, handle, response.status_code, response.content, extractor, decode, limit)
+
+#GET through the shared session, or POST the payload as JSON when given one,
+#trying again after a timeout, a failed connection or a 429/5xx. Returns the
+#response, or a FetchFailure saying what went wrong last once the retries are
+#used up or the deadline has passed
+def fetchPage(url: str, headers = None, retry: RetryPolicy = None, limiter = None, payload = None):
+    if retry is None:
+        retry = RetryPolicy()
+
+    failure = None
+    retry_after = None
+    for attempt in range(retry.retries + 1):
+        if attempt > 0:
+            wait = retry.delay(attempt - 1, retry_after)
+            if (retry_after is not None and retry_after > constant_retry.RETRY_AFTER_MAX) or wait >= retry.remaining():
+                return failure
+            verboseprint(f"{url} {failure.reason}, trying again in {wait:.1f} seconds")
+            time.sleep(wait)
+
+        if retry.expired():
+            return FetchFailure(constant_failures.DEADLINE, url)
+
+        retry_after = None
+        response = None
+        ticket = limiter.acquire() if limiter is not None else None
+        try:
+            if payload is None:
+                response = getSession().get(url, headers = headers, timeout = retry.timeout())
+            else:
+                response = getSession().post(url, headers = headers, json = payload, timeout = retry.timeout())
+        except requests.Timeout as e:
+            failure = FetchFailure(constant_failures.TIMEOUT, str(e))
+            continue
+        except requests.RequestException as e:
+            failure = FetchFailure(constant_failures.CONNECTION, str(e))
+            continue
+        finally:
+            if ticket is not None:
+                limiter.release(ticket, congested(response, failure))
+
+        if response.status_code not in constant_retry.STATUSES:
+            return response
+        failure = statusFailure(response.status_code)
+        retry_after = retryAfter(response.headers)
+
+    return failure
+
+#Yields the items of a tab newest first. A page ends with a continuation item
+#when the tab has more, and only once the caller has taken every item before it
+#is the next page asked for. So a check that stops on the first page never pays
+#for the next one. At most max_pages pages are read
+def tabItems(elements, max_pages: int = 1, retry = None):
+    assert max_pages > 0, f"Max pages is not usable {max_pages=}"
+
+    pages = 1
+    while elements:
+        token = None
+        for content in elements:
+            if "continuationItemRenderer" in content:
+                token = continuationToken(content)
+                break
+            yield content
+
+        if token is None or pages >= max_pages:
+            return
+        verboseprint(f"Loading page {pages + 1} of the tab")
+        elements = continuationElements(token, retry)
+        pages = pages + 1
+
+#The feed only has the newest uploads. Once every one of them has been taken
+#the videos page is read for the ones before them, which the feed can't tell about.
+#Items on the page that were in the feed are left out
+def feedItems(videos, read_page, max_pages: int = 1, retry = None):
+    fed = set()
+    for content in videos:
+        fed.add(content["richItemRenderer"]["content"]["videoRenderer"]["videoId"])
+        yield content
+
+    verboseprint("Every upload in the feed is new, reading the videos page for older ones")
+    page = read_page()
+    if page is None or page is NOT_MODIFIED:
+        return
+    for content in tabItems(page, max_pages, retry):
+        video_id = content.get("richItemRenderer", {}).get("content", {}).get("videoRenderer", {}).get("videoId")
+        if video_id not in fed:
+            yield content
+
+def fromFeed(videos) -> bool:
+    try:
+        return "publishedAt" in videos[0]["richItemRenderer"]["content"]["videoRenderer"]
+    except (KeyError, IndexError, TypeError):
+        return False
+
+def continuationToken(content):
+    try:
+        return content["continuationItemRenderer"]["continuationEndpoint"]["continuationCommand"]["token"]
+    except KeyError:
         return None
 
-    soup = BeautifulSoup(response.content, "html.parser")
+#The items of the page after the one the token ended, continuation item
+#included, or None if they can't be had
+def continuationElements(token: str, retry = None):
+    payload = {
+        "context": {"client": {"clientName": constant_pages.CLIENT_NAME, "clientVersion": constant_pages.CLIENT_VERSION}},
+        "continuation": token,
+    }
+    response = fetchPage(constant_yt.YT_BROWSE, None, retry, payload = payload)
+    if isinstance(response, FetchFailure):
+        verboseprint(f"Next page request failed, it {response.reason}: {response.detail}")
+        return None
 
-    #all video information is from an imported script that has ytInitialData
-    info = [script.get_text() for script in soup.find_all('script')]
-    keyTerm = "var ytInitialData"
-    bufferSearch = 17
-    searchScript = ""
+    if response.status_code != 200:
+        verboseprint(f"Next page request failed with HTTP {response.status_code}")
+        return None
 
-    #for scriptValue in info:
-    #reverse search seems to be a little faster
-    for scriptValue in info[::-1]:
-        #buffer the search to avoid searching the entire string
-        if scriptValue[:bufferSearch].find(keyTerm) != -1:
-            searchScript = scriptValue
-            break
+    try:
+        for action in json.loads(response.content)["onResponseReceivedActions"]:
+            if "appendContinuationItemsAction" in action:
+                return action["appendContinuationItemsAction"]["continuationItems"]
+    except (ValueError, KeyError, TypeError):
+        pass
+
+    verboseprint("Next page has no items")
+    return None
+
+#How many requests can be in flight at once, found as the run goes the way TCP
+#finds how much it can send. The limit starts at 1 and goes up by one for every
+#response that comes back fine until youtube first pushes back, then by one
+#for every limit responses. Pushing back is a 429 or 503, a timeout, or a
+#response much slower than usual, and it halves the limit. Responses to
+#requests made before the last cut say the same thing again so they don't cut it again
+class AimdLimiter:
+    def __init__(self, max_limit: int):
+        assert max_limit > 0, f"Max limit is not usable {max_limit=}"
+
+        self.condition = threading.Condition()
+        self.max_limit = max_limit
+        self.limit = 1.0
+        self.slow_start = True
+        self.in_flight = 0
+        #goes up with every cut
+        self.epoch = 0
+        self.latency = None
+        self.samples = 0
+        self.cuts = 0
+
+    def allowed(self) -> int:
+        return max(1, int(self.limit))
+
+    #A ticket if there's room for another request, None if not
+    def tryAcquire(self):
+        with self.condition:
+            if self.in_flight >= self.allowed():
+                return None
+            self.in_flight = self.in_flight + 1
+            return (self.epoch, time.monotonic())
+
+    #Waits for room for another request
+    def acquire(self):
+        with self.condition:
+            self.condition.wait_for(lambda: self.in_flight < self.allowed())
+            self.in_flight = self.in_flight + 1
+            return (self.epoch, time.monotonic())
+
+    def release(self, ticket, was_congested: bool = False):
+        epoch, started = ticket
+        latency = time.monotonic() - started
+        with self.condition:
+            self.in_flight = self.in_flight - 1
+            if not was_congested and self.samples >= constant_aimd.SAMPLES and latency > self.latency * constant_aimd.SPIKE:
+                was_congested = True
+
+            if was_congested:
+                if epoch == self.epoch:
+                    self.limit = max(1.0, self.limit * constant_aimd.DECREASE)
+                    self.slow_start = False
+                    self.epoch = self.epoch + 1
+                    self.cuts = self.cuts + 1
+                    verboseprint(f"Youtube is pushing back, making {self.allowed()} requests at once")
+            else:
+                self.samples = self.samples + 1
+                if self.latency is None:
+                    self.latency = latency
+                else:
+                    self.latency = (1 - constant_aimd.ALPHA) * self.latency + constant_aimd.ALPHA * latency
+                step = 1 if self.slow_start else 1 / self.limit
+                self.limit = min(float(self.max_limit), self.limit + step)
+            self.condition.notify_all()
+
+#Whether an attempt says youtube is getting more requests than it wants
+def congested(response, failure: FetchFailure) -> bool:
+    if response is not None:
+        return response.status_code in constant_aimd.CONGESTION
+    return failure is not None and failure.reason == constant_failures.TIMEOUT
+
+def statusFailure(status_code: int) -> FetchFailure:
+    reason = constant_failures.THROTTLED if status_code == 429 else constant_failures.SERVER
+    return FetchFailure(reason, f"HTTP {status_code}")
+
+#Seconds the server asked to wait, given as seconds or a date, or None
+def retryAfter(headers):
+    value = headers.get("retry-after") if headers else None
+    if not value:
+        return None
+
+    try:
+        return max(0, float(value))
+    except ValueError:
+        pass
 
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0, when.timestamp() - time.time())
+
+#Split from obtainElements so that every fetch engine ends up with the same
+#elements no matter how the page was downloaded
+def elementsFromPage(tab_wanted: str, handle: str, status_code: int, content: bytes, extractor: str = None, decode: str = None, limit = constant_infs.NO_LIMIT):
+    assert handle is not None, "Can't obtain elements from a None handle"
+    assert tab_wanted in (constant_yt.YT_VIDEOS, constant_yt.YT_RELEASES), f"Invalid tab given {tab_wanted}"
+    assert limit > 0, f"Limit is not usable {limit=}"
+
+    if extractor is None:
+        extractor = constant_extractors.SCAN
+    if decode is None:
+        decode = constant_decodes.FULL
+    assert extractor in constant_extractors, f"Invalid extractor given {extractor}"
+    assert decode in constant_decodes, f"Invalid decode given {decode}"
+
+    if status_code == 404:
+        print(f"Error 404: channel {handle} does not exist.", file = sys.stderr)
+        connection_stats.countFailure(handle, constant_failures.NOT_FOUND)
+        return None
+
+    #title in JSON has upper case
+    cap_tab = tab_wanted.capitalize()
+    if extractor == constant_extractors.SCAN:
+        scanned = scanInitialData(content)
+        if scanned is not None:
+            try:
+                return tabFromData(scanned, cap_tab, decode, limit)
+            except ValueError:
+                verboseprint(f"Scanned data for {handle} did not decode, falling back to Beautiful Soup")
+
+    #the soup path is slower, but it's what is used if the page is laid out
+    #in a way the scanner doesn't expect
+    searchScript = soupInitialData(content)
     if not searchScript:
         print("Could not find data required to load", file = sys.stderr)
+        connection_stats.countFailure(handle, constant_failures.NO_DATA)
         return None
 
     #Semicolon is going to be there most of the time, but in case it isn't
     #I don't want the last } to be removed and ruin the parser
     if searchScript[-1] == ';':
         #semi colon at the end messes up the parser
-        json_data = json.loads(searchScript[searchScript.index("{"):-1])
+        return tabFromData(searchScript[searchScript.index("{"):-1], cap_tab, decode, limit)
     else:
-        json_data = json.loads(searchScript[searchScript.index("{"):])
+        return tabFromData(searchScript[searchScript.index("{"):], cap_tab, decode, limit)
 
-    #title in JSON has upper case
-    cap_tab = tab_wanted.capitalize()
+#Raises a ValueError if the data is not valid JSON
+def tabFromData(data, cap_tab: str, decode: str, limit):
+    if decode == constant_decodes.PARTIAL:
+        try:
+            return partialTabContents(data, cap_tab, limit)
+        except PartialDecodeError as e:
+            #layout wasn't what was expected so just decode all of it
+            verboseprint(f"Partial decode not possible ({e}), decoding everything")
+
+    json_data = json.loads(data)
     tab_returned = None
     for tab in json_data["contents"]["twoColumnBrowseResultsRenderer"]["tabs"]:
         try:
@@ -425,6 +2496,263 @@ def obtainElements(tab_wanted: str, handle: str):
     #in addition to a loop needing to parse through the returned array anyway.
     return tab_returned
 
+#Only decodes contents.twoColumnBrowseResultsRenderer.tabs and within the tab
+#wanted only the first limit items of richGridRenderer.contents.
+#Everything else (header, sidebar, tracking params, ...) is jumped over as text
+#and never turned into python objects. The result is the same as the full
+#decode walk, missing keys in the path give None just like the KeyErrors there.
+def partialTabContents(data, cap_tab: str, limit = constant_infs.NO_LIMIT):
+    assert limit > 0, f"Limit is not usable {limit=}"
+
+    text = data.decode("utf-8") if isinstance(data, bytes) else data
+    start = text.find('"twoColumnBrowseResultsRenderer"')
+    if start == -1:
+        raise PartialDecodeError("no twoColumnBrowseResultsRenderer")
+
+    cursor = JsonCursor(text, start)
+    cursor.key()
+    cursor.expect("{")
+    for key in cursor.members():
+        if key == "tabs":
+            break
+        cursor.skip()
+    else:
+        raise PartialDecodeError("no tabs")
+
+    cursor.expect("[")
+    for _ in cursor.elements():
+        cursor.expect("{")
+        tab_keys = cursor.members()
+        if next(tab_keys, None) != "tabRenderer":
+            return None
+
+        is_tab, tab_returned = tabRendererContents(cursor, cap_tab, limit)
+        if is_tab:
+            return tab_returned
+
+        for _ in tab_keys:
+            cursor.skip()
+
+    return None
+
+#Returns (is the tab wanted, contents)
+def tabRendererContents(cursor, cap_tab: str, limit):
+    cursor.expect("{")
+    title = None
+    for key in cursor.members():
+        if key == "title":
+            title = cursor.value()
+        elif key == "content" and title is None:
+            raise PartialDecodeError("content came before the title")
+        elif key == "content" and title == cap_tab:
+            return True, richGridContents(cursor, limit)
+        else:
+            cursor.skip()
+
+    #no title or the right tab without content is a KeyError in the full walk
+    if title is None or title == cap_tab:
+        return True, None
+
+    return False, None
+
+def richGridContents(cursor, limit):
+    cursor.expect("{")
+    for key in cursor.members():
+        if key == "richGridRenderer":
+            break
+        cursor.skip()
+    else:
+        return None
+
+    cursor.expect("{")
+    for key in cursor.members():
+        if key == "contents":
+            break
+        cursor.skip()
+    else:
+        return None
+
+    cursor.expect("[")
+    contents = []
+    for _ in cursor.elements():
+        if len(contents) >= limit:
+            break
+        contents.append(cursor.value())
+
+    return contents
+
+#Only handles without an id are looked for so a known channel doesn't pay
+#for searching its page
+def learnChannelId(channel_ids, handle: str, status_code: int, content: bytes):
+    if channel_ids is None or status_code != 200 or handle in channel_ids:
+        return
+
+    channel_id = channelIdFromPage(content)
+    if channel_id is not None:
+        channel_ids[handle] = channel_id
+
+#The channel page says which channel it is as the externalId of its metadata
+#and in the canonical link, either one is enough
+def channelIdFromPage(content: bytes):
+    found = re.search(rb'"externalId":\s*"(UC[a-zA-Z0-9_-]{22})"', content)
+    if found is None:
+        found = re.search(rb'<link rel="canonical" href="https://www\.youtube\.com/channel/(UC[a-zA-Z0-9_-]{22})"', content)
+    if found is None:
+        return None
+    return found.group(1).decode("ascii")
+
+def validateChannelId(channel_id: str):
+    assert channel_id is not None, "Passed None to validate channel id"
+    return re.fullmatch(r"^UC[a-zA-Z0-9_-]{22}$", channel_id) is not None
+
+#Returns the newest videos of the channel's Atom feed in the same layout as the
+#elements of the videos page, or None if the feed can't answer. The feed has
+#the exact time a video was published so that is given as publishedAt.
+#Shorts are in the feed but not on the videos page so they're left out.
+def feedElements(channel_id: str, limit = constant_infs.NO_LIMIT, retry = None, limiter = None):
+    assert limit > 0, f"Limit is not usable {limit=}"
+
+    if not validateChannelId(channel_id):
+        print(f"Channel id given is not a valid channel id {channel_id}", file = sys.stderr)
+        return None
+
+    response = fetchPage(constant_yt.YT_FEED + channel_id, None, retry, limiter)
+    if isinstance(response, FetchFailure):
+        verboseprint(f"Feed request failed, it {response.reason}: {response.detail}")
+        return None
+
+    if response.status_code != 200:
+        return None
+
+    return elementsFromFeed(response.content, limit)
+
+def elementsFromFeed(content: bytes, limit = constant_infs.NO_LIMIT):
+    namespaces = {
+        "atom": "http://www.w3.org/2005/Atom",
+        "yt": "http://www.youtube.com/xml/schemas/2015",
+    }
+    try:
+        root = ElementTree.fromstring(content)
+    except ElementTree.ParseError:
+        return None
+
+    now = time.time()
+    elements = []
+    for entry in root.findall("atom:entry", namespaces):
+        if len(elements) >= limit:
+            break
+
+        video_id = entry.findtext("yt:videoId", None, namespaces)
+        published = entry.findtext("atom:published", None, namespaces)
+        link = entry.find("atom:link[@rel='alternate']", namespaces)
+        if video_id is None or published is None:
+            return None
+        if link is not None and "/shorts/" in link.get("href", ""):
+            continue
+
+        try:
+            published_at = datetime.fromisoformat(published).timestamp()
+        except ValueError:
+            return None
+
+        minutes = max(0, int((now - published_at) // 60))
+        elements.append({"richItemRenderer": {"content": {"videoRenderer": {
+            "videoId": video_id,
+            "publishedTimeText": {"simpleText": f"{minutes} minutes ago"},
+            "publishedAt": published_at,
+        }}}})
+
+    #nothing but shorts, or an empty feed, says nothing about the videos page
+    if not elements:
+        return None
+
+    return elements
+
+#Finds the ytInitialData JSON straight from the raw bytes of the page without
+#building a DOM. Like the soup path the marker has to be the very start of a
+#script, so a string mentioning it somewhere else doesn't count.
+#Returns the bytes of the JSON object or None if it couldn't be found
+def scanInitialData(content: bytes):
+    assert content is not None, "Can't scan None content"
+
+    marker = b"var ytInitialData"
+    start = content.rfind(marker)
+    while start != -1:
+        tag_start = content.rfind(b"<script", 0, start)
+        if tag_start != -1 and content.find(b">", tag_start, start) == start - 1:
+            break
+        start = content.rfind(marker, 0, start)
+
+    if start == -1:
+        return None
+
+    #a script can't have a literal </script> inside of it so the first one
+    #is where the JSON ends. Youtube escapes any inside of strings.
+    end = content.find(b"</script>", start)
+    if end == -1:
+        return None
+
+    script = content[start:end].rstrip()
+    if script.endswith(b";"):
+        script = script[:-1]
+
+    brace = script.find(b"{")
+    if brace == -1:
+        return None
+
+    return script[brace:]
+
+def soupInitialData(content: bytes):
+    soup = BeautifulSoup(content, "html.parser")
+
+    #all video information is from an imported script that has ytInitialData
+    info = [script.get_text() for script in soup.find_all('script')]
+    keyTerm = "var ytInitialData"
+    bufferSearch = 17
+    searchScript = ""
+
+    #for scriptValue in info:
+    #reverse search seems to be a little faster
+    for scriptValue in info[::-1]:
+        #buffer the search to avoid searching the entire string
+        if scriptValue[:bufferSearch].find(keyTerm) != -1:
+            searchScript = scriptValue
+            break
+
+    return searchScript
+
+#Replaces the shared session with a fresh one. The pool size is how many
+#connections to a host are kept around, so it should be at least the
+#number of jobs or workers end up throwing connections away
+def openSession(pool_size: int = constant_http.POOL_SIZE):
+    assert pool_size > 0, f"Pool size is not usable {pool_size=}"
+
+    global http_session
+    with session_lock:
+        if http_session is not None:
+            http_session.close()
+
+        connection_stats.reset()
+        adapter = CountingAdapter(connection_stats, pool_maxsize = pool_size)
+        http_session = requests.Session()
+        http_session.mount("https://", adapter)
+        http_session.mount("http://", adapter)
+        return http_session
+
+def getSession():
+    with session_lock:
+        if http_session is None:
+            openSession()
+
+        return http_session
+
+def closeSession():
+    global http_session
+    with session_lock:
+        if http_session is not None:
+            http_session.close()
+            http_session = None
+
 def validateHandle(handle: str):
     assert handle is not None, "Passed None to validate handle"
 
@@ -464,6 +2792,30 @@ def validateReleaseId(id: str):
 
     return True
 
+#with the usage of parameterized queries sanitization is not necessary
+#but validation is necessary to prevent garbage data in.
+#If garbage data is entered then that garbage can't be found with expected data
+def validEntry(handle: str, id: str, table: str) -> bool:
+    if not validateHandle(handle):
+        print(f"Invalid handle given \"{handle}\".", file = sys.stderr)
+        return False
+
+    if table == db_tables.V_TABLE:
+        if not validateVideoId(id):
+            print(f"Invalid video id given \"{id}\".", file = sys.stderr)
+            return False
+    else:
+        if not validateReleaseId(id):
+            print(f"Invalid playlist id given \"{id}\".", file = sys.stderr)
+            return False
+
+    return True
+
+#add entry if it doesn't exist otherwise update it, in one statement
+def upsertQuery(table: str) -> str:
+    return (f"INSERT INTO {table} (handle, known_id) VALUES (?, ?) "
+            "ON CONFLICT(handle) DO UPDATE SET known_id = excluded.known_id;")
+
 #This will abstract away if it's updating or adding a new handle
 #either way it's still adding the id
 def addID(handle:str, id: str, table: str, conn_wrapper: ConnectionWrapper):
@@ -473,43 +2825,61 @@ def addID(handle:str, id: str, table: str, conn_wrapper: ConnectionWrapper):
     assert isinstance(conn_wrapper, ConnectionWrapper), "Not using the connection wrapper for adding an ID"
     assert conn_wrapper.status == conn_wrapper.OPEN, "Attempting to used a closed connection to add an ID"
 
-    #with the usage of parameterized queries sanitization is not necessary
-    #but validation is necessary to prevent garbage data in.
-    #If garbage data is entered then that garbage can't be found with expected data
-    if not validateHandle(handle):
-        print(f"Invalid handle given \"{handle}\".", file = sys.stderr)
+    if not validEntry(handle, id, table):
         return -1
 
-    if table == db_tables.V_TABLE:
-        if not validateVideoId(id):
-            print(f"Invalid video id given \"{id}\".", file = sys.stderr)
-            return -1
-    else:
-        if not validateReleaseId(id):
-            print(f"Invalid playlist id given \"{id}\".", file = sys.stderr)
+    #if it fails to add there is no need to rollback as the single statement failed
+    cursor = conn_wrapper.connection.cursor()
+    try:
+        cursor.execute(upsertQuery(table), (handle, id))
+    except Exception as e:
+        print(e, file = sys.stderr)
+        sys.exit(exit_codes.EXIT_FAILURE)
+
+    known = conn_wrapper.knowns.get(table)
+    if known is not None:
+        known[handle] = id
+    commitWrite(conn_wrapper)
+
+    return 0
+
+#Same as addID but for many (handle, id) pairs in one executemany.
+#Every pair is validated first so nothing is written if any of them is garbage
+def addIDs(entries, table: str, conn_wrapper: ConnectionWrapper):
+    assert entries is not None, "Can't add None entries"
+    assert table in (db_tables.V_TABLE, db_tables.R_TABLE), f"Invalid table given {table}"
+    assert isinstance(conn_wrapper, ConnectionWrapper), "Not using the connection wrapper for adding IDs"
+    assert conn_wrapper.status == conn_wrapper.OPEN, "Attempting to used a closed connection to add IDs"
+
+    entries = list(entries)
+    for handle, id in entries:
+        assert id is not None, "Can't add a None id"
+        assert handle is not None, "Can't add a None handle"
+        if not validEntry(handle, id, table):
             return -1
 
-    count_handle = f"SELECT COUNT(id) FROM {table} WHERE handle = ?;"
-    cursor = conn_wrapper.connection.cursor()
-    result = (cursor.execute(count_handle, (handle,))).fetchone()[0]
-    #add entry if it doesn't exist otherwise update it
-    #if it fails to add there is no need to rollback as the single statement failed
-    if result == 0:
-        add_query = f"INSERT INTO {table} (handle, known_id) VALUES (?, ?);"
-        try:
-            cursor.execute(add_query, (handle, id))
-        except Exception as e:
-            print(e)
-            sys.exit(exit_codes.EXIT_FAILURE)
-    else:
-        update_query = f"UPDATE {table} SET known_id = ? WHERE handle = ?;"
-        try:
-            cursor.execute(update_query, (id, handle))
-        except Exception as e:
-            print(e)
-            sys.exit(exit_codes.EXIT_FAILURE)
+    if len(entries) == 0:
+        return 0
+
+    #outside of a batch the pairs get their own transaction so a failure
+    #part way through doesn't leave half of them written
+    connection = conn_wrapper.connection
+    own_transaction = not connection.in_transaction
+    cursor = connection.cursor()
+    try:
+        if own_transaction:
+            cursor.execute("BEGIN")
+        cursor.executemany(upsertQuery(table), entries)
+    except Exception as e:
+        if own_transaction and connection.in_transaction:
+            connection.rollback()
+        print(e, file = sys.stderr)
+        sys.exit(exit_codes.EXIT_FAILURE)
 
-    conn_wrapper.connection.commit()
+    known = conn_wrapper.knowns.get(table)
+    if known is not None:
+        known.update(entries)
+    commitWrite(conn_wrapper, len(entries))
 
     return 0
 
@@ -522,6 +2892,10 @@ def findID(handle: str, id: str, table: str, conn_wrapper: ConnectionWrapper):
     assert isinstance(conn_wrapper, ConnectionWrapper), "Not using the connection wrapper for finding an ID"
     assert conn_wrapper.status == conn_wrapper.OPEN, "Attempting to used a closed connection to find an ID"
 
+    known = conn_wrapper.knowns.get(table)
+    if known is not None:
+        return known.get(handle) == id
+
     search_query = f"SELECT COUNT(id) FROM {table} WHERE known_id = ? AND handle = ?;"
     cursor = conn_wrapper.connection.cursor()
     result = (cursor.execute(search_query, (id, handle))).fetchone()[0]
@@ -549,10 +2923,13 @@ def addHandle(handle:str, table: str, conn_wrapper: ConnectionWrapper):
         initial_id = "00000000000"
         cursor.execute(add_query, (handle, initial_id))
     except Exception as e:
-        print(e)
+        print(e, file = sys.stderr)
         sys.exit(exit_codes.EXIT_FAILURE)
 
-    conn_wrapper.connection.commit()
+    known = conn_wrapper.knowns.get(table)
+    if known is not None:
+        known[handle] = initial_id
+    commitWrite(conn_wrapper)
 
 def findHandle(handle: str, table: str, conn_wrapper: ConnectionWrapper):
     assert handle is not None, "Can't find a None handle"
@@ -560,6 +2937,10 @@ def findHandle(handle: str, table: str, conn_wrapper: ConnectionWrapper):
     assert isinstance(conn_wrapper, ConnectionWrapper), "Not using the connection wrapper for finding a handle"
     assert conn_wrapper.status == conn_wrapper.OPEN, "Attempting to used a closed connection to find a handle"
 
+    known = conn_wrapper.knowns.get(table)
+    if known is not None:
+        return handle in known
+
     search_query = f"SELECT COUNT(id) FROM {table} WHERE handle = ?;"
     cursor = conn_wrapper.connection.cursor()
     result = (cursor.execute(search_query, (handle,))).fetchone()[0]
@@ -568,12 +2949,353 @@ def findHandle(handle: str, table: str, conn_wrapper: ConnectionWrapper):
     else:
         return True
 
-def connectToDB(conn_object: ConnectionWrapper):
+#Reads every handle and known id of a table in one query so findHandle and
+#findID can answer from memory instead of asking SQLite for every element.
+#addID and addHandle keep it up to date with what they write.
+def loadKnowns(table: str, conn_wrapper: ConnectionWrapper):
+    assert table in (db_tables.V_TABLE, db_tables.R_TABLE), f"Invalid table given {table}"
+    assert isinstance(conn_wrapper, ConnectionWrapper), "Not using the connection wrapper for loading knowns"
+    assert conn_wrapper.status == conn_wrapper.OPEN, "Attempting to used a closed connection to load knowns"
+
+    cursor = conn_wrapper.connection.cursor()
+    conn_wrapper.knowns[table] = dict(cursor.execute(f"SELECT handle, known_id FROM {table};"))
+
+def storedHandles(table: str, conn_wrapper: ConnectionWrapper):
+    assert table in (db_tables.V_TABLE, db_tables.R_TABLE), f"Invalid table given {table}"
+
+    known = conn_wrapper.knowns.get(table)
+    if known is not None:
+        return list(known)
+
+    cursor = conn_wrapper.connection.cursor()
+    try:
+        return [row[0] for row in cursor.execute(f"SELECT handle FROM {table};")]
+    except sqlite3.OperationalError:
+        #releaseExec and normalExec only make sure their own table exists
+        return []
+
+#Builds the pragmas of a profile with the sizes given replacing the profile's
+def dbPragmas(profile: str = constant_db_profiles.DEFAULT, mmap_size: int = None, cache_size: int = None):
+    assert profile in db_profile_pragmas, f"Invalid database profile given {profile}"
+
+    pragmas = dict(db_profile_pragmas[profile])
+    if mmap_size is not None:
+        pragmas["mmap_size"] = mmap_size
+    if cache_size is not None:
+        pragmas["cache_size"] = -cache_size
+
+    return tuple(pragmas.items())
+
+def applyPragmas(connection: sqlite3.Connection, pragmas):
+    #pragma values can't be parameterized so only known ones are let through
+    allowed = {"journal_mode", "synchronous", "mmap_size", "cache_size"}
+    for name, value in pragmas:
+        assert name in allowed, f"Unknown pragma given {name}"
+        assert re.fullmatch(r"^-?[a-zA-Z0-9]+$", str(value)), f"Invalid value for pragma {name}"
+        connection.execute(f"PRAGMA {name} = {value};").fetchall()
+
+def seenTable(table: str) -> str:
+    assert table in (db_tables.V_TABLE, db_tables.R_TABLE), f"Invalid table given {table}"
+    return seen_tables.V_TABLE if table == db_tables.V_TABLE else seen_tables.R_TABLE
+
+#These tables came after the known tables so a database made before them
+#gets them the first time a run opens it
+def createRunTables(conn_wrapper: ConnectionWrapper):
+    assert isinstance(conn_wrapper, ConnectionWrapper), "Not using the connection wrapper for creating tables"
+    assert conn_wrapper.status == conn_wrapper.OPEN, "Attempting to used a closed connection to create tables"
+
+    cursor = conn_wrapper.connection.cursor()
+    for seen_table, id_length in ((seen_tables.V_TABLE, constant_yt.V_ID_LEN), (seen_tables.R_TABLE, constant_yt.R_ID_LEN)):
+        cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {seen_table} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            handle varchar(30) NOT NULL,
+            seen_id varchar({id_length}) NOT NULL,
+            UNIQUE(handle, seen_id)
+        );
+        """)
+    cursor.execute(f"""
+    CREATE TABLE IF NOT EXISTS {CHANNELS_TABLE} (
+        handle varchar(30) PRIMARY KEY,
+        channel_id varchar(24) NOT NULL
+    );
+    """)
+    cursor.execute(f"""
+    CREATE TABLE IF NOT EXISTS {UPLOADS_TABLE} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        handle varchar(30) NOT NULL,
+        known_table varchar(13) NOT NULL,
+        found_at REAL NOT NULL
+    );
+    """)
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS {UPLOADS_TABLE}_handle ON {UPLOADS_TABLE} (handle, known_table);")
+    cursor.execute(f"""
+    CREATE TABLE IF NOT EXISTS {CHECKS_TABLE} (
+        handle varchar(30) NOT NULL,
+        known_table varchar(13) NOT NULL,
+        checked_at REAL NOT NULL,
+        PRIMARY KEY(handle, known_table)
+    );
+    """)
+    cursor.execute(f"""
+    CREATE TABLE IF NOT EXISTS {VALIDATORS_TABLE} (
+        handle varchar(30) NOT NULL,
+        tab varchar(8) NOT NULL,
+        etag TEXT,
+        last_modified TEXT,
+        PRIMARY KEY(handle, tab)
+    );
+    """)
+    if conn_wrapper.connection.in_transaction:
+        conn_wrapper.connection.commit()
+
+def loadSeen(table: str, conn_wrapper: ConnectionWrapper):
+    assert isinstance(conn_wrapper, ConnectionWrapper), "Not using the connection wrapper for loading seen ids"
+    assert conn_wrapper.status == conn_wrapper.OPEN, "Attempting to used a closed connection to load seen ids"
+
+    seen = {}
+    cursor = conn_wrapper.connection.cursor()
+    for handle, seen_id in cursor.execute(f"SELECT handle, seen_id FROM {seenTable(table)};"):
+        seen.setdefault(handle, set()).add(seen_id)
+    conn_wrapper.seen[table] = seen
+
+def findSeen(handle: str, id: str, table: str, conn_wrapper: ConnectionWrapper) -> bool:
+    assert isinstance(conn_wrapper, ConnectionWrapper), "Not using the connection wrapper for finding a seen id"
+    assert conn_wrapper.status == conn_wrapper.OPEN, "Attempting to used a closed connection to find a seen id"
+
+    seen = conn_wrapper.seen.get(table)
+    if seen is not None:
+        return id in seen.get(handle, ())
+
+    search_query = f"SELECT COUNT(id) FROM {seenTable(table)} WHERE handle = ? AND seen_id = ?;"
+    cursor = conn_wrapper.connection.cursor()
+    return (cursor.execute(search_query, (handle, id))).fetchone()[0] != 0
+
+#Records the ids on a handle's page, newest first, and forgets the oldest
+#ones past the history size
+def addSeen(handle: str, ids, table: str, conn_wrapper: ConnectionWrapper):
+    assert isinstance(conn_wrapper, ConnectionWrapper), "Not using the connection wrapper for adding seen ids"
+    assert conn_wrapper.status == conn_wrapper.OPEN, "Attempting to used a closed connection to add seen ids"
+
+    ids = [id for id in ids if validEntry(handle, id, table)]
+    if not ids:
+        return -1
+
+    seen_table = seenTable(table)
+    #oldest first so the newest ids get the highest row ids
+    add_query = f"INSERT INTO {seen_table} (handle, seen_id) VALUES (?, ?) ON CONFLICT(handle, seen_id) DO NOTHING;"
+    prune_query = f"""
+        DELETE FROM {seen_table} WHERE handle = ? AND id NOT IN
+        (SELECT id FROM {seen_table} WHERE handle = ? ORDER BY id DESC LIMIT ?);
+    """
+    cursor = conn_wrapper.connection.cursor()
+    try:
+        cursor.executemany(add_query, [(handle, id) for id in reversed(ids)])
+        cursor.execute(prune_query, (handle, handle, seen_tables.HISTORY_SIZE))
+    except Exception as e:
+        print(e, file = sys.stderr)
+        sys.exit(exit_codes.EXIT_FAILURE)
+
+    seen = conn_wrapper.seen.get(table)
+    if seen is not None:
+        kept = cursor.execute(f"SELECT seen_id FROM {seen_table} WHERE handle = ?;", (handle,))
+        seen[handle] = {row[0] for row in kept}
+    commitWrite(conn_wrapper)
+
+    return 0
+
+#Records that a handle was found to have uploaded, keeping only its last few
+def addUpload(handle: str, table: str, conn_wrapper: ConnectionWrapper, found_at: float = None):
+    assert isinstance(conn_wrapper, ConnectionWrapper), "Not using the connection wrapper for adding an upload"
+    assert conn_wrapper.status == conn_wrapper.OPEN, "Attempting to used a closed connection to add an upload"
+    assert table in (db_tables.V_TABLE, db_tables.R_TABLE), f"Invalid table given {table}"
+
+    if found_at is None:
+        found_at = time.time()
+
+    add_query = f"INSERT INTO {UPLOADS_TABLE} (handle, known_table, found_at) VALUES (?, ?, ?);"
+    prune_query = f"""
+        DELETE FROM {UPLOADS_TABLE} WHERE handle = ? AND known_table = ? AND id NOT IN
+        (SELECT id FROM {UPLOADS_TABLE} WHERE handle = ? AND known_table = ? ORDER BY id DESC LIMIT ?);
+    """
+    cursor = conn_wrapper.connection.cursor()
+    try:
+        cursor.execute(add_query, (handle, table, found_at))
+        cursor.execute(prune_query, (handle, table, handle, table, constant_adaptive.UPLOADS))
+    except Exception as e:
+        print(e, file = sys.stderr)
+        sys.exit(exit_codes.EXIT_FAILURE)
+
+    commitWrite(conn_wrapper)
+
+#Records when the handle's tabs were checked
+def addChecked(handle: str, tables, conn_wrapper: ConnectionWrapper, checked_at: float = None):
+    assert isinstance(conn_wrapper, ConnectionWrapper), "Not using the connection wrapper for adding a check"
+    assert conn_wrapper.status == conn_wrapper.OPEN, "Attempting to used a closed connection to add a check"
+
+    if checked_at is None:
+        checked_at = time.time()
+
+    check_query = (f"INSERT INTO {CHECKS_TABLE} (handle, known_table, checked_at) VALUES (?, ?, ?) "
+                   "ON CONFLICT(handle, known_table) DO UPDATE SET checked_at = excluded.checked_at;")
+    cursor = conn_wrapper.connection.cursor()
+    try:
+        cursor.executemany(check_query, [(handle, table, checked_at) for table in tables])
+    except Exception as e:
+        print(e, file = sys.stderr)
+        sys.exit(exit_codes.EXIT_FAILURE)
+
+    commitWrite(conn_wrapper)
+
+#What is known about how often a handle uploads. gap is the average seconds
+#between its recorded uploads, None until there are enough of them
+Cadence = namedtuple('Cadence', ["checked_at", "uploads", "gap"])
+
+#The cadence of every handle that has been checked, worked out by the
+#database in one grouped query instead of a query or a loop per handle
+def loadCadences(conn_wrapper: ConnectionWrapper):
+    assert isinstance(conn_wrapper, ConnectionWrapper), "Not using the connection wrapper for loading cadences"
+    assert conn_wrapper.status == conn_wrapper.OPEN, "Attempting to used a closed connection to load cadences"
+
+    cadence_query = f"""
+        SELECT checks.handle, checks.known_table, checks.checked_at, COALESCE(uploads.count, 0),
+               CASE WHEN uploads.count >= ? THEN (uploads.last_at - uploads.first_at) / (uploads.count - 1) END
+        FROM {CHECKS_TABLE} AS checks LEFT JOIN
+            (SELECT handle, known_table, COUNT(*) AS count, MIN(found_at) AS first_at, MAX(found_at) AS last_at
+             FROM {UPLOADS_TABLE} GROUP BY handle, known_table) AS uploads
+        ON uploads.handle = checks.handle AND uploads.known_table = checks.known_table;
+    """
+    cursor = conn_wrapper.connection.cursor()
+    conn_wrapper.cadences = {(handle, table): Cadence(checked_at, uploads, gap)
+                             for handle, table, checked_at, uploads, gap in cursor.execute(cadence_query, (constant_adaptive.MIN_UPLOADS,))}
+
+#Seconds after its last check until a handle is worth checking again. Uploads
+#are taken to come at random around the average gap, so that's when the chance
+#of one since the check reaches CHANCE. Without a gap it's due straight away
+def cadenceWait(cadence: Cadence, max_staleness: float) -> float:
+    if cadence.gap is None or cadence.gap <= 0:
+        return 0
+    return min(-cadence.gap * math.log(1 - constant_adaptive.CHANCE), max_staleness)
+
+#The soonest any of the handle's tabs is worth checking again
+def handleWait(handle: str, tabs, conn_wrapper: ConnectionWrapper, max_staleness: float) -> float:
+    waits = []
+    for tab_wanted in tabs:
+        cadence = conn_wrapper.cadences.get((handle, tabTable(tab_wanted)))
+        waits.append(0 if cadence is None else cadenceWait(cadence, max_staleness))
+    return min(waits)
+
+#With --adaptive only the handles likely to have uploaded since they were last
+#checked, or that haven't been checked in max_staleness, are kept
+def dueHandles(handles, tabs, conn_wrapper: ConnectionWrapper, settings, now: float = None):
+    if not settings.adaptive:
+        return handles
+
+    if now is None:
+        now = time.time()
+
+    due = []
+    for handle in handles:
+        cadences = [conn_wrapper.cadences.get((handle, tabTable(tab_wanted))) for tab_wanted in tabs]
+        #a tab never checked is due no matter the others
+        if any(cadence is None or now - cadence.checked_at >= cadenceWait(cadence, settings.max_staleness) for cadence in cadences):
+            due.append(handle)
+
+    verboseprint(f"Checking {len(due)} handles, {len(handles) - len(due)} are unlikely to have uploaded since they were last checked")
+    return due
+
+def loadChannelIds(conn_wrapper: ConnectionWrapper):
+    assert isinstance(conn_wrapper, ConnectionWrapper), "Not using the connection wrapper for loading channel ids"
+    assert conn_wrapper.status == conn_wrapper.OPEN, "Attempting to used a closed connection to load channel ids"
+
+    cursor = conn_wrapper.connection.cursor()
+    conn_wrapper.saved_channel_ids = dict(cursor.execute(f"SELECT handle, channel_id FROM {CHANNELS_TABLE};"))
+    conn_wrapper.channel_ids = dict(conn_wrapper.saved_channel_ids)
+
+#Writes the handle's channel id if it was found or changed during the run.
+#An id that was dropped for being out of date and not found again is removed
+def saveChannelId(handle: str, conn_wrapper: ConnectionWrapper):
+    assert isinstance(conn_wrapper, ConnectionWrapper), "Not using the connection wrapper for saving a channel id"
+    assert conn_wrapper.status == conn_wrapper.OPEN, "Attempting to used a closed connection to save a channel id"
+
+    channel_id = conn_wrapper.channel_ids.get(handle)
+    if channel_id == conn_wrapper.saved_channel_ids.get(handle):
+        return
+
+    cursor = conn_wrapper.connection.cursor()
+    try:
+        if channel_id is None:
+            cursor.execute(f"DELETE FROM {CHANNELS_TABLE} WHERE handle = ?;", (handle,))
+            del conn_wrapper.saved_channel_ids[handle]
+        else:
+            save_query = (f"INSERT INTO {CHANNELS_TABLE} (handle, channel_id) VALUES (?, ?) "
+                          "ON CONFLICT(handle) DO UPDATE SET channel_id = excluded.channel_id;")
+            cursor.execute(save_query, (handle, channel_id))
+            conn_wrapper.saved_channel_ids[handle] = channel_id
+    except Exception as e:
+        print(e, file = sys.stderr)
+        sys.exit(exit_codes.EXIT_FAILURE)
+
+    commitWrite(conn_wrapper)
+
+def loadValidators(conn_wrapper: ConnectionWrapper):
+    assert isinstance(conn_wrapper, ConnectionWrapper), "Not using the connection wrapper for loading validators"
+    assert conn_wrapper.status == conn_wrapper.OPEN, "Attempting to used a closed connection to load validators"
+
+    cursor = conn_wrapper.connection.cursor()
+    rows = cursor.execute(f"SELECT handle, tab, etag, last_modified FROM {VALIDATORS_TABLE};")
+    conn_wrapper.validators = ValidatorStore({(handle, tab): (etag, last_modified) for handle, tab, etag, last_modified in rows})
+
+#Stores what the responses for the tabs of a handle gave back once the handle
+#has been processed. A tab whose elements couldn't be found isn't stored so
+#it's downloaded in full again next time, and neither is one with new items
+#-t or -n stopped before so a run with a wider -t isn't answered with a 304.
+def saveValidators(handle: str, tabs, results, conn_wrapper: ConnectionWrapper):
+    assert isinstance(conn_wrapper, ConnectionWrapper), "Not using the connection wrapper for saving validators"
+    assert conn_wrapper.status == conn_wrapper.OPEN, "Attempting to used a closed connection to save validators"
+
+    store = conn_wrapper.validators
+    if store is None:
+        return
+
+    entries = []
+    for tab, elements in zip(tabs, results):
+        fresh = store.take(handle, tab)
+        if fresh is not None and elements and elements is not NOT_MODIFIED and topHandled(handle, tab, elements, conn_wrapper):
+            entries.append((handle, tab, fresh[0], fresh[1]))
+            store.known[(handle, tab)] = fresh
+
+    if not entries:
+        return
+
+    save_query = (f"INSERT INTO {VALIDATORS_TABLE} (handle, tab, etag, last_modified) VALUES (?, ?, ?, ?) "
+                  "ON CONFLICT(handle, tab) DO UPDATE SET etag = excluded.etag, last_modified = excluded.last_modified;")
+    cursor = conn_wrapper.connection.cursor()
+    try:
+        cursor.executemany(save_query, entries)
+    except Exception as e:
+        print(e, file = sys.stderr)
+        sys.exit(exit_codes.EXIT_FAILURE)
+
+    commitWrite(conn_wrapper, len(entries))
+
+#Whether the newest item of the tab is known or seen, which leaves nothing on
+#it for a later run to find
+def topHandled(handle: str, tab: str, elements, conn_wrapper: ConnectionWrapper) -> bool:
+    table = tabTable(tab)
+    if table == db_tables.V_TABLE:
+        page_ids = pageIds(elements, "videoRenderer", "videoId")
+    else:
+        page_ids = pageIds(elements, "playlistRenderer", "playlistId")
+    return bool(page_ids) and (findID(handle, page_ids[0], table, conn_wrapper) or findSeen(handle, page_ids[0], table, conn_wrapper))
+
+def connectToDB(conn_object: ConnectionWrapper, pragmas = ()):
     assert isinstance(conn_object, ConnectionWrapper), "Tried to make a connection without the wrapper"
 
     if conn_object.status == conn_object.CLOSED:
         conn_object.connection = sqlite3.connect(db_tables.DB_NAME, isolation_level = None)
         conn_object.status = conn_object.OPEN
+        applyPragmas(conn_object.connection, pragmas)
 
     assert conn_object.status == conn_object.OPEN, "Opening a DB connection resulted in a status of closed"
     assert conn_object.connection is not None, "Connection object is opened but remained None"
@@ -585,10 +3307,88 @@ def closeConnection(conn_object: ConnectionWrapper):
         conn_object.connection.close()
         conn_object.connection = None
         conn_object.status = conn_object.CLOSED
+        conn_object.knowns = {}
+        conn_object.seen = {}
+        conn_object.validators = None
+        conn_object.channel_ids = {}
+        conn_object.saved_channel_ids = {}
+        conn_object.cadences = {}
 
     assert conn_object.status == conn_object.CLOSED, "Closing a connection still kept the connection status open"
     assert conn_object.connection is None, "Connection object is closed but is not None"
 
+#Starts grouping the writes made through the wrapper into transactions
+def beginBatch(conn_object: ConnectionWrapper, size: int = constant_batch.SIZE, seconds: float = constant_batch.SECONDS):
+    assert isinstance(conn_object, ConnectionWrapper), "Tried to batch a connection without the wrapper"
+    assert conn_object.status == conn_object.OPEN, "Attempting to batch writes on a closed connection"
+    assert size > 0, f"Batch size is not usable {size=}"
+    assert seconds >= 0, f"Batch seconds is not usable {seconds=}"
+
+    conn_object.batch = WriteBatch(size, seconds)
+    if not conn_object.connection.in_transaction:
+        conn_object.connection.execute("BEGIN")
+
+#Keeps the batch from committing while the launcher has URLs waiting. The
+#writes for a handle come after its URLs are queued, so once the queue is
+#empty everything written has been opened. Launchers that don't queue open
+#before returning and have nothing to wait for
+def holdBatch(conn_object: ConnectionWrapper, launcher):
+    assert isinstance(conn_object, ConnectionWrapper), "Tried to hold a batch without the wrapper"
+
+    if conn_object.batch is not None and isinstance(launcher, QueuedLauncher):
+        conn_object.batch.opener = launcher
+
+#Called after every write. Without a batch it commits right away like before
+def commitWrite(conn_object: ConnectionWrapper, writes: int = 1):
+    assert isinstance(conn_object, ConnectionWrapper), "Tried to commit a connection without the wrapper"
+    assert conn_object.status == conn_object.OPEN, "Attempting to commit on a closed connection"
+
+    batch = conn_object.batch
+    if batch is None:
+        conn_object.connection.commit()
+        return
+
+    batch.pending = batch.pending + writes
+    if batch.first_write is None:
+        batch.first_write = time.monotonic()
+
+    if batch.pending >= batch.size:
+        checkpointBatch(conn_object, force = True)
+    else:
+        checkpointBatch(conn_object)
+
+#Commits the batch if it's waited long enough, or right away with force.
+#Either way it waits for a later checkpoint while the opener is still busy
+def checkpointBatch(conn_object: ConnectionWrapper, force: bool = False):
+    assert isinstance(conn_object, ConnectionWrapper), "Tried to commit a connection without the wrapper"
+
+    batch = conn_object.batch
+    if batch is None or batch.pending == 0:
+        return
+
+    if batch.opener is not None and batch.opener.busy():
+        return
+
+    if not force and time.monotonic() - batch.first_write < batch.seconds:
+        return
+
+    conn_object.connection.commit()
+    batch.pending = 0
+    batch.first_write = None
+    conn_object.connection.execute("BEGIN")
+
+#Commits whatever is left. Also used when a run stops early so the writes
+#for what was already opened are not lost
+def endBatch(conn_object: ConnectionWrapper):
+    assert isinstance(conn_object, ConnectionWrapper), "Tried to end a batch without the wrapper"
+
+    if conn_object.batch is None:
+        return
+
+    if conn_object.status == conn_object.OPEN and conn_object.connection.in_transaction:
+        conn_object.connection.commit()
+    conn_object.batch = None
+
 def init():
     conn_wrapped = ConnectionWrapper()
     connectToDB(conn_wrapped)
@@ -616,8 +3416,9 @@ def init():
         cursor.execute(create_videos)
         cursor.execute(create_releases)
         conn_wrapped.connection.commit()
+        createRunTables(conn_wrapped)
     except sqlite3.Error as error:
-        print(error)
+        print(error, file = sys.stderr)
         status = -1
 
     closeConnection(conn_wrapped)